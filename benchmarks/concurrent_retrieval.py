@@ -0,0 +1,104 @@
+"""
+Concurrent retrieval throughput: sync `Weaviate` vs `AsyncWeaviate`.
+
+Simulates the API serving many concurrent requests from a single event loop. The
+"sync" run calls the blocking client from inside coroutines, the way the graph
+nodes used to; the "async" run awaits `AsyncWeaviate`. Alongside throughput it
+reports the worst event-loop stall, which is what stalls concurrent SSE streams.
+
+Requires a running Weaviate instance with a populated collection:
+
+    ENV=local python benchmarks/concurrent_retrieval.py --collection Documents \
+        --requests 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from dotenv import load_dotenv
+
+from vectrix_graphs.db.weaviate import AsyncWeaviate, Weaviate
+
+QUERIES = [
+    "What is the warranty period?",
+    "How do I reset the device?",
+    "Which payment terms apply to this invoice?",
+    "Who is the contact person for support?",
+]
+
+
+async def _monitor_loop(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Measure the longest delay between two scheduled wake-ups of the event loop"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def _run(search, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await search(QUERIES[i % len(QUERIES)])
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_stall = await monitor
+
+    latencies.sort()
+    return {
+        "throughput": total / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "worst_stall": worst_stall,
+    }
+
+
+async def main(args):
+    sync_db = Weaviate()
+    sync_db.set_collection(args.collection)
+
+    async def sync_search(query):
+        return sync_db.similarity_search(query=query, k=args.k, type=args.type)
+
+    async_db = await AsyncWeaviate().with_collection(args.collection)
+
+    async def async_search(query):
+        return await async_db.similarity_search(query=query, k=args.k, type=args.type)
+
+    try:
+        for name, search in [("sync", sync_search), ("async", async_search)]:
+            # Warm up connections and the embedding cache before measuring
+            await search(QUERIES[0])
+            result = await _run(search, args.requests, args.concurrency)
+            print(
+                f"{name:>5}: {result['throughput']:8.1f} req/s  "
+                f"p50 {result['p50'] * 1000:7.1f} ms  "
+                f"p99 {result['p99'] * 1000:7.1f} ms  "
+                f"worst loop stall {result['worst_stall'] * 1000:7.1f} ms"
+            )
+    finally:
+        sync_db.close()
+        await async_db.close()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--type", choices=["text", "multimodal"], default="text")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,58 @@
+"""
+Offline evaluation of the local intent classifier used ahead of the LLM intent
+chain in `GraphNodes.detect_intent`.
+
+Reads labelled messages from a JSON lines file, one object per line:
+
+    {"question": "hi there", "intent": "greeting", "has_history": false}
+
+and reports the fraction of LLM intent calls avoided, the accuracy of the local
+answers and the classification latency, for one or more thresholds:
+
+    python benchmarks/intent_classifier.py --data intents.jsonl \
+        --threshold 0.8 0.9 0.95 [--train train.jsonl]
+"""
+
+import argparse
+
+from vectrix_graphs.graphs.utils.handlers.intent_handler import (
+    DEFAULT_THRESHOLD,
+    IntentClassifier,
+    evaluate,
+    load_examples,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data", required=True, help="labelled JSON lines file")
+    parser.add_argument(
+        "--train", help="JSON lines file to train on instead of the seed examples"
+    )
+    parser.add_argument(
+        "--threshold", type=float, nargs="+", default=[DEFAULT_THRESHOLD]
+    )
+    args = parser.parse_args()
+
+    examples = load_examples(args.data)
+    training = None
+    if args.train:
+        training = [(text, intent) for text, intent, _ in load_examples(args.train)]
+
+    print(
+        f"{'threshold':>9} {'avoided':>8} {'local acc':>9} {'accuracy':>8} "
+        f"{'latency':>9}"
+    )
+    for threshold in args.threshold:
+        classifier = IntentClassifier(threshold=threshold, examples=training)
+        report = evaluate(classifier, examples)
+        print(
+            f"{threshold:>9.2f} {report['llm_calls_avoided']:>8.1%} "
+            f"{report['local_accuracy']:>9.1%} {report['accuracy']:>8.1%} "
+            f"{report['mean_latency_us']:>7.1f}us"
+        )
+    print(f"{len(examples)} examples")
+
+
+if __name__ == "__main__":
+    main()
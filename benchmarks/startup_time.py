@@ -0,0 +1,94 @@
+"""
+API startup time: cold import, time to first response and graph build times.
+
+Every measurement runs in a fresh interpreter, like an autoscaled container
+starting. "ready" is the time from interpreter start until the app answered its
+first request, with the background warm-up running. The graph build times are
+what the first request of a graph pays when the warm-up has not built it yet.
+
+Runs without external services, Weaviate and the prompt hub may be unreachable:
+
+    ENV=local python benchmarks/startup_time.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+IMPORT = """
+import time
+started = time.perf_counter()
+import vectrix_graphs.main
+print(time.perf_counter() - started)
+"""
+
+READY = """
+import asyncio, time
+started = time.perf_counter()
+import httpx
+from vectrix_graphs.main import app
+
+async def first_response():
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as c:
+            (await c.get("/")).raise_for_status()
+            print(time.perf_counter() - started)
+
+asyncio.run(first_response())
+"""
+
+BUILD = """
+import time
+from vectrix_graphs.graphs.registry import graphs
+started = time.perf_counter()
+graphs.get({name!r})
+print(time.perf_counter() - started)
+"""
+
+
+def _measure(code: str, runs: int) -> float:
+    """Median of the seconds printed last by `code` over `runs` fresh interpreters"""
+    env = {**os.environ, "PROMPT_REFRESH_INTERVAL": "0"}
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        )
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def main(args):
+    from vectrix_graphs.graphs.registry import DEFAULT_GRAPHS
+
+    results = {
+        "import": _measure(IMPORT, args.runs),
+        "ready": _measure(READY, args.runs),
+    }
+    for name in args.graphs or DEFAULT_GRAPHS:
+        try:
+            results[f"build {name}"] = _measure(BUILD.format(name=name), args.runs)
+        except subprocess.CalledProcessError as e:
+            print(f"Unable to build {name}: {e.stderr.strip().splitlines()[-1]}")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, seconds in results.items():
+        print(f"{name:>24}: {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--graphs", nargs="*", help="Graphs to build, all by default")
+    parser.add_argument("--json", action="store_true")
+    main(parser.parse_args())
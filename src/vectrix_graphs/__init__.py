@@ -1,9 +1,18 @@
-from .extract.ner import ExtractMetaData
 from .logger import setup_logger
 
 # Initialize global logger
 logger = setup_logger(__name__, "INFO")  # You can change the default level as needed
 
+
+def __getattr__(name):
+    # Imported on first access, it loads every chat model integration
+    if name == "ExtractMetaData":
+        from .extract.ner import ExtractMetaData
+
+        return ExtractMetaData
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     "setup_logger",
     "ExtractMetaData",
@@ -1,3 +1,28 @@
-from .weaviate import Weaviate
+import os
 
-__all__ = ["Weaviate"]
+
+def __getattr__(name):
+    # Imported on first access, the adapter loads the Weaviate client library
+    if name == "Weaviate":
+        from .weaviate import Weaviate
+
+        return Weaviate
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_async_vector_db():
+    """
+    Return the async vector database selected with the VECTOR_DB environment
+    variable: "weaviate" (default) or "numpy" for the in-process store.
+    """
+    if os.environ.get("VECTOR_DB", "weaviate") == "numpy":
+        from .clients import clients
+        from .numpy_store import AsyncNumpyStore
+
+        return AsyncNumpyStore(clients.numpy_store())
+    from .weaviate import AsyncWeaviate
+
+    return AsyncWeaviate()
+
+
+__all__ = ["Weaviate", "get_async_vector_db"]
@@ -0,0 +1,321 @@
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from ..logger import setup_logger
+
+logger = setup_logger(name=__name__, level="INFO")
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold and collapse whitespace, so trivially different questions match"""
+    return " ".join(query.casefold().split()).rstrip("?!. ")
+
+
+# Numbers, codes and capitalized names after the first word of a question
+IDENTIFIER_PATTERN = re.compile(r"\b\w*\d\w*\b|(?<=\s)[A-Z]\w*")
+
+
+def question_identifiers(question: str) -> frozenset:
+    """
+    Identifiers of a question. Questions differing only in an identifier embed
+    almost identically, so a semantic match must have the same ones.
+    """
+    return frozenset(m.casefold() for m in IDENTIFIER_PATTERN.findall(question))
+
+
+class QueryCache:
+    """
+    In-memory LRU cache of similarity search results with a TTL.
+
+    Entries are grouped per collection. Every write to a collection bumps its
+    generation and drops its entries, and a result computed before the write is
+    never stored afterwards, so a search never returns documents that were
+    replaced or removed in this process. Other processes see the change after at
+    most `ttl` seconds.
+
+    args:
+        max_entries: maximum number of cached results
+        ttl: seconds a result stays valid, 0 disables the cache
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple, Tuple[float, Any]] = OrderedDict()
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(collection: str, query: str, **params: Hashable) -> Tuple:
+        """Build the cache key of a search, `params` are the search arguments"""
+        return (
+            collection.lower(),
+            normalize_query(query),
+            tuple(sorted(params.items())),
+        )
+
+    def generation(self, collection: str) -> int:
+        """Current write generation of a collection, pass it back to `put`"""
+        with self._lock:
+            return self._generations[collection.lower()]
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Return a copy of the cached result, or None if missing or expired"""
+        if not self.ttl:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        # Callers may annotate the returned documents
+        return copy.deepcopy(value)
+
+    def put(self, key: Tuple, value: Any, generation: int):
+        """
+        Store a result computed at `generation`, skipped if the collection was
+        written to in the meantime.
+        """
+        if not self.ttl:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            if self._generations[key[0]] != generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, collection: str):
+        """Drop the cached results of a collection after a write"""
+        collection = collection.lower()
+        with self._lock:
+            self._generations[collection] += 1
+            stale = [key for key in self._entries if key[0] == collection]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            logger.debug(f"Invalidated {len(stale)} cached results of {collection}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def clear(self):
+        """Remove all cached results"""
+        with self._lock:
+            self._entries.clear()
+
+
+def cached_searches(
+    cache: QueryCache,
+    collection: str,
+    queries: List[str],
+    params: Dict[str, Hashable],
+    search: Callable[[List[str]], List[Any]],
+) -> List[Any]:
+    """
+    Serve the results of `queries` from the cache and run `search` once for the
+    queries that are not cached, storing their results.
+    """
+    generation = cache.generation(collection)
+    keys = [cache.key(collection, query, **params) for query in queries]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        fetched = search([queries[i] for i in missing])
+        for i, documents in zip(missing, fetched):
+            results[i] = documents
+            cache.put(keys[i], documents, generation)
+    return results
+
+
+async def acached_searches(
+    cache: QueryCache,
+    collection: str,
+    queries: List[str],
+    params: Dict[str, Hashable],
+    search: Callable[[List[str]], Awaitable[List[Any]]],
+) -> List[Any]:
+    """Async variant of `cached_searches`, `search` returns an awaitable"""
+    generation = cache.generation(collection)
+    keys = [cache.key(collection, query, **params) for query in queries]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        fetched = await search([queries[i] for i in missing])
+        for i, documents in zip(missing, fetched):
+            results[i] = documents
+            cache.put(keys[i], documents, generation)
+    return results
+
+
+class AnswerCache:
+    """
+    Cache of final RAG answers keyed by the standalone question and collection.
+
+    A lookup tries the normalized question. Semantic matching is opt-in: when
+    `embed` is given, it then tries the most similar cached question of the same
+    namespace and collection, if the cosine similarity reaches `threshold` and
+    both questions have the same numbers, codes and names. Entries expire after
+    `ttl` seconds and are dropped when their collection is written to: the write
+    generations of `generations` (the shared `QueryCache`) are recorded with
+    every answer.
+
+    args:
+        generations: cache tracking the write generation of every collection
+        embed: function embedding a question, None for exact matches only
+        max_entries: maximum number of cached answers
+        ttl: seconds an answer stays valid, 0 disables the cache
+        threshold: minimum cosine similarity of a semantic match
+    """
+
+    def __init__(
+        self,
+        generations: QueryCache,
+        embed: Optional[Callable[[str], List[float]]] = None,
+        max_entries: int = 1000,
+        ttl: float = 3600.0,
+        threshold: float = 0.98,
+    ):
+        self.generations = generations
+        self.embed = embed
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple, Dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def generation(self, collection: str) -> int:
+        """Write generation of a collection, pass it back to `store`"""
+        return self.generations.generation(collection)
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        if self.embed is None:
+            return None
+        try:
+            vector = np.asarray(self.embed(question), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Unable to embed question for the answer cache: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _valid(self, entry: Dict[str, Any], collection: str, now: float) -> bool:
+        return entry["expires"] >= now and entry["generation"] == self.generation(
+            collection
+        )
+
+    def lookup(
+        self, namespace: str, collection: str, question: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached answer as a dict with the "answer", the "match" type
+        ("exact" or "semantic") and the "similarity", or None on a miss.
+        """
+        if not self.ttl:
+            return None
+        key = (namespace, collection.lower(), normalize_query(question))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._valid(entry, collection, now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return {"answer": entry["answer"], "match": "exact", "similarity": 1.0}
+
+        vector = self._embed(question)
+        if vector is not None:
+            with self._lock:
+                identifiers = question_identifiers(question)
+                candidates = [
+                    (k, e)
+                    for k, e in self._entries.items()
+                    if k[:2] == key[:2]
+                    and e["vector"] is not None
+                    and e["identifiers"] == identifiers
+                    and self._valid(e, collection, now)
+                ]
+                if candidates:
+                    similarities = (
+                        np.stack([e["vector"] for _, e in candidates]) @ vector
+                    )
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.threshold:
+                        best_key, entry = candidates[best]
+                        self._entries.move_to_end(best_key)
+                        self.hits += 1
+                        self.semantic_hits += 1
+                        return {
+                            "answer": entry["answer"],
+                            "match": "semantic",
+                            "similarity": float(similarities[best]),
+                        }
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(
+        self,
+        namespace: str,
+        collection: str,
+        question: str,
+        answer: str,
+        generation: int,
+    ):
+        """Cache the answer to a question, computed at write `generation`"""
+        if not self.ttl or generation != self.generation(collection):
+            return
+        key = (namespace, collection.lower(), normalize_query(question))
+        vector = self._embed(question)
+        with self._lock:
+            self._entries[key] = {
+                "answer": answer,
+                "vector": vector,
+                "identifiers": question_identifiers(question),
+                "generation": generation,
+                "expires": time.monotonic() + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def clear(self):
+        """Remove all cached answers"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict
+
+from ..logger import setup_logger
+from ..metrics import metrics
+
+if TYPE_CHECKING:
+    import cohere
+    import voyageai
+    import weaviate
+
+    from .cache import AnswerCache, QueryCache
+    from .numpy_store import NumpyStore
+    from .sqlite import EmbeddingCache, SqliteCheckpointer
+
+logger = setup_logger(name=__name__, level="INFO")
+
+
+async def _close_http_client(client):
+    """Close the httpx connection pool of a Cohere client"""
+    http = client._client_wrapper.httpx_client.httpx_client
+    if hasattr(http, "aclose"):
+        await http.aclose()
+    else:
+        http.close()
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of shared clients for Weaviate, Voyage and Cohere.
+
+    Every client is created lazily on first use and reused afterwards, so graph
+    nodes and vector database adapters never open their own connections. The
+    client libraries, the caches and their dependencies are only imported when
+    their first client is created.
+    `startup()` and `shutdown()` are tied to the FastAPI lifespan.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Connecting to Weaviate can be slow, it must not block the other getters
+        self._weaviate_lock = threading.Lock()
+        self._async_lock = None
+        self._weaviate = None
+        self._async_weaviate = None
+        self._voyage = None
+        self._async_voyage = None
+        self._cohere = None
+        self._async_cohere = None
+        self._embedding_cache = None
+        self._numpy_store = None
+        self._query_cache = None
+        self._answer_cache = None
+        self._checkpointer = None
+
+    @staticmethod
+    def _check_env():
+        if os.environ["ENV"] != "local":
+            raise ValueError(f"Unsupported environment: {os.environ['ENV']}")
+
+    def weaviate(self) -> weaviate.WeaviateClient:
+        """Return the shared synchronous Weaviate client"""
+        import weaviate
+
+        with self._weaviate_lock:
+            if self._weaviate is None or not self._weaviate.is_connected():
+                self._check_env()
+                try:
+                    self._weaviate = weaviate.connect_to_local()
+                except Exception:
+                    self._weaviate = weaviate.connect_to_local(
+                        host="host.docker.internal",
+                    )
+                logger.info("Connected synchronous Weaviate client")
+            return self._weaviate
+
+    async def async_weaviate(self) -> weaviate.WeaviateAsyncClient:
+        """Return the shared async Weaviate client, connecting it if needed"""
+        import weaviate
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            if self._async_weaviate is None or not self._async_weaviate.is_connected():
+                self._check_env()
+                try:
+                    client = weaviate.use_async_with_local()
+                    await client.connect()
+                except Exception:
+                    client = weaviate.use_async_with_local(
+                        host="host.docker.internal",
+                    )
+                    await client.connect()
+                self._async_weaviate = client
+                logger.info("Connected async Weaviate client")
+            return self._async_weaviate
+
+    def voyage(self) -> voyageai.Client:
+        """Return the shared synchronous Voyage client"""
+        import voyageai
+
+        with self._lock:
+            if self._voyage is None:
+                self._voyage = voyageai.Client()
+            return self._voyage
+
+    def async_voyage(self) -> voyageai.AsyncClient:
+        """Return the shared async Voyage client"""
+        import voyageai
+
+        with self._lock:
+            if self._async_voyage is None:
+                self._async_voyage = voyageai.AsyncClient()
+            return self._async_voyage
+
+    def cohere(self) -> cohere.ClientV2:
+        """Return the shared Cohere client"""
+        import cohere
+
+        with self._lock:
+            if self._cohere is None:
+                self._cohere = cohere.ClientV2()
+            return self._cohere
+
+    def async_cohere(self) -> cohere.AsyncClientV2:
+        """Return the shared async Cohere client"""
+        import cohere
+
+        with self._lock:
+            if self._async_cohere is None:
+                self._async_cohere = cohere.AsyncClientV2()
+            return self._async_cohere
+
+    def embedding_cache(self) -> EmbeddingCache:
+        """Return the shared on-disk embedding cache"""
+        from .sqlite import EmbeddingCache
+
+        with self._lock:
+            if self._embedding_cache is None:
+                self._embedding_cache = EmbeddingCache()
+            return self._embedding_cache
+
+    def query_cache(self) -> QueryCache:
+        """Return the shared similarity search result cache"""
+        from .cache import QueryCache
+
+        with self._lock:
+            if self._query_cache is None:
+                self._query_cache = QueryCache(
+                    max_entries=int(os.environ.get("QUERY_CACHE_SIZE", 1024)),
+                    ttl=float(os.environ.get("QUERY_CACHE_TTL", 300)),
+                )
+            return self._query_cache
+
+    def _embed_question(self, question: str):
+        from .embeddings import embed_texts
+
+        return embed_texts(self, self.embedding_cache(), [question])[0]
+
+    def answer_cache(self) -> AnswerCache:
+        """Return the shared cache of final answers"""
+        from .cache import AnswerCache
+
+        query_cache = self.query_cache()
+        # Exact matches only, semantic matching is enabled with ANSWER_CACHE_SEMANTIC
+        semantic = os.environ.get("ANSWER_CACHE_SEMANTIC", "0") == "1"
+        with self._lock:
+            if self._answer_cache is None:
+                self._answer_cache = AnswerCache(
+                    query_cache,
+                    embed=self._embed_question if semantic else None,
+                    max_entries=int(os.environ.get("ANSWER_CACHE_SIZE", 1000)),
+                    ttl=float(os.environ.get("ANSWER_CACHE_TTL", 3600)),
+                    threshold=float(os.environ.get("ANSWER_CACHE_THRESHOLD", 0.98)),
+                )
+            return self._answer_cache
+
+    def checkpointer(self) -> SqliteCheckpointer:
+        """Return the shared store of conversation threads"""
+        from .sqlite import SqliteCheckpointer
+
+        with self._lock:
+            if self._checkpointer is None:
+                self._checkpointer = SqliteCheckpointer()
+            return self._checkpointer
+
+    def numpy_store(self) -> NumpyStore:
+        """Return the shared in-process vector store"""
+        from .numpy_store import NumpyStore
+
+        with self._lock:
+            if self._numpy_store is None:
+                self._numpy_store = NumpyStore(registry=self)
+            return self._numpy_store
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Statistics of the caches created so far"""
+        caches = {
+            "query": self._query_cache,
+            "answer": self._answer_cache,
+            "embedding": self._embedding_cache,
+        }
+        return {name: c.stats() for name, c in caches.items() if c is not None}
+
+    def close_weaviate(self):
+        """Close the synchronous Weaviate client, it reconnects on next use"""
+        with self._weaviate_lock:
+            if self._weaviate is not None:
+                self._weaviate.close()
+                self._weaviate = None
+
+    async def close_async_weaviate(self):
+        """Close the async Weaviate client, it reconnects on next use"""
+        if self._async_weaviate is not None:
+            client, self._async_weaviate = self._async_weaviate, None
+            await client.close()
+
+    async def startup(self):
+        """Open the connections used while serving requests"""
+        try:
+            await self.async_weaviate()
+        except Exception as e:
+            # Keep serving, the connection is retried lazily on the next request
+            logger.error(f"Unable to connect to Weaviate at startup: {e}")
+
+    async def shutdown(self):
+        """Close every open connection and drop the cached clients"""
+        await self.close_async_weaviate()
+        self.close_weaviate()
+        with self._lock:
+            cohere_clients = [self._cohere, self._async_cohere]
+            embedding_cache, self._embedding_cache = self._embedding_cache, None
+            numpy_store, self._numpy_store = self._numpy_store, None
+            checkpointer, self._checkpointer = self._checkpointer, None
+            # Voyage opens an aiohttp session per request, there is no pool to close
+            self._voyage = None
+            self._async_voyage = None
+            self._cohere = None
+            self._async_cohere = None
+            self._query_cache = None
+            self._answer_cache = None
+            self._async_lock = None
+        for client in cohere_clients:
+            if client is not None:
+                await _close_http_client(client)
+        if embedding_cache is not None:
+            embedding_cache.close()
+        if numpy_store is not None:
+            numpy_store.close()
+        if checkpointer is not None:
+            checkpointer.close()
+        logger.info("Closed all clients")
+
+
+clients = ClientRegistry()
+
+metrics.gauge(
+    "vectrix_cache_hit_ratio",
+    "Hit ratio of the query, answer and embedding caches",
+    ("cache",),
+    lambda: [({"cache": n}, s["hit_ratio"]) for n, s in clients.cache_stats().items()],
+)
+metrics.gauge(
+    "vectrix_cache_entries",
+    "Entries of the query, answer and embedding caches",
+    ("cache",),
+    lambda: [({"cache": n}, s["entries"]) for n, s in clients.cache_stats().items()],
+)
@@ -0,0 +1,201 @@
+import asyncio
+import functools
+import random
+import time
+from contextlib import nullcontext
+from typing import Any, List
+
+from ..helpers.rate_limiter import RateLimiter, limiters
+from ..logger import setup_logger
+from .clients import ClientRegistry
+from .sqlite import EmbeddingCache
+
+logger = setup_logger(name=__name__, level="INFO")
+
+VOYAGE_MULTIMODAL_MODEL = "voyage-multimodal-3"
+# Must match the text2vec_cohere vectorizer of text collections
+COHERE_TEXT_MODEL = "embed-multilingual-v3.0"
+
+MAX_EMBED_RETRIES = 5
+
+
+@functools.lru_cache(maxsize=None)
+def retryable_errors() -> tuple:
+    """Provider errors worth retrying, the SDKs are only imported when needed"""
+    import cohere.errors
+    import voyageai.error
+
+    return (
+        voyageai.error.RateLimitError,
+        voyageai.error.ServiceUnavailableError,
+        cohere.errors.TooManyRequestsError,
+    )
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter, capped at one minute"""
+    return min(60.0, 2.0**attempt) * (0.5 + random.random() / 2)
+
+
+def call_with_backoff(fn, limiter: RateLimiter | None = None):
+    """
+    Call `fn`, retrying with backoff when the provider is rate limiting. Every
+    attempt is admitted by `limiter`, which slows down on 429 responses.
+    """
+    for attempt in range(MAX_EMBED_RETRIES + 1):
+        try:
+            with limiter.slot() if limiter else nullcontext():
+                return fn()
+        except retryable_errors() as e:
+            if attempt == MAX_EMBED_RETRIES:
+                raise
+            delay = _backoff_delay(attempt)
+            logger.warning(
+                f"Embedding request throttled ({e}), retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+
+async def acall_with_backoff(fn, limiter: RateLimiter | None = None):
+    """Async variant of `call_with_backoff`, `fn` returns an awaitable"""
+    for attempt in range(MAX_EMBED_RETRIES + 1):
+        try:
+            async with limiter.aslot() if limiter else nullcontext():
+                return await fn()
+        except retryable_errors() as e:
+            if attempt == MAX_EMBED_RETRIES:
+                raise
+            delay = _backoff_delay(attempt)
+            logger.warning(
+                f"Embedding request throttled ({e}), retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+
+def _cache_lookup(
+    cache: EmbeddingCache, inputs: List[List[Any]], model: str, truncation: bool
+):
+    """Return the cache keys, the cached vectors and the indexes of the misses"""
+    keys = [cache.key(item, model, truncation) for item in inputs]
+    cached = cache.get_many(keys)
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    return keys, cached, missing
+
+
+def embed_multimodal(
+    registry: ClientRegistry,
+    cache: EmbeddingCache,
+    inputs: List[List[Any]],
+    truncation: bool,
+) -> List[List[float]]:
+    """
+    Embed multi-modal inputs with Voyage, serving previously embedded inputs
+    from the embedding cache.
+    """
+    keys, cached, missing = _cache_lookup(
+        cache, inputs, VOYAGE_MULTIMODAL_MODEL, truncation
+    )
+
+    if missing:
+        result = call_with_backoff(
+            lambda: registry.voyage().multimodal_embed(
+                inputs=[inputs[i] for i in missing],
+                model=VOYAGE_MULTIMODAL_MODEL,
+                truncation=truncation,
+            ),
+            limiters.get("voyage", VOYAGE_MULTIMODAL_MODEL),
+        )
+        new_vectors = {keys[i]: v for i, v in zip(missing, result.embeddings)}
+        cache.put_many(new_vectors.items())
+        cached.update(new_vectors)
+
+    logger.debug(
+        f"Embedded {len(missing)} inputs, {len(inputs) - len(missing)} from cache"
+    )
+    return [cached[key] for key in keys]
+
+
+async def aembed_multimodal(
+    registry: ClientRegistry,
+    cache: EmbeddingCache,
+    inputs: List[List[Any]],
+    truncation: bool,
+) -> List[List[float]]:
+    """Async variant of `embed_multimodal`"""
+    keys, cached, missing = await asyncio.to_thread(
+        _cache_lookup, cache, inputs, VOYAGE_MULTIMODAL_MODEL, truncation
+    )
+
+    if missing:
+        result = await acall_with_backoff(
+            lambda: registry.async_voyage().multimodal_embed(
+                inputs=[inputs[i] for i in missing],
+                model=VOYAGE_MULTIMODAL_MODEL,
+                truncation=truncation,
+            ),
+            limiters.get("voyage", VOYAGE_MULTIMODAL_MODEL),
+        )
+        new_vectors = {keys[i]: v for i, v in zip(missing, result.embeddings)}
+        await asyncio.to_thread(cache.put_many, new_vectors.items())
+        cached.update(new_vectors)
+
+    return [cached[key] for key in keys]
+
+
+def embed_texts(
+    registry: ClientRegistry,
+    cache: EmbeddingCache,
+    texts: List[str],
+    input_type: str = "search_query",
+) -> List[List[float]]:
+    """
+    Embed texts with the same Cohere model as the text collections, in a single
+    request for all cache misses.
+    """
+    model = f"{COHERE_TEXT_MODEL}:{input_type}"
+    keys, cached, missing = _cache_lookup(cache, [[t] for t in texts], model, False)
+
+    if missing:
+        response = call_with_backoff(
+            lambda: registry.cohere().embed(
+                model=COHERE_TEXT_MODEL,
+                input_type=input_type,
+                embedding_types=["float"],
+                texts=[texts[i] for i in missing],
+            ),
+            limiters.get("cohere", COHERE_TEXT_MODEL),
+        )
+        new_vectors = {keys[i]: v for i, v in zip(missing, response.embeddings.float_)}
+        cache.put_many(new_vectors.items())
+        cached.update(new_vectors)
+
+    return [cached[key] for key in keys]
+
+
+async def aembed_texts(
+    registry: ClientRegistry,
+    cache: EmbeddingCache,
+    texts: List[str],
+    input_type: str = "search_query",
+) -> List[List[float]]:
+    """Async variant of `embed_texts`"""
+    model = f"{COHERE_TEXT_MODEL}:{input_type}"
+    keys, cached, missing = await asyncio.to_thread(
+        _cache_lookup, cache, [[t] for t in texts], model, False
+    )
+
+    if missing:
+        response = await acall_with_backoff(
+            lambda: registry.async_cohere().embed(
+                model=COHERE_TEXT_MODEL,
+                input_type=input_type,
+                embedding_types=["float"],
+                texts=[texts[i] for i in missing],
+            ),
+            limiters.get("cohere", COHERE_TEXT_MODEL),
+        )
+        new_vectors = {keys[i]: v for i, v in zip(missing, response.embeddings.float_)}
+        await asyncio.to_thread(cache.put_many, new_vectors.items())
+        cached.update(new_vectors)
+
+    return [cached[key] for key in keys]
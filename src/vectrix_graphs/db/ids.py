@@ -0,0 +1,61 @@
+import hashlib
+import uuid
+from typing import Any, Dict, Optional, Sequence
+
+from PIL import Image
+
+# Metadata keys identifying where a chunk comes from, in order of preference.
+# "filename" is a basename and would merge same-named files of different folders
+SOURCE_ID_KEYS = ("source_id", "object_id", "url", "source")
+
+
+def hash_inputs(inputs: Sequence[Any]) -> str:
+    """
+    Hash a multi-modal input (a list of strings and PIL images) into a hex digest.
+    Every part is prefixed with its type and length so that different splits of
+    the same bytes never collide.
+    """
+    digest = hashlib.sha256()
+    for part in inputs:
+        if isinstance(part, str):
+            data = part.encode("utf-8")
+            digest.update(b"t" + len(data).to_bytes(8, "big") + data)
+        elif isinstance(part, Image.Image):
+            header = f"{part.mode}:{part.size[0]}x{part.size[1]}".encode()
+            data = part.tobytes()
+            digest.update(b"i" + header + len(data).to_bytes(8, "big") + data)
+        else:
+            raise ValueError(f"Unsupported input type: {type(part).__name__}")
+    return digest.hexdigest()
+
+
+def source_id(metadata: Dict[str, Any]) -> Optional[str]:
+    """Return the identity of the source a chunk was extracted from"""
+    for key in SOURCE_ID_KEYS:
+        if metadata.get(key):
+            return str(metadata[key])
+    return None
+
+
+def object_uuid(source: Optional[str], content_hash: str) -> str:
+    """
+    Deterministic object UUID for a chunk. Re-importing unchanged content yields
+    the same UUID, while changed content yields a new one.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source or ''}:{content_hash}"))
+
+
+def identify_chunk(
+    content: Sequence[Any], properties: Dict[str, Any], metadata: Dict[str, Any]
+):
+    """
+    Derive the deterministic UUID of a chunk from its source identity and content
+    hash, and add both to the properties stored alongside it.
+    Returns the UUID and the extended properties.
+    """
+    content_hash = hash_inputs(content)
+    source = source_id(metadata)
+    properties = {**properties, "content_hash": content_hash}
+    if source is not None:
+        properties["source_id"] = source
+    return object_uuid(source, content_hash), properties
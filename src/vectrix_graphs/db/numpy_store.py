@@ -0,0 +1,757 @@
+import asyncio
+import contextvars
+import copy
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from ..helpers.rate_limiter import INGESTION, with_priority
+from ..logger import setup_logger
+from ..metrics import VECTOR_DB_DURATION
+from .cache import QueryCache, cached_searches
+from .clients import ClientRegistry, clients
+from .embeddings import embed_multimodal, embed_texts
+from .ids import identify_chunk
+from .sqlite import EmbeddingCache
+from .weaviate import (
+    EMBED_BATCH_SIZE,
+    EMBED_CONCURRENCY,
+    SearchType,
+    _batched,
+    _document_pairs,
+    _log_throughput,
+)
+
+logger = setup_logger(name=__name__, level="INFO")
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "vectrix_graphs", "numpy_store"
+)
+# Cohere accepts at most 96 texts per embedding request
+TEXT_EMBED_BATCH_SIZE = 96
+# Collections of at least this many vectors are searched through an IVF index
+IVF_THRESHOLD = 20_000
+IVF_NPROBE = 8
+IVF_ITERATIONS = 10
+# Number of candidates taken from each side of a hybrid search before fusion
+HYBRID_CANDIDATES = 100
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _normalize(vectors) -> np.ndarray:
+    """Convert vectors to a float32 matrix of unit rows, so a dot product is a cosine"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the `k` highest scores, best first"""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def _atomic_write(path: str, write: Callable[[Any], None], mode: str = "wb"):
+    tmp = f"{path}.tmp"
+    with open(tmp, mode) as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+class _Snapshot:
+    """
+    Vectors, uuids and properties of a collection at one point in time. Snapshots
+    are never modified, writers build a new one. The BM25 and IVF indexes are
+    built lazily on the first search of a snapshot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        vectorizer: str,
+        vectors: np.ndarray,
+        uuids: List[str],
+        properties: List[Dict[str, Any]],
+    ):
+        self.name = name
+        self.vectorizer = vectorizer
+        self.vectors = vectors
+        self.uuids = uuids
+        self.properties = properties
+        self.rows = {uuid: i for i, uuid in enumerate(uuids)}
+        self._bm25 = None
+        self._ivf = None
+
+    def __len__(self):
+        return len(self.uuids)
+
+    def without(self, uuids: set) -> "_Snapshot":
+        """Return a snapshot without the given uuids"""
+        if not uuids & self.rows.keys():
+            return self
+        keep = np.array([uuid not in uuids for uuid in self.uuids], dtype=bool)
+        return _Snapshot(
+            self.name,
+            self.vectorizer,
+            self.vectors[keep],
+            [u for u, k in zip(self.uuids, keep) if k],
+            [p for p, k in zip(self.properties, keep) if k],
+        )
+
+    def text(self, properties: Dict[str, Any]) -> str:
+        if self.vectorizer == "cohere":
+            return properties.get("content", "")
+        return properties.get("text", "")
+
+    def bm25_index(self):
+        """Inverted index of term frequencies, built on first use"""
+        if self._bm25 is None:
+            postings = defaultdict(lambda: ([], []))
+            lengths = np.zeros(len(self.uuids), dtype=np.float32)
+            for row, properties in enumerate(self.properties):
+                tokens = _tokenize(self.text(properties))
+                lengths[row] = len(tokens)
+                for term, tf in Counter(tokens).items():
+                    postings[term][0].append(row)
+                    postings[term][1].append(tf)
+            postings = {
+                term: (np.array(rows), np.array(tfs, dtype=np.float32))
+                for term, (rows, tfs) in postings.items()
+            }
+            average = float(lengths.mean()) if len(lengths) else 0.0
+            self._bm25 = (postings, lengths, average or 1.0)
+        return self._bm25
+
+    def bm25_scores(self, query: str) -> np.ndarray:
+        postings, lengths, average = self.bm25_index()
+        scores = np.zeros(len(lengths), dtype=np.float32)
+        n = len(lengths)
+        for term in set(_tokenize(query)):
+            if term not in postings:
+                continue
+            rows, tfs = postings[term]
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[rows] / average)
+            scores[rows] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+        return scores
+
+    def ivf_index(self):
+        """
+        Coarse IVF partition: spherical k-means over sqrt(n) centroids. Returns the
+        centroids and, for every list, the rows assigned to it.
+        """
+        if self._ivf is None:
+            vectors = np.asarray(self.vectors)
+            n_lists = max(1, int(math.sqrt(len(vectors))))
+            rng = np.random.default_rng(0)
+            centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)]
+            for _ in range(IVF_ITERATIONS):
+                assignment = np.argmax(vectors @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, vectors)
+                empty = ~np.any(sums, axis=1)
+                sums[empty] = centroids[empty]
+                centroids = _normalize(sums)
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            lists = [np.flatnonzero(assignment == i) for i in range(n_lists)]
+            self._ivf = (centroids, lists)
+            logger.info(f"Built IVF index with {n_lists} lists for {self.name}")
+        return self._ivf
+
+
+class _Collection:
+    """
+    A named collection. Writers publish a new `_Snapshot` with a single assignment,
+    so searches that read `snapshot` once work on consistent vectors, uuids and
+    properties without holding the store lock.
+    """
+
+    def __init__(
+        self, name: str, vectorizer: str, vectors=None, uuids=None, props=None
+    ):
+        self.name = name
+        self.vectorizer = vectorizer
+        self.snapshot = _Snapshot(
+            name,
+            vectorizer,
+            vectors if vectors is not None else np.zeros((0, 0), np.float32),
+            uuids or [],
+            props or [],
+        )
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self.snapshot.vectors
+
+    @property
+    def uuids(self) -> List[str]:
+        return self.snapshot.uuids
+
+    @property
+    def properties(self) -> List[Dict[str, Any]]:
+        return self.snapshot.properties
+
+    @property
+    def rows(self) -> Dict[str, int]:
+        return self.snapshot.rows
+
+    def upsert(self, uuids: List[str], properties: List[Dict[str, Any]], vectors):
+        vectors = _normalize(vectors)
+        current = self.snapshot.without(set(uuids))
+        if len(current) > 0:
+            if vectors.shape[1] != current.vectors.shape[1]:
+                logger.error(
+                    f"Vector dimension {vectors.shape[1]} does not match "
+                    f"{self.name} ({current.vectors.shape[1]})"
+                )
+                raise ValueError(f"Vector dimension does not match {self.name}")
+            vectors = np.concatenate([current.vectors, vectors])
+        self.snapshot = _Snapshot(
+            self.name,
+            self.vectorizer,
+            vectors,
+            current.uuids + list(uuids),
+            current.properties + list(properties),
+        )
+
+    def delete(self, uuids: set):
+        self.snapshot = self.snapshot.without(uuids)
+
+
+class NumpyStore:
+    """
+    In-process vector database with the interface of `Weaviate`, for development,
+    tests and small single-tenant deployments that do not run a Weaviate server.
+
+    Vectors are stored as normalized float32 matrices, so cosine search is a single
+    matrix product. Collections are persisted to `path` (one directory per
+    collection with `vectors.npy` and `objects.json`) and memory-mapped when
+    loaded. Collections with at least `ivf_threshold` vectors are searched through
+    a coarse IVF partition, probing the `nprobe` closest lists.
+
+    Text collections ("cohere") are embedded client-side with the same Cohere model
+    as the Weaviate vectorizer, multi-modal collections ("voyage") with Voyage.
+    Both can be replaced with `embed_texts(texts, input_type)` and
+    `embed_multimodal(inputs, truncation)` callables, e.g. to run offline.
+
+    args:
+        path: directory of the store, ":memory:" to keep everything in memory
+        ivf_threshold: collection size from which the IVF index is used
+        nprobe: number of IVF lists searched per query
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        embed_texts: Optional[Callable[[List[str], str], List[List[float]]]] = None,
+        embed_multimodal: Optional[
+            Callable[[List[List[Any]], bool], List[List[float]]]
+        ] = None,
+        embedding_cache=None,
+        registry: ClientRegistry | None = None,
+        ivf_threshold: int = IVF_THRESHOLD,
+        nprobe: int = IVF_NPROBE,
+        query_cache: QueryCache | None = None,
+    ):
+        self.path = path or os.environ.get("NUMPY_STORE_PATH", DEFAULT_STORE_PATH)
+        self.registry = registry or clients
+        self._embedding_cache = embedding_cache
+        self._query_cache = query_cache
+        self._embed_texts_fn = embed_texts
+        self._embed_multimodal_fn = embed_multimodal
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.collection: Optional[_Collection] = None
+        # Shared by every copy returned by `with_collection`
+        self._collections: Dict[str, _Collection] = {}
+        self._lock = threading.RLock()
+        if self.path != ":memory:":
+            os.makedirs(self.path, exist_ok=True)
+
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        return self._embedding_cache or self.registry.embedding_cache()
+
+    @property
+    def query_cache(self) -> QueryCache:
+        return self._query_cache or self.registry.query_cache()
+
+    def _embed_texts(self, texts: List[str], input_type: str) -> List[List[float]]:
+        if self._embed_texts_fn is not None:
+            return self._embed_texts_fn(texts, input_type)
+        return embed_texts(self.registry, self.embedding_cache, texts, input_type)
+
+    def _embed_multimodal(
+        self, inputs: List[List[Any]], truncation: bool
+    ) -> List[List[float]]:
+        if self._embed_multimodal_fn is not None:
+            return self._embed_multimodal_fn(inputs, truncation)
+        return embed_multimodal(self.registry, self.embedding_cache, inputs, truncation)
+
+    def _embed_queries(self, queries: List[str], vectorizer: str) -> np.ndarray:
+        if vectorizer == "voyage":
+            vectors = self._embed_multimodal([[q] for q in queries], truncation=False)
+        else:
+            vectors = self._embed_texts(queries, "search_query")
+        return _normalize(vectors)
+
+    # Persistence
+
+    def _collection_dir(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self, name: str) -> Optional[_Collection]:
+        if self.path == ":memory:":
+            return None
+        directory = self._collection_dir(name)
+        objects_path = os.path.join(directory, "objects.json")
+        if not os.path.exists(objects_path):
+            return None
+        with open(objects_path) as f:
+            objects = json.load(f)
+        vectors = np.zeros((0, 0), np.float32)
+        if objects["uuids"]:
+            vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        return _Collection(
+            name,
+            objects["vectorizer"],
+            vectors,
+            objects["uuids"],
+            objects["properties"],
+        )
+
+    def _save(self, collection: _Collection):
+        if self.path == ":memory:":
+            return
+        directory = self._collection_dir(collection.name)
+        os.makedirs(directory, exist_ok=True)
+        snapshot = collection.snapshot
+        objects = {
+            "vectorizer": collection.vectorizer,
+            "uuids": snapshot.uuids,
+            "properties": snapshot.properties,
+        }
+        _atomic_write(
+            os.path.join(directory, "vectors.npy"),
+            lambda f: np.save(f, np.asarray(snapshot.vectors)),
+        )
+        _atomic_write(
+            os.path.join(directory, "objects.json"),
+            lambda f: json.dump(objects, f, default=str),
+            mode="w",
+        )
+
+    def _get(self, name: str) -> Optional[_Collection]:
+        with self._lock:
+            if name not in self._collections:
+                collection = self._load(name)
+                if collection is None:
+                    return None
+                self._collections[name] = collection
+            return self._collections[name]
+
+    # Collections
+
+    def set_collection(self, name: str):
+        """Set the collection"""
+        collection = self._get(name)
+        if collection is None:
+            logger.error(f"{name} collection does not exist")
+            raise ValueError(f"{name} collection does not exist")
+        self.collection = collection
+
+    def with_collection(self, name: str):
+        """Return a copy bound to the given collection, sharing the stored data"""
+        bound = copy.copy(self)
+        bound.set_collection(name)
+        return bound
+
+    def create_collection(self, name: str, vectorizer_config="cohere"):
+        """Create a new collection, reusing it if it already exists"""
+        with self._lock:
+            collection = self._get(name)
+            if collection is not None:
+                logger.warning(f"{name} collection already exists")
+            else:
+                collection = _Collection(name, vectorizer_config)
+                self._collections[name] = collection
+                self._save(collection)
+                logger.info(f"{name} collection created")
+        self.collection = collection
+
+    def remove_collection(self, name: str):
+        """Remove a collection"""
+        with self._lock:
+            if self._get(name) is None:
+                logger.warning(f"{name} collection does not exist")
+                return
+            del self._collections[name]
+            self.query_cache.invalidate(name)
+            if self.path != ":memory:":
+                shutil.rmtree(self._collection_dir(name), ignore_errors=True)
+            logger.info(f"{name} collection deleted")
+
+    def list_collections(self):
+        """List all collections with their vectorizer and size"""
+        names = set(self._collections)
+        if self.path != ":memory:":
+            names.update(
+                name
+                for name in os.listdir(self.path)
+                if os.path.exists(os.path.join(self.path, name, "objects.json"))
+            )
+        return {
+            name: {"vectorizer": collection.vectorizer, "count": len(collection)}
+            for name in sorted(names)
+            if (collection := self._get(name)) is not None
+        }
+
+    def close(self):
+        """Release the loaded collections, they are reloaded from disk on next use"""
+        with self._lock:
+            self._collections.clear()
+        self.collection = None
+
+    # Ingestion
+
+    def _upsert(self, identified: List[Tuple[str, Dict[str, Any]]], vectors):
+        """Write a batch of (uuid, properties) pairs with their vectors"""
+        with self._lock:
+            self.collection.upsert(
+                [uuid for uuid, _ in identified],
+                [properties for _, properties in identified],
+                vectors,
+            )
+
+    def _delete_stale(self, seen: Dict[str, set]) -> int:
+        """Delete objects of the seen sources that were not part of this import"""
+        with self._lock:
+            snapshot = self.collection.snapshot
+            stale = {
+                uuid
+                for uuid, properties in zip(snapshot.uuids, snapshot.properties)
+                if properties.get("source_id") in seen
+                and uuid not in seen[properties["source_id"]]
+            }
+            if stale:
+                self.collection.delete(stale)
+        return len(stale)
+
+    def _new_chunks(self, batch_documents, batch_metadatas, seen: Dict[str, set]):
+        """Identify a batch of multi-modal chunks and drop the ones already stored"""
+        new_documents, new_identified = [], []
+        for document, metadata in zip(batch_documents, batch_metadatas):
+            uuid, properties = identify_chunk(document, metadata, metadata)
+            if "source_id" in properties:
+                seen[properties["source_id"]].add(uuid)
+            if uuid not in self.collection.rows:
+                new_documents.append(document)
+                new_identified.append((uuid, properties))
+        return new_documents, new_identified
+
+    @VECTOR_DB_DURATION.time(backend="numpy", operation="insert")
+    @with_priority(INGESTION)
+    def add_documents(self, documents: List[Document], delete_stale: bool = True):
+        """
+        This function adds documents to the vector database, skipping unchanged
+        documents and removing stale ones like `Weaviate.add_documents`.
+        """
+        started = time.perf_counter()
+        count = skipped = 0
+        seen = defaultdict(set)
+
+        for i in range(0, len(documents), TEXT_EMBED_BATCH_SIZE):
+            identified = []
+            for doc in documents[i : i + TEXT_EMBED_BATCH_SIZE]:
+                uuid, properties = identify_chunk(
+                    [doc.page_content],
+                    {"metadata": doc.metadata, "content": doc.page_content},
+                    doc.metadata,
+                )
+                if "source_id" in properties:
+                    seen[properties["source_id"]].add(uuid)
+                if uuid in self.collection.rows:
+                    skipped += 1
+                else:
+                    identified.append((uuid, properties))
+            if identified:
+                vectors = self._embed_texts(
+                    [properties["content"] for _, properties in identified],
+                    "search_document",
+                )
+                self._upsert(identified, vectors)
+                count += len(identified)
+
+        deleted = self._delete_stale(seen) if delete_stale else 0
+        self._save(self.collection)
+        self.query_cache.invalidate(self.collection.name)
+        _log_throughput(count, started, skipped, deleted)
+
+    @VECTOR_DB_DURATION.time(backend="numpy", operation="insert")
+    @with_priority(INGESTION)
+    def add_multi_modal_documents(
+        self,
+        documents: List[List[Any]] | Iterable[Tuple[List[Any], Dict[str, Any]]],
+        metadatas: List[Dict[str, Any]] | None = None,
+        batch_size: int = EMBED_BATCH_SIZE,
+        concurrency: int = EMBED_CONCURRENCY,
+        delete_stale: bool = True,
+    ):
+        """
+        This function adds multi-modal documents to the vector database, with the
+        same pipelined embedding as `Weaviate.add_multi_modal_documents`.
+        """
+        pairs = _document_pairs(documents, metadatas)
+
+        started = time.perf_counter()
+        count = skipped = 0
+        seen = defaultdict(set)
+        in_flight = {}
+
+        def insert(done):
+            nonlocal count
+            for future in done:
+                identified = in_flight.pop(future)
+                self._upsert(identified, future.result())
+                count += len(identified)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for batch_documents, batch_metadatas in _batched(pairs, batch_size):
+                new_documents, identified = self._new_chunks(
+                    batch_documents, batch_metadatas, seen
+                )
+                skipped += len(batch_documents) - len(new_documents)
+                if not new_documents:
+                    continue
+                if len(in_flight) >= concurrency:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    insert(done)
+                # Workers keep the ingestion priority of this call
+                future = pool.submit(
+                    contextvars.copy_context().run,
+                    self._embed_multimodal,
+                    new_documents,
+                    truncation=True,
+                )
+                in_flight[future] = identified
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                insert(done)
+
+        deleted = self._delete_stale(seen) if delete_stale else 0
+        self._save(self.collection)
+        self.query_cache.invalidate(self.collection.name)
+        _log_throughput(count, started, skipped, deleted)
+
+    # Search
+
+    def _vector_scores(self, snapshot: _Snapshot, vector: np.ndarray):
+        """Cosine similarities of the candidate rows, probing the IVF index if used"""
+        if len(snapshot) < self.ivf_threshold:
+            return np.arange(len(snapshot)), snapshot.vectors @ vector
+        centroids, lists = snapshot.ivf_index()
+        probes = _top_k(centroids @ vector, self.nprobe)
+        rows = np.concatenate([lists[i] for i in probes])
+        return rows, snapshot.vectors[rows] @ vector
+
+    def _hybrid(
+        self,
+        snapshot: _Snapshot,
+        query: str,
+        vector: np.ndarray,
+        k: int,
+        alpha: float,
+        fusion_type: str,
+    ) -> List[Tuple[int, float]]:
+        """Fuse BM25 and vector results like Weaviate's hybrid search"""
+        rows, similarities = self._vector_scores(snapshot, vector)
+        top = _top_k(similarities, HYBRID_CANDIDATES)
+        vector_hits = dict(zip(rows[top].tolist(), similarities[top].tolist()))
+
+        bm25 = snapshot.bm25_scores(query)
+        top = [row for row in _top_k(bm25, HYBRID_CANDIDATES) if bm25[row] > 0]
+        keyword_hits = {int(row): float(bm25[row]) for row in top}
+
+        fused = defaultdict(float)
+        for weight, hits in ((alpha, vector_hits), (1 - alpha, keyword_hits)):
+            if not hits:
+                continue
+            if fusion_type == "ranked":
+                for rank, row in enumerate(hits):
+                    fused[row] += weight / (rank + 60)
+            else:
+                low, high = min(hits.values()), max(hits.values())
+                for row, score in hits.items():
+                    relative = (score - low) / (high - low) if high > low else 1.0
+                    fused[row] += weight * relative
+        return sorted(fused.items(), key=lambda item: -item[1])[:k]
+
+    def _documents(
+        self, snapshot: _Snapshot, hits: List[Tuple[int, float]], key: str
+    ) -> List[Document]:
+        documents = []
+        for row, value in hits:
+            properties = snapshot.properties[row]
+            if snapshot.vectorizer == "cohere":
+                metadata = dict(properties.get("metadata", {}))
+                metadata["uuid"] = snapshot.uuids[row]
+                content = properties.get("content", "")
+            else:
+                metadata = {k: v for k, v in properties.items() if k != "text"}
+                content = properties["text"]
+            metadata[key] = value
+            documents.append(Document(page_content=content, metadata=metadata))
+        return documents
+
+    @VECTOR_DB_DURATION.time(backend="numpy", operation="query")
+    def _search(
+        self,
+        snapshot: _Snapshot,
+        query: str,
+        vector: np.ndarray,
+        k: int,
+        type: SearchType,
+        alpha: float,
+        fusion_type: str,
+    ) -> List[Document]:
+        if len(snapshot) == 0:
+            return []
+        if type == "hybrid":
+            hits = self._hybrid(snapshot, query, vector, k, alpha, fusion_type)
+            return self._documents(snapshot, hits, "score")
+        rows, similarities = self._vector_scores(snapshot, vector)
+        top = _top_k(similarities, k)
+        hits = [(int(rows[i]), 1.0 - float(similarities[i])) for i in top]
+        return self._documents(snapshot, hits, "cosine_distance")
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 3,
+        type: SearchType = "text",
+        alpha: float = 0.5,
+        fusion_type: Literal["ranked", "relative_score"] = "relative_score",
+        vectorizer: Literal["cohere", "voyage"] = "cohere",
+    ):
+        """
+        Search the collection and return Langchain Documents with cosine distances,
+        or fused scores for `type="hybrid"`, like `Weaviate.similarity_search`.
+        The query is embedded with the vectorizer of the collection.
+        """
+        return self.similarity_search_batch(
+            [query], k, type, alpha, fusion_type, vectorizer
+        )[0]
+
+    def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = 3,
+        type: SearchType = "text",
+        alpha: float = 0.5,
+        fusion_type: Literal["ranked", "relative_score"] = "relative_score",
+        vectorizer: Literal["cohere", "voyage"] = "cohere",
+    ) -> List[List[Document]]:
+        """
+        Run several similarity searches at once with a single embedding request for
+        the queries missing from the query cache. Returns one list of Documents per query, in the order of `queries`.
+        """
+        if not queries:
+            return []
+        collection = self.collection
+        params = dict(
+            k=k, type=type, alpha=alpha, fusion_type=fusion_type, vectorizer=vectorizer
+        )
+
+        def search(missing):
+            vectors = self._embed_queries(missing, collection.vectorizer)
+            # Every query of the batch sees the same version of the collection
+            snapshot = collection.snapshot
+            return [
+                self._search(snapshot, query, vector, k, type, alpha, fusion_type)
+                for query, vector in zip(missing, vectors)
+            ]
+
+        return cached_searches(
+            self.query_cache, collection.name, queries, params, search
+        )
+
+
+class AsyncNumpyStore:
+    """
+    Asyncio counterpart of `NumpyStore` with the interface of `AsyncWeaviate`.
+    Searches and writes run in a worker thread, so they never block the event loop.
+    """
+
+    def __init__(self, store: Optional[NumpyStore] = None, **kwargs):
+        self.store = store or NumpyStore(**kwargs)
+
+    async def set_collection(self, name: str):
+        """Set the collection"""
+        await asyncio.to_thread(self.store.set_collection, name)
+
+    async def with_collection(self, name: str):
+        """Return a copy bound to the given collection, sharing the stored data"""
+        return AsyncNumpyStore(
+            await asyncio.to_thread(self.store.with_collection, name)
+        )
+
+    async def create_collection(self, name: str, vectorizer_config="cohere"):
+        """Create a new collection, reusing it if it already exists"""
+        await asyncio.to_thread(self.store.create_collection, name, vectorizer_config)
+
+    async def add_documents(self, documents: List[Document], delete_stale: bool = True):
+        """Add documents like `NumpyStore.add_documents`"""
+        await asyncio.to_thread(self.store.add_documents, documents, delete_stale)
+
+    async def add_multi_modal_documents(self, documents, metadatas=None, **kwargs):
+        """Add multi-modal documents like `NumpyStore.add_multi_modal_documents`"""
+        await asyncio.to_thread(
+            self.store.add_multi_modal_documents, documents, metadatas, **kwargs
+        )
+
+    async def similarity_search(self, query: str, **kwargs):
+        """Search the collection like `NumpyStore.similarity_search`"""
+        return await asyncio.to_thread(self.store.similarity_search, query, **kwargs)
+
+    async def similarity_search_batch(self, queries: List[str], **kwargs):
+        """Search the collection like `NumpyStore.similarity_search_batch`"""
+        return await asyncio.to_thread(
+            self.store.similarity_search_batch, queries, **kwargs
+        )
+
+    async def remove_collection(self, name: str):
+        """Remove a collection"""
+        await asyncio.to_thread(self.store.remove_collection, name)
+
+    async def list_collections(self):
+        """List all collections with their vectorizer and size"""
+        return await asyncio.to_thread(self.store.list_collections)
+
+    async def close(self):
+        """Release the loaded collections"""
+        self.store.close()
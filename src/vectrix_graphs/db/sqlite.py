@@ -0,0 +1,477 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.types import TASKS
+
+from ..logger import setup_logger
+from .ids import hash_inputs
+
+logger = setup_logger(name=__name__, level="INFO")
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "vectrix_graphs", "embeddings.sqlite3"
+)
+DEFAULT_CHECKPOINT_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "vectrix_graphs", "checkpoints.sqlite3"
+)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache for embedding vectors backed by SQLite.
+
+    Entries are keyed by a hash of the input content, the embedding model and the
+    truncation flag. When the cache grows beyond `max_entries` or `max_bytes`, the
+    least recently used entries are evicted.
+
+    args:
+        path: location of the SQLite file, ":memory:" for a process-local cache
+        max_entries: maximum number of vectors to keep
+        max_bytes: maximum total size of the stored vectors, unbounded if None
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 100_000,
+        max_bytes: Optional[int] = None,
+    ):
+        self.path = path or os.environ.get("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = _connect(self.path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access "
+            "ON embeddings (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key(inputs: Sequence[Any], model: str, truncation: bool) -> str:
+        """Build the cache key for a single embedding input"""
+        return f"{model}:{int(truncation)}:{hash_inputs(inputs)}"
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for the given keys, skipping unknown keys"""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, Sequence[float]]]):
+        """Store vectors in the cache and evict the least recently used entries"""
+        now = time.time()
+        rows = []
+        for key, vector in items:
+            blob = array("f", vector).tobytes()
+            rows.append((key, blob, len(blob), now))
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings"
+        ).fetchone()
+
+        excess = max(0, count - self.max_entries)
+        if self.max_bytes is not None and total_bytes > self.max_bytes:
+            # Evict by the average entry size so a single statement suffices
+            average = total_bytes / count
+            excess = max(excess, int((total_bytes - self.max_bytes) / average) + 1)
+
+        if excess:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+            logger.debug(f"Evicted {excess} embeddings from the cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size of the cache"""
+        with self._lock:
+            count, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total_bytes,
+        }
+
+    def clear(self):
+        """Remove all cached vectors"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying SQLite connection"""
+        self._conn.close()
+
+
+class SqliteCheckpointer(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpointer persisting the graph state of every thread in SQLite.
+
+    Conversations are resumed from their thread id, so a client only sends the
+    new message of a turn. Only the latest `max_checkpoints` checkpoints of the
+    root graph are kept per thread, older ones and those of the subgraph runs
+    before them are pruned on every write.
+
+    args:
+        path: location of the SQLite file, ":memory:" for a process-local store
+        max_checkpoints: root graph checkpoints kept per thread
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_checkpoints: int = 50,
+        serde: Optional[SerializerProtocol] = None,
+    ):
+        super().__init__(serde=serde)
+        self.path = path or os.environ.get("CHECKPOINT_PATH", DEFAULT_CHECKPOINT_PATH)
+        self.max_checkpoints = max_checkpoints
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, "
+            "checkpoint_id TEXT NOT NULL, parent_id TEXT, "
+            "type TEXT NOT NULL, checkpoint BLOB NOT NULL, "
+            "metadata_type TEXT NOT NULL, metadata BLOB NOT NULL, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id));"
+            "CREATE TABLE IF NOT EXISTS writes ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, "
+            "checkpoint_id TEXT NOT NULL, task_id TEXT NOT NULL, idx INTEGER NOT NULL, "
+            "channel TEXT NOT NULL, type TEXT NOT NULL, value BLOB NOT NULL, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx));"
+        )
+        self._conn.commit()
+
+    def _writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str):
+        return self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        sends = []
+        if parent_id:
+            sends = [
+                self.serde.loads_typed((t, v))
+                for _, channel, t, v in self._writes(
+                    thread_id, checkpoint_ns, parent_id
+                )
+                if channel == TASKS
+            ]
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **self.serde.loads_typed((type_, checkpoint)),
+                "pending_sends": sends,
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": parent_id,
+                }
+            }
+            if parent_id
+            else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((t, v)))
+                for task_id, channel, t, v in self._writes(
+                    thread_id, checkpoint_ns, checkpoint_id
+                )
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Return the requested checkpoint, or the latest one of the thread"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT checkpoint_id, parent_id, type, checkpoint, metadata_type, "
+            "metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        with self._lock:
+            row = self._conn.execute(
+                query + " ORDER BY checkpoint_id DESC LIMIT 1", params
+            ).fetchone()
+            return self._tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints, newest first"""
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, "
+            "checkpoint, metadata_type, metadata FROM checkpoints WHERE 1 = 1"
+        )
+        params = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        with self._lock:
+            rows = self._conn.execute(
+                query + " ORDER BY checkpoint_id DESC", params
+            ).fetchall()
+            tuples = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(tuples) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[4], row[5]))
+                    if any(metadata.get(k) != v for k, v in filter.items()):
+                        continue
+                tuples.append(self._tuple(thread_id, checkpoint_ns, row))
+        yield from tuples
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint and prune the oldest ones of the thread"""
+        checkpoint = checkpoint.copy()
+        checkpoint.pop("pending_sends", None)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(metadata)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    blob,
+                    metadata_type,
+                    metadata_blob,
+                ),
+            )
+            if checkpoint_ns == "":
+                self._prune(thread_id)
+            self._conn.commit()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def _prune(self, thread_id: str):
+        # Checkpoint ids are time ordered, subgraph checkpoints share the cutoff
+        cutoff = self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = '' "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, self.max_checkpoints - 1),
+        ).fetchone()
+        if cutoff:
+            for table in ("checkpoints", "writes"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_id < ?",
+                    (thread_id, cutoff[0]),
+                )
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+    ) -> None:
+        """Store the pending writes of a task"""
+        configurable = config["configurable"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    configurable["thread_id"],
+                    configurable["checkpoint_ns"],
+                    configurable["checkpoint_id"],
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    type_,
+                    blob,
+                )
+            )
+        # Special writes (errors, interrupts) are replaced, regular ones kept
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO writes "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def delete_thread(self, thread_id: str):
+        """Remove every checkpoint of a thread"""
+        with self._lock:
+            for table in ("checkpoints", "writes"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,)
+                )
+            self._conn.commit()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in tuples:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id)
+
+    # Same monotonically increasing channel versions as the in-memory saver
+    get_next_version = MemorySaver.get_next_version
+
+    def close(self):
+        """Close the underlying SQLite connection"""
+        self._conn.close()
@@ -1,30 +1,158 @@
-import os
-from typing import Any, Dict, List, Literal
+import asyncio
+import contextvars
+import copy
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Tuple
 
-import cohere
-import voyageai
-import weaviate
 from langchain_core.documents import Document
-from weaviate.classes.config import Configure
-from weaviate.classes.query import MetadataQuery
+from weaviate.classes.config import Configure, DataType, Property, Tokenization
+from weaviate.classes.data import DataObject
+from weaviate.classes.query import Filter, HybridFusion, MetadataQuery
+from weaviate.exceptions import WeaviateQueryError
 
+from ..helpers.rate_limiter import INGESTION, with_priority
 from ..logger import setup_logger
+from ..metrics import VECTOR_DB_DURATION
+from .cache import QueryCache, acached_searches, cached_searches
+from .clients import ClientRegistry, clients
+from .embeddings import aembed_multimodal, aembed_texts, embed_multimodal, embed_texts
+from .ids import identify_chunk
+from .sqlite import EmbeddingCache
 
 logger = setup_logger(name=__name__, level="INFO")
 
+# Multi-modal ingestion pipeline settings
+EMBED_BATCH_SIZE = 100
+EMBED_CONCURRENCY = 4
+# Page size when listing or deleting objects by id
+ID_PAGE_SIZE = 1000
+# Identity properties of the chunks, matched as whole values and never vectorized
+ID_PROPERTIES = [
+    Property(
+        name=name,
+        data_type=DataType.TEXT,
+        tokenization=Tokenization.FIELD,
+        skip_vectorization=True,
+    )
+    for name in ("content_hash", "source_id")
+]
+
+FUSION_TYPES = {
+    "ranked": HybridFusion.RANKED,
+    "relative_score": HybridFusion.RELATIVE_SCORE,
+}
+SearchType = Literal["text", "multimodal", "hybrid"]
+
+
+def _text_documents(objects) -> List[Document]:
+    """Convert Weaviate objects of a text collection into Langchain Documents"""
+    documents = []
+    for obj in objects:
+        metadata = obj.properties.get("metadata", {})
+        metadata["uuid"] = str(obj.uuid)
+        if obj.metadata.distance is not None:
+            metadata["cosine_distance"] = obj.metadata.distance
+        if obj.metadata.score is not None:
+            metadata["score"] = obj.metadata.score
+
+        doc = Document(
+            page_content=obj.properties.get("content", ""), metadata=metadata
+        )
+        documents.append(doc)
+    return documents
+
+
+def _multimodal_documents(objects) -> List[Document]:
+    """Convert Weaviate objects of a multi-modal collection into Langchain Documents"""
+    documents = []
+    for obj in objects:
+        metadata = obj.properties.copy()
+        metadata.pop("text", None)
+        if obj.metadata.distance is not None:
+            metadata["cosine_distance"] = obj.metadata.distance
+        if obj.metadata.score is not None:
+            metadata["score"] = obj.metadata.score
+        content = obj.properties["text"]
+
+        documents.append(Document(page_content=content, metadata=metadata))
+    return documents
+
+
+def _batched(
+    pairs: Iterable[Tuple[List[Any], Dict[str, Any]]], size: int
+) -> Iterator[Tuple[List[List[Any]], List[Dict[str, Any]]]]:
+    """Lazily group (document, metadata) pairs into batches of `size`"""
+    batch_documents, batch_metadatas = [], []
+    for document, metadata in pairs:
+        batch_documents.append(document)
+        batch_metadatas.append(metadata)
+        if len(batch_documents) == size:
+            yield batch_documents, batch_metadatas
+            batch_documents, batch_metadatas = [], []
+    if batch_documents:
+        yield batch_documents, batch_metadatas
+
+
+def _document_pairs(documents, metadatas):
+    """
+    Normalize the input of `add_multi_modal_documents` into (document, metadata)
+    pairs. Without metadatas, `documents` is an iterable of pairs itself, e.g. the
+    generator returned by `iter_multi_modal_extraction`.
+    """
+    if metadatas is None:
+        return documents
+    if len(documents) != len(metadatas):
+        logger.error("The number of documents and metadatas must be the same")
+        raise ValueError("The number of documents and metadatas must be the same")
+    logger.info(f"Adding {len(documents)} multi-modal documents to the vector database")
+    return zip(documents, metadatas)
+
+
+def _batch_search_setup(type: str, vectorizer: str):
+    """Return the embedding type and the result parser for a batched search"""
+    if type == "hybrid":
+        type = "multimodal" if vectorizer == "voyage" else "text"
+    to_documents = _text_documents if type == "text" else _multimodal_documents
+    return type, to_documents
+
+
+def _log_throughput(count: int, started: float, skipped: int = 0, deleted: int = 0):
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"Added {count} documents to the vector database "
+        f"in {elapsed:.1f}s ({rate:.1f} chunks/s), "
+        f"{skipped} unchanged, {deleted} stale removed"
+    )
+
 
 class Weaviate:
-    def __init__(self, embeddings_model=None):
-        """Initialize Weaviate vector database connection"""
-        self.co = cohere.ClientV2()
+    def __init__(
+        self,
+        embeddings_model=None,
+        embedding_cache=None,
+        registry: ClientRegistry | None = None,
+        query_cache: QueryCache | None = None,
+    ):
+        """Initialize Weaviate vector database on top of the shared clients"""
+        self.registry = registry or clients
+        self._embedding_cache = embedding_cache
+        self._query_cache = query_cache
 
-        if os.environ["ENV"] == "local":
-            try:
-                self.client = weaviate.connect_to_local()
-            except Exception:
-                self.client = weaviate.connect_to_local(
-                    host="host.docker.internal",
-                )
+    @property
+    def client(self):
+        """The shared Weaviate client, connected on first use"""
+        return self.registry.weaviate()
+
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        return self._embedding_cache or self.registry.embedding_cache()
+
+    @property
+    def query_cache(self) -> QueryCache:
+        return self._query_cache or self.registry.query_cache()
 
     def set_collection(self, name: str):
         """Set the Weaviate collection"""
@@ -34,6 +162,16 @@ class Weaviate:
             logger.error(f"{name} collection does not exist")
             raise ValueError(f"{name} collection does not exist")
 
+    def with_collection(self, name: str):
+        """
+        Return a copy bound to the given collection. The copy shares the client and
+        the embedding cache, so concurrent requests can target different collections
+        without racing on `set_collection`.
+        """
+        bound = copy.copy(self)
+        bound.set_collection(name)
+        return bound
+
     def create_collection(self, name: str, vectorizer_config="cohere"):
         """Create a new Weaviate collection"""
         if vectorizer_config == "cohere":
@@ -42,6 +180,7 @@ class Weaviate:
                 vectorizer_config=Configure.Vectorizer.text2vec_cohere(
                     model="embed-multilingual-v3.0"
                 ),
+                properties=ID_PROPERTIES,
             )
             self.collection = self.client.collections.get(name)
             logger.info(f"{name} collection created")
@@ -50,6 +189,7 @@ class Weaviate:
                 self.client.collections.create(
                     name=name,
                     vectorizer_config=Configure.Vectorizer.none(),
+                    properties=ID_PROPERTIES,
                 )
                 try:
                     self.collection = self.client.collections.get(name)
@@ -61,106 +201,334 @@ class Weaviate:
                 self.collection = self.client.collections.get(name)
                 logger.warning(f"{name} collection already exists")
 
-    def add_documents(self, documents: List[Document]):
+    def _embed_multimodal(
+        self, inputs: List[List[Any]], truncation: bool
+    ) -> List[List[float]]:
+        return embed_multimodal(self.registry, self.embedding_cache, inputs, truncation)
+
+    def _embed_queries(
+        self, queries: List[str], type: Literal["text", "multimodal"]
+    ) -> List[List[float]]:
+        """Embed all queries in a single request, matching the collection's vectorizer"""
+        if type == "multimodal":
+            return self._embed_multimodal([[q] for q in queries], truncation=False)
+        return embed_texts(self.registry, self.embedding_cache, queries)
+
+    def _existing_uuids(self, uuids: List[str]) -> set:
+        """Return which of the given object UUIDs are already stored"""
+        if not uuids:
+            return set()
+        results = self.collection.query.fetch_objects(
+            filters=Filter.by_id().contains_any(uuids),
+            limit=len(uuids),
+            return_properties=[],
+        )
+        return {str(obj.uuid) for obj in results.objects}
+
+    def _source_uuids(self, source: str) -> List[str]:
+        """List the UUIDs of every object stored for a source"""
+        uuids = []
+        offset = 0
+        while True:
+            try:
+                results = self.collection.query.fetch_objects(
+                    filters=Filter.by_property("source_id").equal(source),
+                    limit=ID_PAGE_SIZE,
+                    offset=offset,
+                    return_properties=[],
+                )
+            except WeaviateQueryError:
+                # The property does not exist yet in a fresh collection
+                return uuids
+            uuids.extend(str(obj.uuid) for obj in results.objects)
+            if len(results.objects) < ID_PAGE_SIZE:
+                return uuids
+            offset += ID_PAGE_SIZE
+
+    def _delete_stale(self, seen: Dict[str, set]) -> int:
+        """Delete objects of the seen sources that were not part of this import"""
+        stale = [
+            uuid
+            for source, keep in seen.items()
+            for uuid in self._source_uuids(source)
+            if uuid not in keep
+        ]
+        for i in range(0, len(stale), ID_PAGE_SIZE):
+            self.collection.data.delete_many(
+                where=Filter.by_id().contains_any(stale[i : i + ID_PAGE_SIZE])
+            )
+        return len(stale)
+
+    @VECTOR_DB_DURATION.time(backend="weaviate", operation="insert")
+    @with_priority(INGESTION)
+    def add_documents(self, documents: List[Document], delete_stale: bool = True):
         """
         This function adds documents to the vector database.
+
+        Objects get deterministic UUIDs derived from their source and content, so
+        unchanged documents are skipped before they are vectorized. By default,
+        objects of the imported sources that are no longer part of them, such as
+        old versions of changed chunks, are removed: every source must be imported
+        completely in one call. Other sources are never touched.
         """
+        started = time.perf_counter()
+        count = skipped = 0
+        seen = defaultdict(set)
+
         with self.collection.batch.dynamic() as batch:
-            for doc in documents:
-                batch.add_object(
-                    properties={
-                        "metadata": doc.metadata,
-                        "content": doc.page_content,
-                    }
-                )
+            for i in range(0, len(documents), ID_PAGE_SIZE):
+                identified = [
+                    identify_chunk(
+                        [doc.page_content],
+                        {"metadata": doc.metadata, "content": doc.page_content},
+                        doc.metadata,
+                    )
+                    for doc in documents[i : i + ID_PAGE_SIZE]
+                ]
+                existing = self._existing_uuids([uuid for uuid, _ in identified])
+                for uuid, properties in identified:
+                    if "source_id" in properties:
+                        seen[properties["source_id"]].add(uuid)
+                    if uuid in existing:
+                        skipped += 1
+                        continue
+                    batch.add_object(properties=properties, uuid=uuid)
+                    count += 1
 
-        logger.info(f"Added {len(documents)} documents to the vector database")
+        deleted = self._delete_stale(seen) if delete_stale else 0
+        self.query_cache.invalidate(self.collection.name)
+        _log_throughput(count, started, skipped, deleted)
 
+    @VECTOR_DB_DURATION.time(backend="weaviate", operation="insert")
+    @with_priority(INGESTION)
     def add_multi_modal_documents(
-        self, documents: List[List[Any]], metadatas: List[Dict[str, Any]]
+        self,
+        documents: List[List[Any]] | Iterable[Tuple[List[Any], Dict[str, Any]]],
+        metadatas: List[Dict[str, Any]] | None = None,
+        batch_size: int = EMBED_BATCH_SIZE,
+        concurrency: int = EMBED_CONCURRENCY,
+        delete_stale: bool = True,
     ):
         """
         This function adds multi-modal documents to the vector database.
+
+        Embedding and insertion are pipelined: up to `concurrency` embedding requests
+        of `batch_size` documents are in flight at once, and every batch is written
+        as soon as its vectors arrive. Memory is bounded by the pipeline depth.
+
+        `documents` is either a list matching `metadatas`, or an iterable of
+        (document, metadata) pairs such as `iter_multi_modal_extraction(path)`,
+        which lets extraction overlap with embedding and insertion.
+
+        Like `add_documents`, chunks get deterministic UUIDs: unchanged chunks are
+        skipped before embedding and, unless `delete_stale` is False, chunks that
+        changed or disappeared from their source are removed.
         """
-        logger.info(
-            f"Adding {len(documents)} multi-modal documents to the vector database"
-        )
-        if len(documents) != len(metadatas):
-            logger.error("The number of documents and metadatas must be the same")
-            raise ValueError("The number of documents and metadatas must be the same")
+        pairs = _document_pairs(documents, metadatas)
 
-        vo = voyageai.Client()
+        started = time.perf_counter()
+        count = skipped = 0
+        seen = defaultdict(set)
+        in_flight = {}
 
-        # Initialize a list to store all embeddings
-        all_embeddings = []
+        def insert(done):
+            nonlocal count
+            for future in done:
+                identified = in_flight.pop(future)
+                for (uuid, properties), vector in zip(identified, future.result()):
+                    batch.add_object(properties=properties, vector=vector, uuid=uuid)
+                count += len(identified)
 
-        # Process this in chunks for 100 documents at a time
-        for i in range(0, len(documents), 100):
-            result = vo.multimodal_embed(
-                inputs=documents[i : i + 100],
-                model="voyage-multimodal-3",
-                truncation=True,
-            )
-            all_embeddings.extend(result.embeddings)
+        with (
+            ThreadPoolExecutor(max_workers=concurrency) as pool,
+            self.collection.batch.dynamic() as batch,
+        ):
+            for batch_documents, batch_metadatas in _batched(pairs, batch_size):
+                new_documents, identified = self._new_chunks(
+                    batch_documents, batch_metadatas, seen
+                )
+                skipped += len(batch_documents) - len(new_documents)
+                if not new_documents:
+                    continue
+                if len(in_flight) >= concurrency:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    insert(done)
+                # Workers keep the ingestion priority of this call
+                future = pool.submit(
+                    contextvars.copy_context().run,
+                    self._embed_multimodal,
+                    new_documents,
+                    truncation=True,
+                )
+                in_flight[future] = identified
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                insert(done)
 
-        logger.info(f"Embeddings created for {len(all_embeddings)} documents")
+        deleted = self._delete_stale(seen) if delete_stale else 0
+        self.query_cache.invalidate(self.collection.name)
+        _log_throughput(count, started, skipped, deleted)
 
-        with self.collection.batch.dynamic() as batch:
-            for i, data_row in enumerate(documents):
-                batch.add_object(properties=metadatas[i], vector=all_embeddings[i])
-        logger.info(f"Added {len(documents)} documents to the vector database")
+    def _new_chunks(self, batch_documents, batch_metadatas, seen: Dict[str, set]):
+        """
+        Identify a batch of multi-modal chunks and drop the ones already stored.
+        Returns the documents to embed with their (uuid, properties) pairs.
+        """
+        identified = [
+            identify_chunk(document, metadata, metadata)
+            for document, metadata in zip(batch_documents, batch_metadatas)
+        ]
+        existing = self._existing_uuids([uuid for uuid, _ in identified])
+        new_documents, new_identified = [], []
+        for document, (uuid, properties) in zip(batch_documents, identified):
+            if "source_id" in properties:
+                seen[properties["source_id"]].add(uuid)
+            if uuid not in existing:
+                new_documents.append(document)
+                new_identified.append((uuid, properties))
+        return new_documents, new_identified
 
     def similarity_search(
-        self, query: str, k: int = 3, type: Literal["text", "multimodal"] = "text"
+        self,
+        query: str,
+        k: int = 3,
+        type: SearchType = "text",
+        alpha: float = 0.5,
+        fusion_type: Literal["ranked", "relative_score"] = "relative_score",
+        vectorizer: Literal["cohere", "voyage"] = "cohere",
     ):
-        """Query the Weaviate database and return Langchain Documents with cosine distances"""
-        if type == "text":
-            results = self.collection.query.near_text(
+        """
+        Query the Weaviate database and return Langchain Documents with cosine distances.
+
+        With `type="hybrid"`, BM25 keyword scores and vector similarity are fused, so
+        exact identifiers such as invoice numbers or part codes are found as well.
+        `alpha` weighs the vector search (1.0) against BM25 (0.0) and the fused score
+        is returned in the metadata. `vectorizer` must match the one the collection
+        was created with: Voyage collections are queried with a client-side vector.
+        """
+        params = dict(
+            k=k, type=type, alpha=alpha, fusion_type=fusion_type, vectorizer=vectorizer
+        )
+        results = cached_searches(
+            self.query_cache,
+            self.collection.name,
+            [query],
+            params,
+            lambda queries: [self._similarity_search_uncached(queries[0], **params)],
+        )
+        return results[0]
+
+    @VECTOR_DB_DURATION.time(backend="weaviate", operation="query")
+    def _similarity_search_uncached(
+        self,
+        query: str,
+        k: int = 3,
+        type: SearchType = "text",
+        alpha: float = 0.5,
+        fusion_type: Literal["ranked", "relative_score"] = "relative_score",
+        vectorizer: Literal["cohere", "voyage"] = "cohere",
+    ):
+        """Run a single search without the query cache"""
+        if type == "hybrid":
+            vector = None
+            if vectorizer == "voyage":
+                vector = self._embed_multimodal([[query]], truncation=False)[0]
+            results = self.collection.query.hybrid(
                 query=query,
+                vector=vector,
+                alpha=alpha,
+                fusion_type=FUSION_TYPES[fusion_type],
                 limit=k,
+                return_metadata=MetadataQuery(score=True),
             )
+            if vectorizer == "voyage":
+                return _multimodal_documents(results.objects)
+            return _text_documents(results.objects)
 
-            documents = []
-            for obj in results.objects:
-                metadata = obj.properties.get("metadata", {})
-                metadata["uuid"] = str(obj.uuid)
-                if obj.metadata.distance is not None:
-                    metadata["cosine_distance"] = obj.metadata.distance
-
-                doc = Document(
-                    page_content=obj.properties.get("content", ""), metadata=metadata
-                )
-                documents.append(doc)
-
-            return documents
+        elif type == "text":
+            results = self.collection.query.near_text(
+                query=query,
+                limit=k,
+                return_metadata=MetadataQuery(distance=True),
+            )
+            return _text_documents(results.objects)
 
         elif type == "multimodal":
-            vo = voyageai.Client()
-            vector = vo.multimodal_embed(
-                [[query]], model="voyage-multimodal-3", truncation=False
-            )
+            vector = self._embed_multimodal([[query]], truncation=False)[0]
             results = self.collection.query.near_vector(
-                near_vector=vector.embeddings[0],
+                near_vector=vector,
                 limit=k,
                 return_metadata=MetadataQuery(distance=True),
             )
+            return _multimodal_documents(results.objects)
+
+    def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = 3,
+        type: SearchType = "text",
+        alpha: float = 0.5,
+        fusion_type: Literal["ranked", "relative_score"] = "relative_score",
+        vectorizer: Literal["cohere", "voyage"] = "cohere",
+    ) -> List[List[Document]]:
+        """
+        Run several similarity searches at once. All queries are embedded in a single
+        request and the vector or hybrid queries run concurrently. Returns one list
+        of Documents per query, in the order of `queries`.
+        """
+        if not queries:
+            return []
+        params = dict(
+            k=k, type=type, alpha=alpha, fusion_type=fusion_type, vectorizer=vectorizer
+        )
+        return cached_searches(
+            self.query_cache,
+            self.collection.name,
+            queries,
+            params,
+            lambda missing: self._similarity_search_batch_uncached(missing, **params),
+        )
 
-            documents = []
+    @VECTOR_DB_DURATION.time(backend="weaviate", operation="batch_query")
+    def _similarity_search_batch_uncached(
+        self,
+        queries: List[str],
+        k: int = 3,
+        type: SearchType = "text",
+        alpha: float = 0.5,
+        fusion_type: Literal["ranked", "relative_score"] = "relative_score",
+        vectorizer: Literal["cohere", "voyage"] = "cohere",
+    ) -> List[List[Document]]:
+        """Run several searches without the query cache"""
+        embedding_type, to_documents = _batch_search_setup(type, vectorizer)
+        vectors = self._embed_queries(queries, embedding_type)
 
-            for obj in results.objects:
-                metadata = obj.properties.copy()
-                metadata.pop("text", None)
-                if obj.metadata.distance is not None:
-                    metadata["cosine_distance"] = obj.metadata.distance
-                content = obj.properties["text"]
+        def search(query, vector):
+            if type == "hybrid":
+                results = self.collection.query.hybrid(
+                    query=query,
+                    vector=vector,
+                    alpha=alpha,
+                    fusion_type=FUSION_TYPES[fusion_type],
+                    limit=k,
+                    return_metadata=MetadataQuery(score=True),
+                )
+            else:
+                results = self.collection.query.near_vector(
+                    near_vector=vector,
+                    limit=k,
+                    return_metadata=MetadataQuery(distance=True),
+                )
+            return to_documents(results.objects)
 
-                documents.append(Document(page_content=content, metadata=metadata))
-            return documents
+        with ThreadPoolExecutor(max_workers=min(len(vectors), 8)) as pool:
+            return list(pool.map(search, queries, vectors))
 
     def remove_collection(self, name: str):
         """Remove a Weaviate collection"""
         try:
             self.client.collections.delete(name)
+            self.query_cache.invalidate(name)
             logger.info(f"{name} collection deleted")
         except Exception:
             logger.warning(f"{name} collection does not exist")
@@ -171,4 +539,398 @@ class Weaviate:
 
     def close(self):
         """Close the Weaviate client connection"""
-        self.client.close()
+        self.registry.close_weaviate()
+
+
+class AsyncWeaviate:
+    """
+    Asyncio counterpart of `Weaviate` built on the async weaviate client and the
+    async Voyage client, so vector queries never block the event loop.
+
+    The shared connection is opened lazily on first use.
+    """
+
+    def __init__(
+        self,
+        embeddings_model=None,
+        embedding_cache=None,
+        registry: ClientRegistry | None = None,
+        query_cache: QueryCache | None = None,
+    ):
+        """Initialize the async Weaviate adapter on top of the shared clients"""
+        self.registry = registry or clients
+        self._embedding_cache = embedding_cache
+        self._query_cache = query_cache
+
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        return self._embedding_cache or self.registry.embedding_cache()
+
+    @property
+    def query_cache(self) -> QueryCache:
+        return self._query_cache or self.registry.query_cache()
+
+    async def _get_client(self):
+        return await self.registry.async_weaviate()
+
+    async def set_collection(self, name: str):
+        """Set the Weaviate collection"""
+        client = await self._get_client()
+        try:
+            self.collection = client.collections.get(name)
+        except Exception:
+            logger.error(f"{name} collection does not exist")
+            raise ValueError(f"{name} collection does not exist")
+
+    async def with_collection(self, name: str):
+        """Return a copy bound to the given collection, sharing the client"""
+        await self._get_client()
+        bound = copy.copy(self)
+        await bound.set_collection(name)
+        return bound
+
+    async def create_collection(self, name: str, vectorizer_config="cohere"):
+        """Create a new Weaviate collection"""
+        client = await self._get_client()
+        if vectorizer_config == "cohere":
+            await client.collections.create(
+                name=name,
+                vectorizer_config=Configure.Vectorizer.text2vec_cohere(
+                    model="embed-multilingual-v3.0"
+                ),
+                properties=ID_PROPERTIES,
+            )
+            self.collection = client.collections.get(name)
+            logger.info(f"{name} collection created")
+        elif vectorizer_config == "voyage":
+            try:
+                await client.collections.create(
+                    name=name,
+                    vectorizer_config=Configure.Vectorizer.none(),
+                    properties=ID_PROPERTIES,
+                )
+                self.collection = client.collections.get(name)
+                logger.info(f"{name} collection created")
+            except Exception:
+                self.collection = client.collections.get(name)
+                logger.warning(f"{name} collection already exists")
+
+    async def _embed_multimodal(
+        self, inputs: List[List[Any]], truncation: bool
+    ) -> List[List[float]]:
+        return await aembed_multimodal(
+            self.registry, self.embedding_cache, inputs, truncation
+        )
+
+    async def _embed_queries(
+        self, queries: List[str], type: Literal["text", "multimodal"]
+    ) -> List[List[float]]:
+        """Async variant of `Weaviate._embed_queries`"""
+        if type == "multimodal":
+            return await self._embed_multimodal(
+                [[q] for q in queries], truncation=False
+            )
+        return await aembed_texts(self.registry, self.embedding_cache, queries)
+
+    async def _existing_uuids(self, uuids: List[str]) -> set:
+        """Return which of the given object UUIDs are already stored"""
+        if not uuids:
+            return set()
+        results = await self.collection.query.fetch_objects(
+            filters=Filter.by_id().contains_any(uuids),
+            limit=len(uuids),
+            return_properties=[],
+        )
+        return {str(obj.uuid) for obj in results.objects}
+
+    async def _source_uuids(self, source: str) -> List[str]:
+        """List the UUIDs of every object stored for a source"""
+        uuids = []
+        offset = 0
+        while True:
+            try:
+                results = await self.collection.query.fetch_objects(
+                    filters=Filter.by_property("source_id").equal(source),
+                    limit=ID_PAGE_SIZE,
+                    offset=offset,
+                    return_properties=[],
+                )
+            except WeaviateQueryError:
+                return uuids
+            uuids.extend(str(obj.uuid) for obj in results.objects)
+            if len(results.objects) < ID_PAGE_SIZE:
+                return uuids
+            offset += ID_PAGE_SIZE
+
+    async def _delete_stale(self, seen: Dict[str, set]) -> int:
+        """Delete objects of the seen sources that were not part of this import"""
+        stale = [
+            uuid
+            for source, keep in seen.items()
+            for uuid in await self._source_uuids(source)
+            if uuid not in keep
+        ]
+        for i in range(0, len(stale), ID_PAGE_SIZE):
+            await self.collection.data.delete_many(
+                where=Filter.by_id().contains_any(stale[i : i + ID_PAGE_SIZE])
+            )
+        return len(stale)
+
+    async def _new_chunks(self, batch_documents, batch_metadatas, seen):
+        """Async variant of `Weaviate._new_chunks`"""
+        identified = [
+            identify_chunk(document, metadata, metadata)
+            for document, metadata in zip(batch_documents, batch_metadatas)
+        ]
+        existing = await self._existing_uuids([uuid for uuid, _ in identified])
+        new_documents, new_identified = [], []
+        for document, (uuid, properties) in zip(batch_documents, identified):
+            if "source_id" in properties:
+                seen[properties["source_id"]].add(uuid)
+            if uuid not in existing:
+                new_documents.append(document)
+                new_identified.append((uuid, properties))
+        return new_documents, new_identified
+
+    @VECTOR_DB_DURATION.time(backend="weaviate", operation="insert")
+    @with_priority(INGESTION)
+    async def add_documents(self, documents: List[Document], delete_stale: bool = True):
+        """
+        This function adds documents to the vector database, skipping unchanged
+        documents like `Weaviate.add_documents`.
+        """
+        started = time.perf_counter()
+        count = skipped = 0
+        seen = defaultdict(set)
+
+        for i in range(0, len(documents), ID_PAGE_SIZE):
+            identified = [
+                identify_chunk(
+                    [doc.page_content],
+                    {"metadata": doc.metadata, "content": doc.page_content},
+                    doc.metadata,
+                )
+                for doc in documents[i : i + ID_PAGE_SIZE]
+            ]
+            existing = await self._existing_uuids([uuid for uuid, _ in identified])
+            objects = []
+            for uuid, properties in identified:
+                if "source_id" in properties:
+                    seen[properties["source_id"]].add(uuid)
+                if uuid in existing:
+                    skipped += 1
+                    continue
+                objects.append(DataObject(properties=properties, uuid=uuid))
+            if objects:
+                await self.collection.data.insert_many(objects)
+                count += len(objects)
+
+        deleted = await self._delete_stale(seen) if delete_stale else 0
+        self.query_cache.invalidate(self.collection.name)
+        _log_throughput(count, started, skipped, deleted)
+
+    @VECTOR_DB_DURATION.time(backend="weaviate", operation="insert")
+    @with_priority(INGESTION)
+    async def add_multi_modal_documents(
+        self,
+        documents: List[List[Any]] | Iterable[Tuple[List[Any], Dict[str, Any]]],
+        metadatas: List[Dict[str, Any]] | None = None,
+        batch_size: int = EMBED_BATCH_SIZE,
+        concurrency: int = EMBED_CONCURRENCY,
+        delete_stale: bool = True,
+    ):
+        """
+        This function adds multi-modal documents to the vector database, using the
+        same bounded embedding and insert pipeline and the same incremental
+        upserts as `Weaviate`.
+        """
+        pairs = _document_pairs(documents, metadatas)
+
+        started = time.perf_counter()
+        count = skipped = 0
+        seen = defaultdict(set)
+
+        async def embed_and_insert(new_documents, identified):
+            embeddings = await self._embed_multimodal(new_documents, truncation=True)
+            await self.collection.data.insert_many(
+                [
+                    DataObject(properties=properties, vector=vector, uuid=uuid)
+                    for (uuid, properties), vector in zip(identified, embeddings)
+                ]
+            )
+            return len(identified)
+
+        in_flight = set()
+        try:
+            for batch_documents, batch_metadatas in _batched(pairs, batch_size):
+                new_documents, identified = await self._new_chunks(
+                    batch_documents, batch_metadatas, seen
+                )
+                skipped += len(batch_documents) - len(new_documents)
+                if not new_documents:
+                    continue
+                if len(in_flight) >= concurrency:
+                    done, in_flight = await asyncio.wait(
+                        in_flight, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    count += sum(task.result() for task in done)
+                in_flight.add(
+                    asyncio.create_task(embed_and_insert(new_documents, identified))
+                )
+            while in_flight:
+                done, in_flight = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                count += sum(task.result() for task in done)
+        finally:
+            # Stop the remaining batches when one of them failed
+            for task in in_flight:
+                task.cancel()
+
+        deleted = await self._delete_stale(seen) if delete_stale else 0
+        self.query_cache.invalidate(self.collection.name)
+        _log_throughput(count, started, skipped, deleted)
+
+    async def similarity_search(
+        self,
+        query: str,
+        k: int = 3,
+        type: SearchType = "text",
+        alpha: float = 0.5,
+        fusion_type: Literal["ranked", "relative_score"] = "relative_score",
+        vectorizer: Literal["cohere", "voyage"] = "cohere",
+    ):
+        """Query the Weaviate database, see `Weaviate.similarity_search`"""
+        params = dict(
+            k=k, type=type, alpha=alpha, fusion_type=fusion_type, vectorizer=vectorizer
+        )
+
+        async def search(queries):
+            return [await self._similarity_search_uncached(queries[0], **params)]
+
+        results = await acached_searches(
+            self.query_cache, self.collection.name, [query], params, search
+        )
+        return results[0]
+
+    @VECTOR_DB_DURATION.time(backend="weaviate", operation="query")
+    async def _similarity_search_uncached(
+        self,
+        query: str,
+        k: int = 3,
+        type: SearchType = "text",
+        alpha: float = 0.5,
+        fusion_type: Literal["ranked", "relative_score"] = "relative_score",
+        vectorizer: Literal["cohere", "voyage"] = "cohere",
+    ):
+        """Run a single search without the query cache"""
+        if type == "hybrid":
+            vector = None
+            if vectorizer == "voyage":
+                vector = (await self._embed_multimodal([[query]], truncation=False))[0]
+            results = await self.collection.query.hybrid(
+                query=query,
+                vector=vector,
+                alpha=alpha,
+                fusion_type=FUSION_TYPES[fusion_type],
+                limit=k,
+                return_metadata=MetadataQuery(score=True),
+            )
+            if vectorizer == "voyage":
+                return _multimodal_documents(results.objects)
+            return _text_documents(results.objects)
+
+        elif type == "text":
+            results = await self.collection.query.near_text(
+                query=query,
+                limit=k,
+                return_metadata=MetadataQuery(distance=True),
+            )
+            return _text_documents(results.objects)
+
+        elif type == "multimodal":
+            vector = (await self._embed_multimodal([[query]], truncation=False))[0]
+            results = await self.collection.query.near_vector(
+                near_vector=vector,
+                limit=k,
+                return_metadata=MetadataQuery(distance=True),
+            )
+            return _multimodal_documents(results.objects)
+
+    async def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = 3,
+        type: SearchType = "text",
+        alpha: float = 0.5,
+        fusion_type: Literal["ranked", "relative_score"] = "relative_score",
+        vectorizer: Literal["cohere", "voyage"] = "cohere",
+    ) -> List[List[Document]]:
+        """Async variant of `Weaviate.similarity_search_batch`"""
+        if not queries:
+            return []
+        params = dict(
+            k=k, type=type, alpha=alpha, fusion_type=fusion_type, vectorizer=vectorizer
+        )
+        return await acached_searches(
+            self.query_cache,
+            self.collection.name,
+            queries,
+            params,
+            lambda missing: self._similarity_search_batch_uncached(missing, **params),
+        )
+
+    @VECTOR_DB_DURATION.time(backend="weaviate", operation="batch_query")
+    async def _similarity_search_batch_uncached(
+        self,
+        queries: List[str],
+        k: int = 3,
+        type: SearchType = "text",
+        alpha: float = 0.5,
+        fusion_type: Literal["ranked", "relative_score"] = "relative_score",
+        vectorizer: Literal["cohere", "voyage"] = "cohere",
+    ) -> List[List[Document]]:
+        """Run several searches without the query cache"""
+        embedding_type, to_documents = _batch_search_setup(type, vectorizer)
+        vectors = await self._embed_queries(queries, embedding_type)
+
+        async def search(query, vector):
+            if type == "hybrid":
+                results = await self.collection.query.hybrid(
+                    query=query,
+                    vector=vector,
+                    alpha=alpha,
+                    fusion_type=FUSION_TYPES[fusion_type],
+                    limit=k,
+                    return_metadata=MetadataQuery(score=True),
+                )
+            else:
+                results = await self.collection.query.near_vector(
+                    near_vector=vector,
+                    limit=k,
+                    return_metadata=MetadataQuery(distance=True),
+                )
+            return to_documents(results.objects)
+
+        return list(
+            await asyncio.gather(*(search(q, v) for q, v in zip(queries, vectors)))
+        )
+
+    async def remove_collection(self, name: str):
+        """Remove a Weaviate collection"""
+        client = await self._get_client()
+        try:
+            await client.collections.delete(name)
+            self.query_cache.invalidate(name)
+            logger.info(f"{name} collection deleted")
+        except Exception:
+            logger.warning(f"{name} collection does not exist")
+
+    async def list_collections(self):
+        """List all Weaviate collections"""
+        client = await self._get_client()
+        return await client.collections.list_all(simple=False)
+
+    async def close(self):
+        """Close the Weaviate client connection"""
+        await self.registry.close_async_weaviate()
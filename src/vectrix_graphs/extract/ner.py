@@ -1,12 +1,13 @@
 from typing import List, Literal
 
-from langchain import hub
 from langchain_core.documents import Document
 from langchain_ollama import ChatOllama
 from langchain_openai import ChatOpenAI
 from langchain_together import ChatTogether
 from pytz import UTC
 
+from vectrix_graphs.graphs.utils.models.prompt_registry import prompts
+
 
 class ExtractMetaData:
     """
@@ -28,7 +29,7 @@ class ExtractMetaData:
             )
         else:
             raise ValueError(f"Model {self.model} not supported")
-        self.prompt = hub.pull("entity_extraction")
+        self.prompt = prompts.get("entity_extraction")
         self.logger = logger
 
     @staticmethod
@@ -1,4 +1,4 @@
-from typing import TypedDict
+from typing import Literal, TypedDict
 
 from langgraph.graph import END, START, StateGraph
 
@@ -12,6 +12,17 @@ logger = setup_logger(name="LangGraph Flow")
 # Define the config
 class GraphConfig(TypedDict):
     internet_search: bool
+    collection_name: str
+    search_type: Literal["text", "hybrid"]
+    hybrid_alpha: float
+    local_intent_classifier: bool
+    answer_cache: bool
+    latency_budget: float
+    deadline: float
+    max_rewrites: int
+    context_tokens: int
+    reranker: Literal["none", "bm25", "cohere"]
+    rerank_top_n: int
 
 
 graph_nodes = GraphNodes(logger, mode="local")
@@ -19,18 +30,18 @@ graph_nodes = GraphNodes(logger, mode="local")
 subgraph = StateGraph(OverallState, config_schema=GraphConfig)
 
 subgraph.add_node("split_questions", graph_nodes.split_question_list)
-subgraph.add_node("retrieve", graph_nodes.retrieve)
+subgraph.add_node("retrieve", graph_nodes.retrieve_batch)
 subgraph.add_node("rag_answer", graph_nodes.rag_answer)
+subgraph.add_node("rerank", graph_nodes.rerank)
 subgraph.add_node("filter_docs", graph_nodes.filter_docs)
 subgraph.add_node("hallucination_grader", graph_nodes.hallucination_grader)
 subgraph.add_node("final_answer", graph_nodes.final_answer)
 subgraph.add_node("rewrite_question", graph_nodes.rewrite_question)
 
 subgraph.add_edge(START, "split_questions")
-subgraph.add_conditional_edges(
-    "split_questions", graph_nodes.retrieve_documents, ["retrieve"]
-)
-subgraph.add_edge("retrieve", "filter_docs")
+subgraph.add_edge("split_questions", "retrieve")
+subgraph.add_edge("retrieve", "rerank")
+subgraph.add_edge("rerank", "filter_docs")
 subgraph.add_edge("filter_docs", "rag_answer")
 subgraph.add_edge("rag_answer", "hallucination_grader")
 subgraph.add_conditional_edges(
@@ -46,14 +57,16 @@ subgraph = subgraph.compile()
 workflow = StateGraph(OverallState, config_schema=GraphConfig)
 
 # Define the nodes
+workflow.add_node("prepare_turn", graph_nodes.prepare_turn)
 workflow.add_node("rewrite_chat_history", graph_nodes.rewrite_chat_history)
 workflow.add_node("detect_intent", graph_nodes.detect_intent)
 workflow.add_node("llm_answer", graph_nodes.llm_answer)
 workflow.add_node("question_subgraph", subgraph)
 workflow.add_node("metadata_query", graph_nodes.metadata_query)
 # Define the flow
+workflow.add_edge(START, "prepare_turn")
 workflow.add_conditional_edges(
-    START,
+    "prepare_turn",
     graph_nodes.detect_message_history,
     {"True": "rewrite_chat_history", "False": "detect_intent"},
 )
@@ -73,4 +86,7 @@ workflow.add_edge("question_subgraph", END)
 workflow.add_edge("metadata_query", END)
 local_slm_demo = workflow.compile()
 
-__all__ = ["local_slm_demo"]
+# Warm-up hook of the graph registry
+warm_up = graph_nodes.warm_up
+
+__all__ = ["local_slm_demo", "warm_up"]
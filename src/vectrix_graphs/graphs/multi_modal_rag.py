@@ -32,4 +32,7 @@ graph.add_edge("answer_question", END)
 
 multi_modal_graph = graph.compile()
 
-__all__ = ["multi_modal_graph"]
+# Warm-up hook of the graph registry
+warm_up = graph_nodes.warm_up
+
+__all__ = ["multi_modal_graph", "warm_up"]
@@ -1,3 +1,4 @@
+import os
 from typing import Annotated, List, Sequence
 
 from langchain_core.documents import Document
@@ -5,7 +6,8 @@ from langchain_core.messages import AIMessage, BaseMessage
 from langgraph.graph.message import add_messages
 from typing_extensions import TypedDict
 
-from vectrix_graphs.db.weaviate import Weaviate
+from vectrix_graphs.db import get_async_vector_db
+from vectrix_graphs.metrics import timed_nodes
 
 from ..base_nodes import BaseNodes
 
@@ -16,20 +18,51 @@ class MultiModalRetrievalState(TypedDict):
     base_64_images: List[str]
 
 
+@timed_nodes
 class RAGNodes(BaseNodes):
     def __init__(self, logger, mode="online", document_handler=None):
         super().__init__(logger, mode)
-        self.weaviate = Weaviate()
+        self.vector_db = get_async_vector_db()
         self.mode = mode
 
+    @staticmethod
+    def _collection_name(config) -> str:
+        """
+        Read the collection to search from the graph config, else from
+        MULTI_MODAL_COLLECTION: the text collection has no multi-modal objects
+        """
+        return config.get("configurable", {}).get(
+            "collection_name", os.environ.get("MULTI_MODAL_COLLECTION")
+        )
+
+    async def warm_up(self, prime: bool = True):
+        """
+        Connect the vector database and, with `prime`, send a one-token call
+        through the shared LLM connection pool.
+        """
+        collection = self._collection_name({})
+        try:
+            if collection:
+                await self.vector_db.with_collection(collection)
+            if prime:
+                llm = self.llm_factory.create_llm(mode=self.mode, model_type="default")
+                await llm.ainvoke("Hi", max_tokens=1)
+        except Exception as e:
+            self.logger.warning(f"Warm-up failed: {e}")
+
     async def multi_modal_retrieval(self, state: MultiModalRetrievalState, config):
-        collection_name = config.get("configurable", {}).get("collection_name")
-        self.weaviate.set_collection(collection_name)
+        collection_name = self._collection_name(config)
+        if not collection_name:
+            self.logger.error("No multi-modal collection configured")
+            raise ValueError(
+                "No multi-modal collection configured, set MULTI_MODAL_COLLECTION"
+            )
+        vectordb = await self.vector_db.with_collection(collection_name)
 
         print("Running multi-modal retrieval")
         print(f"Searching for {state['messages'][-1].content}")
 
-        results = self.weaviate.similarity_search(
+        results = await vectordb.similarity_search(
             query=state["messages"][-1].content, k=3, type="multimodal"
         )
         return {"results": results}
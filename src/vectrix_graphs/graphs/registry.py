@@ -0,0 +1,213 @@
+import asyncio
+import importlib
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional
+
+from vectrix_graphs.logger import setup_logger
+
+if TYPE_CHECKING:
+    from langgraph.pregel import Pregel
+
+logger = setup_logger(__name__, level="INFO")
+
+
+class GraphSpec(NamedTuple):
+    """A compiled graph and its optional warm-up hook, as "module:attribute" """
+
+    graph: str
+    warm_up: Optional[str] = None
+
+
+class ModelSpec(NamedTuple):
+    """A model id of the API: the graph answering it and the mode of its nodes"""
+
+    graph: str
+    mode: str
+    answer_cache: bool = False
+
+
+# Like in langgraph.json, graph modules build their nodes when imported
+DEFAULT_GRAPHS = {
+    "default_flow": GraphSpec(
+        "vectrix_graphs.graphs.default_flow:default_flow",
+        "vectrix_graphs.graphs.default_flow:warm_up",
+    ),
+    "local_slm_demo": GraphSpec(
+        "vectrix_graphs.graphs.local_slm_demo:local_slm_demo",
+        "vectrix_graphs.graphs.local_slm_demo:warm_up",
+    ),
+    "multi_modal_rag": GraphSpec(
+        "vectrix_graphs.graphs.multi_modal_rag:multi_modal_graph",
+        "vectrix_graphs.graphs.multi_modal_rag:warm_up",
+    ),
+}
+DEFAULT_MODELS = {
+    "navid_ai_demo_local": ModelSpec("local_slm_demo", "local", answer_cache=True),
+    "navid_ai_demo_online": ModelSpec("default_flow", "online", answer_cache=True),
+    "navid_ai_demo_multi_modal": ModelSpec("multi_modal_rag", "online"),
+}
+# Build and warm up the graphs in the background after startup, GRAPH_WARMUP=0
+# disables it and GRAPH_PRIME=0 skips the priming LLM call of the warm-up hooks
+GRAPH_WARMUP = os.environ.get("GRAPH_WARMUP", "1") == "1"
+GRAPH_PRIME = os.environ.get("GRAPH_PRIME", "1") == "1"
+# Seconds before retrying graphs that failed to build, doubled up to the maximum
+GRAPH_WARMUP_RETRY_DELAY = float(os.environ.get("GRAPH_WARMUP_RETRY_DELAY", 1))
+GRAPH_WARMUP_MAX_RETRY_DELAY = 60.0
+
+
+def _load(path: str):
+    module, attribute = path.split(":")
+    return getattr(importlib.import_module(module), attribute)
+
+
+class GraphRegistry:
+    """
+    Process-wide registry of the compiled graphs and of the model ids served by
+    the API.
+
+    A graph module builds its nodes and compiles the graph when it is imported,
+    so graphs are only imported on first use or by `warm_up()`, in a worker
+    thread to keep the event loop responsive. Importing the API therefore
+    neither loads the model and vector database libraries nor compiles graphs.
+
+    `warm_up()` also runs the warm-up hook of every graph, which pays the cold
+    costs of its first request, and `ready()` reports when all served graphs
+    are warm.
+
+    args:
+        graphs: `GraphSpec` or "module:attribute" of every graph name
+        models: `ModelSpec` of every model id
+    """
+
+    def __init__(
+        self,
+        graphs: Optional[Dict[str, GraphSpec | str]] = None,
+        models: Optional[Dict[str, ModelSpec]] = None,
+    ):
+        self._specs: Dict[str, GraphSpec] = {}
+        self._models = dict(DEFAULT_MODELS if models is None else models)
+        self._graphs: Dict[str, "Pregel"] = {}
+        self._warm: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        for name, spec in (DEFAULT_GRAPHS if graphs is None else graphs).items():
+            self.register(name, spec)
+
+    def register(self, name: str, spec: GraphSpec | str):
+        with self._lock:
+            self._specs[name] = GraphSpec(spec) if isinstance(spec, str) else spec
+            self._graphs.pop(name, None)
+            self._warm.pop(name, None)
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def models(self) -> Dict[str, ModelSpec]:
+        return dict(self._models)
+
+    def model(self, model_id: str) -> ModelSpec:
+        """Return the spec of a model id served by the API"""
+        if model_id not in self._models:
+            logger.error(f"Unsupported model: {model_id}")
+            raise ValueError(f"Unsupported model: {model_id}")
+        return self._models[model_id]
+
+    def is_built(self, name: str) -> bool:
+        return name in self._graphs
+
+    def get(self, name: str) -> "Pregel":
+        """Return the compiled graph called `name`, building it on first use"""
+        graph = self._graphs.get(name)
+        if graph is not None:
+            return graph
+        if name not in self._specs:
+            logger.error(f"Unknown graph {name}")
+            raise ValueError(f"Unknown graph {name}, expected one of {self.names()}")
+        with self._lock:
+            if name not in self._graphs:
+                started = time.perf_counter()
+                self._graphs[name] = _load(self._specs[name].graph)
+                logger.info(
+                    f"Built graph {name} in {time.perf_counter() - started:.2f}s"
+                )
+            return self._graphs[name]
+
+    async def aget(self, name: str) -> "Pregel":
+        """Async variant of `get`, building the graph in a worker thread"""
+        graph = self._graphs.get(name)
+        if graph is not None:
+            return graph
+        return await asyncio.to_thread(self.get, name)
+
+    async def aget_model(self, model_id: str) -> "Pregel":
+        """Return the compiled graph answering a model id"""
+        return await self.aget(self.model(model_id).graph)
+
+    def served(self) -> List[str]:
+        """Names of the graphs answering a model id"""
+        return list(dict.fromkeys(spec.graph for spec in self._models.values()))
+
+    async def _warm_up(self, name: str, prime: bool):
+        await self.aget(name)
+        hook = self._specs[name].warm_up
+        if hook is not None:
+            started = time.perf_counter()
+            try:
+                await _load(hook)(prime=prime)
+            except Exception as e:
+                # Warming is best effort, the request pays what is left
+                logger.warning(f"Warm-up of graph {name} failed: {e}")
+            logger.info(
+                f"Warmed up graph {name} in {time.perf_counter() - started:.2f}s"
+            )
+        self._warm[name] = True
+
+    async def warm_up(
+        self,
+        names: Optional[Iterable[str]] = None,
+        prime: bool = GRAPH_PRIME,
+        retry_delay: float = GRAPH_WARMUP_RETRY_DELAY,
+    ):
+        """
+        Build the given graphs, the served ones by default, and run their
+        warm-up hooks. Graphs that cannot be built are logged and retried with
+        exponential backoff until they are warm, `retry_delay=0` leaves them cold.
+        """
+        pending = list(names or self.served())
+        for name in pending:
+            if name not in self._specs:
+                logger.error(f"Unknown graph {name}")
+                raise ValueError(
+                    f"Unknown graph {name}, expected one of {self.names()}"
+                )
+        while True:
+            failed = []
+            for name in pending:
+                try:
+                    await self._warm_up(name, prime)
+                except Exception as e:
+                    logger.error(f"Unable to build graph {name}: {e}")
+                    failed.append(name)
+            if not failed or not retry_delay:
+                return
+            logger.info(f"Retrying the warm-up of {failed} in {retry_delay:.0f}s")
+            await asyncio.sleep(retry_delay)
+            pending = failed
+            retry_delay = min(retry_delay * 2, GRAPH_WARMUP_MAX_RETRY_DELAY)
+
+    def _state(self, name: str) -> str:
+        if self._warm.get(name):
+            return "warm"
+        return "built" if name in self._graphs else "cold"
+
+    def status(self) -> Dict[str, str]:
+        """State of every served graph: warm, built or cold"""
+        return {name: self._state(name) for name in self.served()}
+
+    def ready(self) -> bool:
+        """Whether every served graph is built and warmed up"""
+        return all(self._warm.get(name) for name in self.served())
+
+
+graphs = GraphRegistry()
@@ -1,4 +1,14 @@
-from .nodes import GraphNodes
-from .state import OverallState
+import importlib
+
+# Imported on first access, so loading a helper such as the stream processor
+# does not import every model and vector database library
+_LAZY_EXPORTS = {"GraphNodes": ".nodes", "OverallState": ".state"}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ["GraphNodes", "OverallState"]
@@ -0,0 +1,72 @@
+import math
+import os
+import time
+from typing import Any, Dict, Optional
+
+# Seconds a request may take before the graphs degrade to cheaper paths, no
+# deadline unless set here or with the "latency_budget" config key
+DEFAULT_LATENCY_BUDGET = (
+    float(os.environ["GRAPH_LATENCY_BUDGET"])
+    if os.environ.get("GRAPH_LATENCY_BUDGET")
+    else None
+)
+# Times a question may be rewritten after a failed hallucination grade
+DEFAULT_MAX_REWRITES = int(os.environ.get("GRAPH_MAX_REWRITES", 2))
+
+# Seconds expected for splitting a question, for grading an answer and for a
+# rewrite loop after a failed grade (rewriting, retrieving and answering again)
+SPLIT_RESERVE = 15.0
+GRADER_RESERVE = 5.0
+REWRITE_RESERVE = 15.0
+
+
+class Budget:
+    """
+    Latency budget of a single graph run.
+
+    The deadline is a Unix timestamp taken from the "deadline" state key, the
+    "deadline" config key or, when neither is set, `latency_budget` seconds (or
+    GRAPH_LATENCY_BUDGET) after the turn started. Without any of them the run has
+    no deadline and every step runs. Nodes use `allows` to decide whether an
+    optional step still fits.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+
+    @staticmethod
+    def start(config) -> Dict[str, float]:
+        """State update fixing the deadline of a turn"""
+        configurable = config.get("configurable", {})
+        if configurable.get("deadline"):
+            return {"deadline": configurable["deadline"]}
+        budget = configurable.get("latency_budget", DEFAULT_LATENCY_BUDGET)
+        return {"deadline": time.time() + float(budget) if budget else None}
+
+    @classmethod
+    def of(cls, state: Dict[str, Any], config) -> "Budget":
+        return cls(
+            state.get("deadline") or config.get("configurable", {}).get("deadline")
+        )
+
+    def remaining(self) -> float:
+        """Seconds left until the deadline, infinite without one"""
+        if not self.deadline:
+            return math.inf
+        return self.deadline - time.time()
+
+    def allows(self, seconds: float) -> bool:
+        """Whether a step expected to take `seconds` still fits"""
+        return self.remaining() >= seconds
+
+    def timeout(self, reserve: float = 0.0) -> Optional[float]:
+        """
+        Timeout of a step that must leave `reserve` seconds for the next ones,
+        None without a deadline.
+        """
+        remaining = self.remaining()
+        return None if math.isinf(remaining) else max(remaining - reserve, 0.0)
+
+
+def max_rewrites(config) -> int:
+    return int(config.get("configurable", {}).get("max_rewrites", DEFAULT_MAX_REWRITES))
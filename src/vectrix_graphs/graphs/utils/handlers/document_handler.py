@@ -1,26 +1,160 @@
-from typing import List
+import functools
+import math
+import os
+import re
+import zlib
+from typing import Callable, List, Optional, Set
 
 from langchain_core.documents import Document
 
+from vectrix_graphs.logger import setup_logger
+
+logger = setup_logger(__name__, level="INFO")
+
+# Maximum number of tokens of the retrieved context in a prompt
+CONTEXT_TOKENS = int(os.environ.get("RAG_CONTEXT_TOKENS", 6000))
+# Jaccard similarity of word shingles above which two chunks are near-duplicates
+NEAR_DUPLICATE_THRESHOLD = 0.8
+SHINGLE_SIZE = 5
+TOKENIZER = "cl100k_base"
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TOKENIZER)
+    except Exception as e:
+        # The encoding is downloaded on first use, estimate when offline
+        logger.warning(f"Tokenizer {TOKENIZER} unavailable, estimating tokens: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens of a text, about four characters per token without tiktoken"""
+    encoding = _encoding()
+    if encoding is None:
+        return -(-len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    encoding = _encoding()
+    if encoding is None:
+        return text[: max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _shingles(text: str) -> Set[int]:
+    """Hashed word n-grams of a text, short texts are a single shingle"""
+    words = WORD_PATTERN.findall(text.lower())
+    size = min(SHINGLE_SIZE, len(words)) or 1
+    return {
+        zlib.crc32(" ".join(words[i : i + size]).encode())
+        for i in range(max(len(words) - size + 1, 1))
+    }
+
+
+def _jaccard(a: Set[int], b: Set[int]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _relevance(doc: Document) -> Optional[float]:
+    """Rerank or search score of a document, higher is better"""
+    if doc.metadata.get("rerank_score") is not None:
+        return doc.metadata["rerank_score"]
+    if doc.metadata.get("score") is not None:
+        return doc.metadata["score"]
+    if doc.metadata.get("cosine_distance") is not None:
+        return 1 - doc.metadata["cosine_distance"]
+    return None
+
+
+def _rank(doc: Document) -> float:
+    # Unscored documents keep their retrieval order after the scored ones
+    relevance = _relevance(doc)
+    return -relevance if relevance is not None else math.inf
+
+
+def format_entry(doc: Document) -> str:
+    return f"{doc.page_content}\n\n"
+
+
+def format_source_entry(doc: Document) -> str:
+    source = doc.metadata.get("source", "Unknown")
+    url = doc.metadata.get("url", "No URL provided")
+    return f"{doc.page_content}\n\nURL: {url}\nSOURCE: {source}\n"
+
 
 class DocumentHandler:
     @staticmethod
     async def filter_duplicates(documents: List[Document]) -> List[Document]:
-        """Filter duplicate documents based on UUID."""
+        """Filter duplicate documents based on UUID, documents without one are kept."""
         seen_uuids = set()
         return [
             doc
             for doc in documents
-            if doc.metadata.get("uuid") not in seen_uuids
-            and not seen_uuids.add(doc.metadata.get("uuid"))
+            if doc.metadata.get("uuid") is None
+            or (
+                doc.metadata["uuid"] not in seen_uuids
+                and not seen_uuids.add(doc.metadata["uuid"])
+            )
         ]
 
+    @staticmethod
+    def build_context(
+        documents: List[Document],
+        max_tokens: int = CONTEXT_TOKENS,
+        threshold: float = NEAR_DUPLICATE_THRESHOLD,
+        entry: Callable[[Document], str] = format_source_entry,
+    ) -> List[Document]:
+        """
+        Select the documents of a prompt context.
+
+        Documents are ordered by search score, chunks whose word shingles overlap
+        a better one by at least `threshold` (Jaccard) are dropped, and the rest
+        are packed greedily until the formatted entries reach `max_tokens`. The
+        best document is truncated if it does not fit on its own.
+        """
+        selected: List[Document] = []
+        kept_shingles: List[Set[int]] = []
+        used = 0
+        for doc in sorted(documents, key=_rank):
+            shingles = _shingles(doc.page_content)
+            if any(_jaccard(shingles, kept) >= threshold for kept in kept_shingles):
+                continue
+            tokens = count_tokens(entry(doc))
+            if used + tokens > max_tokens:
+                if selected:
+                    continue
+                overflow = tokens - count_tokens(doc.page_content)
+                content = _truncate(doc.page_content, max(max_tokens - overflow, 0))
+                doc = Document(page_content=content, metadata=doc.metadata)
+                tokens = max_tokens
+            selected.append(doc)
+            kept_shingles.append(shingles)
+            used += tokens
+
+        if len(selected) < len(documents):
+            logger.info(
+                f"Packed {len(selected)} of {len(documents)} documents "
+                f"in {used} context tokens"
+            )
+        return selected
+
+    @staticmethod
+    def format_context(documents: List[Document]) -> str:
+        """Format documents into a numbered context string."""
+        return "".join(
+            f"{i}. {format_entry(doc)}" for i, doc in enumerate(documents, 1)
+        )
+
     @staticmethod
     def format_sources(documents: List[Document]) -> str:
         """Format documents into source string."""
-        sources = ""
-        for i, doc in enumerate(documents, 1):
-            source = doc.metadata.get("source", "Unknown")
-            url = doc.metadata.get("url", "No URL provided")
-            sources += f"{i}. {doc.page_content}\n\nURL: {url}\nSOURCE: {source}\n"
-        return sources
+        return "".join(
+            f"{i}. {format_source_entry(doc)}" for i, doc in enumerate(documents, 1)
+        )
@@ -0,0 +1,71 @@
+import os
+from typing import List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+# Question/answer turns sent verbatim to the models, older ones are summarized
+HISTORY_TURNS = int(os.environ.get("HISTORY_TURNS", 4))
+# Turns summarized at once, so the summary is only refreshed every few turns
+COMPACTION_TURNS = int(os.environ.get("COMPACTION_TURNS", 2))
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You maintain a running summary of a conversation between a user and "
+            "an assistant. Extend the summary with the new messages. Keep names, "
+            "numbers, documents and open questions, drop pleasantries. Answer "
+            "with the updated summary only, in the language of the conversation.",
+        ),
+        (
+            "human",
+            "Current summary:\n{summary}\n\nNew messages:\n{messages}",
+        ),
+    ]
+)
+
+
+def _split(messages: Sequence[BaseMessage]):
+    """System messages and conversation turns before the current question"""
+    earlier = messages[:-1]
+    system = [m for m in earlier if isinstance(m, SystemMessage)]
+    history = [m for m in earlier if not isinstance(m, SystemMessage)]
+    return system, history
+
+
+def recent_messages(
+    messages: Sequence[BaseMessage],
+    summary: str = "",
+    turns: Optional[int] = HISTORY_TURNS,
+) -> List[BaseMessage]:
+    """
+    Conversation context of the current question: the system messages, the
+    summary of older turns and the last `turns` turns (all of them if None),
+    without the question.
+    """
+    system, history = _split(messages)
+    if summary:
+        system.append(SystemMessage(content=f"Earlier conversation: {summary}"))
+    if turns is None:
+        return system + history
+    return system + (history[-2 * turns :] if turns else [])
+
+
+def messages_to_compact(
+    messages: Sequence[BaseMessage],
+    turns: int = HISTORY_TURNS,
+    batch: int = COMPACTION_TURNS,
+) -> List[BaseMessage]:
+    """
+    Turns to fold into the summary once `batch` turns beyond the last `turns`
+    have accumulated, empty otherwise.
+    """
+    _, history = _split(messages)
+    if len(history) < 2 * (turns + batch):
+        return []
+    return history[: len(history) - 2 * turns]
+
+
+def format_history(messages: Sequence[BaseMessage]) -> str:
+    return "\n".join(f"{message.type}: {message.content}" for message in messages)
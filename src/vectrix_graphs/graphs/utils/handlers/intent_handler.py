@@ -0,0 +1,260 @@
+import json
+import math
+import re
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..models.tools import IntentEnum
+
+# Feature space of the hashed bag-of-words model
+HASH_BUCKETS = 2**14
+DEFAULT_THRESHOLD = 0.9
+# Metadata questions get a canned reply, so a local guess never skips the LLM:
+# "Who is the author of the book Dune?" is a content question
+METADATA_CONFIDENCE = 0.8
+
+GREETING_PATTERN = re.compile(
+    r"^(hi|hello|hey|hallo|hoi|bonjour|good (morning|afternoon|evening)|"
+    r"thanks?( you)?( (so|very) much)?|thank you|thx|cheers|bye|goodbye|"
+    r"see you)( there)?[\s!.,:)]*$",
+    re.IGNORECASE,
+)
+METADATA_PATTERN = re.compile(
+    r"\b(how many (documents|files|sources)|which (documents|files|sources)|"
+    r"(list|show) (all |me )?(the )?(documents|files|sources)|"
+    r"what (documents|files|sources) (do you have|are there|are available)|"
+    r"who (is|was) the author|when was .* (last )?(modified|updated|uploaded))\b",
+    re.IGNORECASE,
+)
+FOLLOW_UP_PATTERN = re.compile(
+    r"^(tell me more|can you elaborate|elaborate|go on|why\??|how so\??|"
+    r"what about (it|that|this|them)|and (what|how|why) about .*|"
+    r"can you (explain|expand on) (that|this|it)|what do you mean)[\s?!.]*$",
+    re.IGNORECASE,
+)
+
+# Labelled examples the model is trained on when no other data is given
+SEED_EXAMPLES: List[Tuple[str, IntentEnum]] = (
+    [
+        (text, IntentEnum.GREETING)
+        for text in (
+            "hi",
+            "hello there",
+            "hey, how are you?",
+            "good morning!",
+            "thanks a lot",
+            "thank you, that helps",
+            "bye for now",
+            "nice to meet you",
+            "hello, who are you?",
+            "great, thanks!",
+        )
+    ]
+    + [
+        (text, IntentEnum.SPECIFIC_QUESTION)
+        for text in (
+            "What is the warranty period of the X200?",
+            "How do I reset my password?",
+            "Which payment terms apply to invoice INV-2041?",
+            "What are the opening hours of the support desk?",
+            "How can I configure single sign-on?",
+            "What does the contract say about termination?",
+            "Explain the onboarding process for new employees",
+            "What is the maximum load of the bracket?",
+            "Where can I find the installation guide for the pump?",
+            "What are the side effects listed in the leaflet?",
+        )
+    ]
+    + [
+        (text, IntentEnum.METADATA_QUERY)
+        for text in (
+            "How many documents do you have?",
+            "Which files were uploaded last week?",
+            "List all documents about pricing",
+            "Who is the author of the security policy?",
+            "When was the handbook last modified?",
+            "What sources are available?",
+            "Show me the files from OneDrive",
+            "How many pages does the manual have?",
+            "Which documents are written in French?",
+            "What is the file type of the price list?",
+        )
+    ]
+    + [
+        (text, IntentEnum.FOLLOW_UP_QUESTION)
+        for text in (
+            "tell me more",
+            "can you elaborate on that?",
+            "why is that?",
+            "and what about the second one?",
+            "can you give an example of it?",
+            "what do you mean by that?",
+            "could you summarize your answer?",
+            "and how does that compare?",
+            "say that again in simpler words",
+            "is that also true for them?",
+        )
+    ]
+)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _features(text: str) -> List[int]:
+    """Hashed word unigrams and bigrams"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return [zlib.crc32(gram.encode()) % HASH_BUCKETS for gram in grams]
+
+
+class IntentClassifier:
+    """
+    CPU-only intent classifier answering obvious messages without an LLM call.
+
+    Lexical rules catch greetings, thanks, metadata requests and short follow-ups.
+    Metadata predictions are capped at `METADATA_CONFIDENCE` and always confirmed
+    by the LLM, greetings are only answered locally on a rule match.
+    Everything else goes to a multinomial naive Bayes model over hashed word
+    n-grams. A prediction is only returned when its confidence reaches
+    `threshold`, otherwise `predict` returns None and the caller falls back to the
+    LLM intent chain.
+
+    args:
+        threshold: minimum confidence of a local prediction
+        examples: labelled (text, intent) pairs, defaults to `SEED_EXAMPLES`
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        examples: Optional[Iterable[Tuple[str, IntentEnum]]] = None,
+    ):
+        self.threshold = threshold
+        self.fit(SEED_EXAMPLES if examples is None else examples)
+
+    def fit(self, examples: Iterable[Tuple[str, IntentEnum]]):
+        """Train the naive Bayes model on labelled examples"""
+        counts: Dict[IntentEnum, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        documents: Dict[IntentEnum, int] = defaultdict(int)
+        for text, intent in examples:
+            intent = IntentEnum(intent)
+            documents[intent] += 1
+            for feature in _features(text):
+                counts[intent][feature] += 1
+
+        total = sum(documents.values())
+        self._priors = {i: math.log(n / total) for i, n in documents.items()}
+        self._log_likelihoods = {}
+        self._unseen = {}
+        for intent, features in counts.items():
+            # Laplace smoothing over the features seen in any class
+            denominator = sum(features.values()) + HASH_BUCKETS
+            self._log_likelihoods[intent] = {
+                f: math.log((n + 1) / denominator) for f, n in features.items()
+            }
+            self._unseen[intent] = math.log(1 / denominator)
+        return self
+
+    def _model_scores(self, text: str) -> Dict[IntentEnum, float]:
+        """Posterior probability of every intent under the naive Bayes model"""
+        features = _features(text)
+        log_scores = {
+            intent: prior
+            + sum(
+                self._log_likelihoods[intent].get(f, self._unseen[intent])
+                for f in features
+            )
+            for intent, prior in self._priors.items()
+        }
+        top = max(log_scores.values())
+        exp = {i: math.exp(s - top) for i, s in log_scores.items()}
+        total = sum(exp.values())
+        return {i: v / total for i, v in exp.items()}
+
+    def classify(
+        self, question: str, chat_history: Sequence = ()
+    ) -> Tuple[IntentEnum, float]:
+        """Return the most likely intent and its confidence"""
+        text = question.strip()
+        if GREETING_PATTERN.match(text):
+            return IntentEnum.GREETING, 1.0
+        if chat_history and FOLLOW_UP_PATTERN.match(text):
+            return IntentEnum.FOLLOW_UP_QUESTION, 1.0
+        if METADATA_PATTERN.search(text):
+            return IntentEnum.METADATA_QUERY, METADATA_CONFIDENCE
+
+        scores = self._model_scores(text)
+        if not chat_history:
+            # A follow-up needs something to follow up on
+            scores.pop(IntentEnum.FOLLOW_UP_QUESTION, None)
+            total = sum(scores.values()) or 1.0
+            scores = {i: s / total for i, s in scores.items()}
+        intent = max(scores, key=scores.get)
+        if intent == IntentEnum.METADATA_QUERY:
+            return intent, min(scores[intent], METADATA_CONFIDENCE)
+        if intent == IntentEnum.GREETING:
+            # A greeting gets a canned reply, "Hey, who are you and what can you
+            # do for me?" needs an answer: without a rule match, ask the LLM
+            return intent, 0.0
+        return intent, scores[intent]
+
+    def predict(
+        self, question: str, chat_history: Sequence = ()
+    ) -> Optional[IntentEnum]:
+        """Return the intent if it is confident enough, None to ask the LLM"""
+        intent, confidence = self.classify(question, chat_history)
+        return intent if confidence >= self.threshold else None
+
+
+def evaluate(
+    classifier: IntentClassifier,
+    examples: Iterable[Tuple[str, IntentEnum, bool]],
+) -> Dict[str, float]:
+    """
+    Evaluate the fast path on (text, intent, has_chat_history) examples.
+
+    Reports how many LLM calls are avoided, the accuracy of the local answers and
+    the mean classification latency. Examples left to the LLM are assumed to be
+    classified correctly, so `accuracy` is the end-to-end accuracy of the
+    combination.
+    """
+    total = local = local_correct = 0
+    elapsed = 0.0
+    for text, intent, has_history in examples:
+        total += 1
+        started = time.perf_counter()
+        predicted = classifier.predict(text, ["history"] if has_history else ())
+        elapsed += time.perf_counter() - started
+        if predicted is not None:
+            local += 1
+            local_correct += predicted == IntentEnum(intent)
+
+    return {
+        "examples": total,
+        "llm_calls_avoided": local / total if total else 0.0,
+        "local_accuracy": local_correct / local if local else 0.0,
+        "accuracy": (total - local + local_correct) / total if total else 0.0,
+        "mean_latency_us": elapsed / total * 1e6 if total else 0.0,
+    }
+
+
+def load_examples(path: str) -> List[Tuple[str, IntentEnum, bool]]:
+    """
+    Read labelled examples from a JSON lines file with "question", "intent" and
+    an optional "has_history" key per line.
+    """
+    examples = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                examples.append(
+                    (
+                        row["question"],
+                        IntentEnum(row["intent"]),
+                        row.get("has_history", False),
+                    )
+                )
+    return examples
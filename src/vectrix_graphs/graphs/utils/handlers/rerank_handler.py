@@ -0,0 +1,128 @@
+import math
+import os
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+from vectrix_graphs.db.clients import ClientRegistry, clients
+from vectrix_graphs.db.embeddings import acall_with_backoff
+from vectrix_graphs.helpers.rate_limiter import limiters
+from vectrix_graphs.logger import setup_logger
+
+logger = setup_logger(__name__, level="INFO")
+
+# Reranker used when the graph config does not name one
+DEFAULT_RERANKER = os.environ.get("RERANKER", "none")
+# Documents retrieved per sub-question when reranking, and documents kept
+RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", 10))
+RERANK_TOP_N = int(os.environ.get("RERANK_TOP_N", 5))
+COHERE_RERANK_MODEL = "rerank-multilingual-v3.0"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _with_scores(
+    documents: List[Document], scores: List[float], top_n: int
+) -> List[Document]:
+    """Keep the `top_n` best documents, best first, with their "rerank_score" """
+    order = sorted(range(len(documents)), key=lambda i: -scores[i])[:top_n]
+    return [
+        Document(
+            page_content=documents[i].page_content,
+            metadata={**documents[i].metadata, "rerank_score": float(scores[i])},
+        )
+        for i in order
+    ]
+
+
+class Reranker(ABC):
+    """
+    Scores the retrieved candidates of all sub-questions against the question in
+    one batch and keeps the best ones.
+    """
+
+    @abstractmethod
+    async def rerank(
+        self, query: str, documents: List[Document], top_n: int
+    ) -> List[Document]:
+        """Return the `top_n` most relevant documents, best first"""
+
+
+class BM25Reranker(Reranker):
+    """Local lexical reranker, BM25 with the candidates as the corpus"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def scores(self, query: str, documents: List[Document]) -> List[float]:
+        corpus = [Counter(_tokenize(doc.page_content)) for doc in documents]
+        lengths = [sum(tfs.values()) for tfs in corpus]
+        average = sum(lengths) / len(lengths) if lengths else 0.0
+        scores = [0.0] * len(documents)
+        for term in set(_tokenize(query)):
+            frequency = sum(1 for tfs in corpus if term in tfs)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(corpus) - frequency + 0.5) / (frequency + 0.5))
+            for i, tfs in enumerate(corpus):
+                tf = tfs.get(term, 0)
+                if tf:
+                    norm = self.k1 * (1 - self.b + self.b * lengths[i] / (average or 1))
+                    scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    async def rerank(
+        self, query: str, documents: List[Document], top_n: int
+    ) -> List[Document]:
+        return _with_scores(documents, self.scores(query, documents), top_n)
+
+
+class CohereReranker(Reranker):
+    """Cohere rerank model, one request for all candidates"""
+
+    def __init__(
+        self, model: str = COHERE_RERANK_MODEL, registry: ClientRegistry | None = None
+    ):
+        self.model = model
+        self.registry = registry or clients
+
+    async def rerank(
+        self, query: str, documents: List[Document], top_n: int
+    ) -> List[Document]:
+        if not documents:
+            return []
+        response = await acall_with_backoff(
+            lambda: self.registry.async_cohere().rerank(
+                model=self.model,
+                query=query,
+                documents=[doc.page_content for doc in documents],
+                top_n=top_n,
+            ),
+            limiters.get("cohere", self.model),
+        )
+        scores = [-math.inf] * len(documents)
+        for result in response.results:
+            scores[result.index] = result.relevance_score
+        return _with_scores(documents, scores, min(top_n, len(response.results)))
+
+
+RERANKERS = {"bm25": BM25Reranker, "cohere": CohereReranker}
+
+
+def get_reranker(name: Optional[str] = None) -> Optional[Reranker]:
+    """Return the reranker called `name` (RERANKER by default), None for "none" """
+    name = name or DEFAULT_RERANKER
+    if name == "none":
+        return None
+    if name not in RERANKERS:
+        logger.error(f"Unknown reranker {name}")
+        raise ValueError(f"Unknown reranker {name}, expected one of {list(RERANKERS)}")
+    return RERANKERS[name]()
@@ -1,6 +1,5 @@
 from typing import Any, List
 
-from langchain import hub
 from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage
 from langchain_core.output_parsers import StrOutputParser
@@ -8,14 +7,16 @@ from langchain_core.prompts import ChatPromptTemplate
 
 from vectrix_graphs.logger import setup_logger
 
+from .prompt_registry import prompts
+
 logger = setup_logger(__name__, level="INFO")
 
 
 class ChainFactory:
     @staticmethod
     def create_langsmith_chain(llm, prompt_uri, tools: list[Any] | None = None):
-        """Create LangSmith chain."""
-        prompt = hub.pull(prompt_uri)
+        """Create LangSmith chain from a prompt of the prompt registry."""
+        prompt = prompts.get(prompt_uri)
         if tools:
             return prompt | llm.bind_tools(tools=tools)
         else:
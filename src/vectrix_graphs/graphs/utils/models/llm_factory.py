@@ -1,32 +1,333 @@
-from typing import Literal
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, ClassVar, Dict, Literal, Tuple
+from uuid import UUID
 
+import httpx
 from langchain_anthropic import ChatAnthropic
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
 from langchain_openai import ChatOpenAI
 from langchain_together import ChatTogether
 
+from vectrix_graphs.helpers.rate_limiter import RateLimiter, limiters
+from vectrix_graphs.logger import setup_logger
+from vectrix_graphs.metrics import LLM_ERRORS, LLM_LATENCY, LLM_TOKENS, metrics
+
+logger = setup_logger(__name__, level="INFO")
+
+
+class _ConnectionCounter:
+    """Count requests and newly opened connections of an httpx transport"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self._seen = set()
+
+    def record(self, pool):
+        self.requests += 1
+        for connection in pool.connections:
+            if id(connection) not in self._seen:
+                self._seen.add(id(connection))
+                self.connections_opened += 1
+        # Forget closed connections so their ids can be reused
+        self._seen &= {id(connection) for connection in pool.connections}
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    def __init__(self, counter: _ConnectionCounter, **kwargs):
+        super().__init__(**kwargs)
+        self.counter = counter
+
+    def handle_request(self, request):
+        response = super().handle_request(request)
+        self.counter.record(self._pool)
+        return response
+
+
+class _AsyncCountingTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, counter: _ConnectionCounter, **kwargs):
+        super().__init__(**kwargs)
+        self.counter = counter
+
+    async def handle_async_request(self, request):
+        response = await super().handle_async_request(request)
+        self.counter.record(self._pool)
+        return response
+
+
+class HTTPPools:
+    """
+    Shared keep-alive connection pools for the OpenAI-compatible chat models.
+
+    One sync and one async httpx client are created lazily and shared by every
+    cached LLM instance, so TLS connections are reused across requests. The pool
+    sizes are tuned with LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE and
+    LLM_HTTP_KEEPALIVE_EXPIRY.
+    """
+
+    def __init__(self):
+        self.counter = _ConnectionCounter()
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
 
-class LLMFactory:
     @staticmethod
-    def create_llm(mode: Literal["local", "online"], model_type: str, **kwargs):
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", 100)),
+            max_keepalive_connections=int(os.environ.get("LLM_HTTP_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=float(os.environ.get("LLM_HTTP_KEEPALIVE_EXPIRY", 30)),
+        )
+
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None or self._client.is_closed:
+                self._client = httpx.Client(
+                    transport=_CountingTransport(self.counter, limits=self._limits())
+                )
+            return self._client
+
+    def async_client(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._async_client is None or self._async_client.is_closed:
+                self._async_client = httpx.AsyncClient(
+                    transport=_AsyncCountingTransport(
+                        self.counter, limits=self._limits()
+                    )
+                )
+            return self._async_client
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.counter.requests
+        opened = self.counter.connections_opened
+        return {
+            "requests": requests,
+            "connections_opened": opened,
+            "connection_reuse_ratio": 1 - opened / requests if requests else 0.0,
+        }
+
+    async def aclose(self):
+        with self._lock:
+            client, self._client = self._client, None
+            async_client, self._async_client = self._async_client, None
+        if client is not None:
+            client.close()
+        if async_client is not None:
+            await async_client.aclose()
+
+
+def _token_usage(response: LLMResult) -> Tuple[int, int]:
+    """Input and output tokens of an LLM response, zero when not reported"""
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Record the latency, token usage and errors of the calls of one model"""
+
+    # Runs in the calling thread, recording a sample is cheaper than a hand-off
+    run_inline = True
+
+    def __init__(self, model: str):
+        self.model = model
+        self._started: Dict[UUID, float] = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            LLM_LATENCY.observe(time.perf_counter() - started, model=self.model)
+        input_tokens, output_tokens = _token_usage(response)
+        LLM_TOKENS.inc(input_tokens, model=self.model, type="input")
+        LLM_TOKENS.inc(output_tokens, model=self.model, type="output")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._started.pop(run_id, None)
+        LLM_ERRORS.inc(model=self.model)
+
+
+# Set while a generation holds its rate limiter slot, e.g. when it streams
+_holding_slot: ContextVar[bool] = ContextVar("holding_rate_limit_slot", default=False)
+
+
+class _RateLimited:
+    """
+    Chat model mixin admitting every generation through the shared rate limiter
+    of its provider and model. Streams hold their slot until they finish.
+    """
+
+    rate_limit_provider: ClassVar[str] = ""
+
+    def _rate_limiter(self) -> RateLimiter:
+        model = getattr(self, "model_name", None) or getattr(self, "model", "")
+        return limiters.get(self.rate_limit_provider, model)
+
+    def _generate(self, *args, **kwargs):
+        if _holding_slot.get():
+            return super()._generate(*args, **kwargs)
+        with self._rate_limiter().slot():
+            token = _holding_slot.set(True)
+            try:
+                return super()._generate(*args, **kwargs)
+            finally:
+                _holding_slot.reset(token)
+
+    async def _agenerate(self, *args, **kwargs):
+        if _holding_slot.get():
+            return await super()._agenerate(*args, **kwargs)
+        async with self._rate_limiter().aslot():
+            token = _holding_slot.set(True)
+            try:
+                return await super()._agenerate(*args, **kwargs)
+            finally:
+                _holding_slot.reset(token)
+
+    def _stream(self, *args, **kwargs):
+        if _holding_slot.get():
+            yield from super()._stream(*args, **kwargs)
+            return
+        with self._rate_limiter().slot():
+            yield from super()._stream(*args, **kwargs)
+
+    async def _astream(self, *args, **kwargs):
+        if _holding_slot.get():
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+            return
+        async with self._rate_limiter().aslot():
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+
+
+class RateLimitedChatOpenAI(_RateLimited, ChatOpenAI):
+    rate_limit_provider: ClassVar[str] = "openai"
+
+
+class RateLimitedChatAnthropic(_RateLimited, ChatAnthropic):
+    rate_limit_provider: ClassVar[str] = "anthropic"
+
+
+class RateLimitedChatTogether(_RateLimited, ChatTogether):
+    rate_limit_provider: ClassVar[str] = "together"
+
+
+def _ratio(hits: int, misses: int) -> float:
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+def _cache_key(mode: str, model_type: str, kwargs: Dict[str, Any]) -> Tuple:
+    # Unhashable arguments such as callback lists are keyed by their repr
+    return (mode, model_type, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+
+
+class LLMFactory:
+    _instances: Dict[Tuple, Any] = {}
+    _lock = threading.Lock()
+    pools = HTTPPools()
+    hits = 0
+    misses = 0
+    # Bumped when the instances are dropped, chains holding them are rebuilt
+    generation = 0
+
+    @classmethod
+    def create_llm(cls, mode: Literal["local", "online"], model_type: str, **kwargs):
         """
-        Factory method to create LLM instances.
+        Factory method returning LLM instances.
+
+        Instances are cached per (mode, model_type, kwargs) and the OpenAI-compatible
+        ones share the HTTP connection pools of `LLMFactory.pools`. Every model is
+        admitted through the shared rate limiter of its provider and model.
         """
+        key = _cache_key(mode, model_type, kwargs)
+        with cls._lock:
+            llm = cls._instances.get(key)
+            if llm is not None:
+                cls.hits += 1
+                return llm
+            cls.misses += 1
+            llm = cls._instances[key] = cls._build(mode, model_type, **kwargs)
+        logger.info(f"Created {type(llm).__name__} for {mode}/{model_type}")
+        return llm
+
+    @classmethod
+    def _build(cls, mode: Literal["local", "online"], model_type: str, **kwargs):
+        pools = {
+            "http_client": cls.pools.client(),
+            "http_async_client": cls.pools.async_client(),
+        }
         if mode == "online":
             models = {
-                "default": lambda: ChatOpenAI(model_name="gpt-4o", **kwargs),
-                "": lambda: ChatAnthropic(
+                "default": lambda: RateLimitedChatOpenAI(
+                    model_name="gpt-4o", **pools, **kwargs
+                ),
+                "": lambda: RateLimitedChatAnthropic(
                     model_name="claude-3-5-sonnet-20241022", **kwargs
                 ),
-                "mini": lambda: ChatOpenAI(model="gpt-4o-mini", **kwargs),
+                "mini": lambda: RateLimitedChatOpenAI(
+                    model="gpt-4o-mini", **pools, **kwargs
+                ),
             }
         else:
             models = {
-                "default": lambda: ChatTogether(
-                    model="meta-llama/Meta-Llama-3.1-405B-Instruct-Turbo", **kwargs
+                "default": lambda: RateLimitedChatTogether(
+                    model="meta-llama/Meta-Llama-3.1-405B-Instruct-Turbo",
+                    **pools,
+                    **kwargs,
                 ),
-                "turbo": lambda: ChatTogether(
-                    model="meta-llama/Meta-Llama-3.1-70B-Instruct-Turbo", **kwargs
+                "turbo": lambda: RateLimitedChatTogether(
+                    model="meta-llama/Meta-Llama-3.1-70B-Instruct-Turbo",
+                    **pools,
+                    **kwargs,
                 ),
             }
 
-        return models.get(model_type, models["default"])()
+        model_type = model_type if model_type in models else "default"
+        kwargs["callbacks"] = [
+            *kwargs.get("callbacks", []),
+            LLMMetricsCallback(f"{mode}/{model_type}"),
+        ]
+        return models[model_type]()
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Instance cache counters and connection reuse of the shared pools"""
+        return {"instance_hits": cls.hits, "instance_misses": cls.misses} | (
+            cls.pools.stats()
+        )
+
+    @classmethod
+    async def aclose(cls):
+        """Drop the cached instances and close the shared connection pools"""
+        with cls._lock:
+            cls._instances.clear()
+            cls.generation += 1
+        await cls.pools.aclose()
+
+
+metrics.gauge(
+    "vectrix_llm_instance_cache_hit_ratio",
+    "Share of LLMFactory.create_llm calls served from the instance cache",
+    (),
+    lambda: [({}, _ratio(LLMFactory.hits, LLMFactory.misses))],
+)
+metrics.gauge(
+    "vectrix_llm_connection_reuse_ratio",
+    "Share of LLM HTTP requests sent on a reused connection",
+    (),
+    lambda: [({}, LLMFactory.pools.stats()["connection_reuse_ratio"])],
+)
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+from langchain_core.load import dumps, loads
+from langchain_core.prompts import BasePromptTemplate
+
+from vectrix_graphs.logger import setup_logger
+
+logger = setup_logger(__name__, level="INFO")
+
+
+def _hub_pull(uri: str) -> BasePromptTemplate:
+    # The hub client is only imported when a prompt is pulled
+    from langchain import hub
+
+    return hub.pull(uri)
+
+
+# Every LangSmith hub prompt used by the graphs and the metadata extraction
+PROMPT_URIS = (
+    "vectrix/intent_detection",
+    "vectrix/split_questions",
+    "vectrix/answer_question",
+    "vectrix/cite_sources",
+    "vectrix/question_rewriter",
+    "vectrix/hallucination_prompt",
+    "vectrix/question_context_reformulation",
+    "entity_extraction",
+)
+DEFAULT_SNAPSHOT_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "vectrix_graphs", "prompts"
+)
+
+
+class PromptRegistry:
+    """
+    Process-wide store of the LangSmith hub prompts.
+
+    Prompts are pulled once at startup and served from memory afterwards, so
+    graph nodes never fetch a prompt while handling a request. Every pulled prompt
+    is snapshotted to `snapshot_dir` and the snapshot is used when the hub cannot
+    be reached, or exclusively with PROMPT_OFFLINE=1 for air-gapped deployments.
+    A background task re-pulls the prompts every `refresh_interval` seconds and
+    bumps `version` when one of them changed, so memoized chains are rebuilt.
+
+    args:
+        snapshot_dir: directory of the prompt snapshots
+        refresh_interval: seconds between background refreshes, 0 disables them
+        offline: never contact the hub, only use the snapshots
+    """
+
+    def __init__(
+        self,
+        snapshot_dir: Optional[str] = None,
+        refresh_interval: Optional[float] = None,
+        offline: Optional[bool] = None,
+        pull: Callable[[str], BasePromptTemplate] = _hub_pull,
+    ):
+        self.snapshot_dir = snapshot_dir or os.environ.get(
+            "PROMPT_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR
+        )
+        if refresh_interval is None:
+            refresh_interval = float(os.environ.get("PROMPT_REFRESH_INTERVAL", 300))
+        self.refresh_interval = refresh_interval
+        if offline is None:
+            offline = os.environ.get("PROMPT_OFFLINE", "0") == "1"
+        self.offline = offline
+        self.version = 0
+        self._pull = pull
+        self._prompts: Dict[str, BasePromptTemplate] = {}
+        self._serialized: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _snapshot_path(self, uri: str) -> str:
+        return os.path.join(self.snapshot_dir, uri.replace("/", "__") + ".json")
+
+    def _read_snapshot(self, uri: str) -> Optional[str]:
+        try:
+            with open(self._snapshot_path(uri)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_snapshot(self, uri: str, serialized: str):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = self._snapshot_path(uri)
+        with open(f"{path}.tmp", "w") as f:
+            f.write(serialized)
+        os.replace(f"{path}.tmp", path)
+
+    def _fetch(self, uri: str) -> str:
+        """Pull a prompt from the hub, falling back to its snapshot"""
+        if not self.offline:
+            try:
+                serialized = dumps(self._pull(uri))
+                self._write_snapshot(uri, serialized)
+                return serialized
+            except Exception as e:
+                logger.warning(f"Unable to pull prompt {uri}, using snapshot: {e}")
+        serialized = self._read_snapshot(uri)
+        if serialized is None:
+            logger.error(f"Prompt {uri} is not available")
+            raise ValueError(f"Prompt {uri} is not available")
+        return serialized
+
+    def _store(self, uri: str, serialized: str) -> bool:
+        """Keep a serialized prompt, returns whether it changed"""
+        with self._lock:
+            if self._serialized.get(uri) == serialized:
+                return False
+            self._prompts[uri] = loads(serialized)
+            self._serialized[uri] = serialized
+            return True
+
+    def _try_fetch(self, uri: str) -> Optional[str]:
+        try:
+            return self._fetch(uri)
+        except ValueError:
+            # Keep serving the prompt already in memory, if any
+            return None
+
+    def load(self, uris: Iterable[str] = PROMPT_URIS):
+        """Fetch the given prompts concurrently and bump `version` on changes"""
+        uris = list(uris)
+        with ThreadPoolExecutor(max_workers=len(uris) or 1) as pool:
+            fetched = list(pool.map(self._try_fetch, uris))
+        changed = [
+            uri
+            for uri, serialized in zip(uris, fetched)
+            if serialized is not None and self._store(uri, serialized)
+        ]
+        if changed:
+            with self._lock:
+                self.version += 1
+            logger.info(f"Loaded {len(changed)} prompts (version {self.version})")
+
+    def get(self, uri: str) -> BasePromptTemplate:
+        """Return a prompt, fetching it on first use if it was not preloaded"""
+        prompt = self._prompts.get(uri)
+        if prompt is None:
+            self._store(uri, self._fetch(uri))
+            prompt = self._prompts[uri]
+        return prompt
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await asyncio.to_thread(self.load, list(self._prompts))
+            except Exception as e:
+                logger.error(f"Prompt refresh failed: {e}")
+
+    async def start(self):
+        """Load every prompt and start the background refresh"""
+        await asyncio.to_thread(self.load)
+        if self.refresh_interval and not self.offline and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Stop the background refresh"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+
+prompts = PromptRegistry()
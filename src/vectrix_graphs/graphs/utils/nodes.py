@@ -1,17 +1,56 @@
-from langchain_core.messages import AIMessage
-from langchain_openai import ChatOpenAI
-from langchain_together import ChatTogether
-from langgraph.constants import Send
-
-from vectrix_graphs.db.weaviate import Weaviate
-
-from .handlers.document_handler import DocumentHandler
+import asyncio
+import functools
+import os
+
+from langchain_core.messages import AIMessage, RemoveMessage
+
+from vectrix_graphs.db import get_async_vector_db
+from vectrix_graphs.db.clients import clients
+from vectrix_graphs.metrics import timed_nodes
+
+from .budget import (
+    GRADER_RESERVE,
+    REWRITE_RESERVE,
+    SPLIT_RESERVE,
+    Budget,
+    max_rewrites,
+)
+from .handlers.document_handler import CONTEXT_TOKENS, DocumentHandler
+from .handlers.history_handler import (
+    HISTORY_TURNS,
+    SUMMARY_PROMPT,
+    format_history,
+    messages_to_compact,
+    recent_messages,
+)
+from .handlers.intent_handler import IntentClassifier
+from .handlers.rerank_handler import RERANK_CANDIDATES, RERANK_TOP_N, get_reranker
 from .models.chain_factory import ChainFactory
 from .models.llm_factory import LLMFactory
+from .models.prompt_registry import prompts
 from .models.tools import CitedSources, Intent, QuestionList
-from .state import OverallState, QuestionState
+from .state import OverallState, ReplaceDocuments
+
+
+def _memoized_chain(build):
+    """
+    Build a chain once per mode and reuse it, rebuilding it when the prompt
+    registry loaded a new version of the prompts or the LLM instances were closed.
+    """
 
+    @functools.wraps(build)
+    def wrapper(self, mode):
+        key = (build.__name__, mode)
+        version = (prompts.version, LLMFactory.generation)
+        cached = self._chains.get(key)
+        if cached is None or cached[0] != version:
+            cached = self._chains[key] = (version, build(self, mode))
+        return cached[1]
 
+    return wrapper
+
+
+@timed_nodes
 class GraphNodes:
     def __init__(self, logger, mode="local"):
         if mode not in ["local", "online"]:
@@ -23,48 +62,165 @@ class GraphNodes:
         self.llm_factory = LLMFactory()
         self.chain_factory = ChainFactory()
         self.document_handler = DocumentHandler()
-        self.weaviate = Weaviate()
+        self.intent_classifier = IntentClassifier()
+        self.vector_db = get_async_vector_db()
+        self._chains = {}
+        self._rerankers = {}
+
+    @property
+    def answer_cache(self):
+        return clients.answer_cache()
+
+    @staticmethod
+    def _collection_name(config) -> str:
+        """Read the collection to search from the graph config"""
+        return config.get("configurable", {}).get(
+            "collection_name", os.environ.get("WEAVIATE_COLLECTION")
+        )
 
+    def _reranker(self, config):
+        """Reranker selected in the graph config, None when reranking is off"""
+        name = config.get("configurable", {}).get("reranker")
+        if name not in self._rerankers:
+            self._rerankers[name] = get_reranker(name)
+        return self._rerankers[name]
+
+    @_memoized_chain
     def _setup_intent_detection(self, mode):
         llm = self.llm_factory.create_llm(mode, "default", temperature=0)
         return self.chain_factory.create_langsmith_chain(
             llm, "vectrix/intent_detection", tools=[Intent]
         )
 
+    @_memoized_chain
     def _setup_question_detection(self, mode):
         llm = self.llm_factory.create_llm(mode, "default", temperature=0)
         return self.chain_factory.create_langsmith_chain(
             llm, "vectrix/split_questions", tools=[QuestionList]
         )
 
+    @_memoized_chain
     def _rag_answer_chain(self, mode):
         llm = self.llm_factory.create_llm(mode, "claude", temperature=0)
         return self.chain_factory.create_langsmith_chain(llm, "vectrix/answer_question")
 
+    @_memoized_chain
     def _setup_cite_sources_chain(self, mode):
         llm = self.llm_factory.create_llm(mode, "mini", temperature=0)
         return self.chain_factory.create_langsmith_chain(
             llm, "vectrix/cite_sources", tools=[CitedSources]
         )
 
+    @_memoized_chain
     def _question_rewriter_chain(self, mode):
         llm = self.llm_factory.create_llm(mode, "mini", temperature=0)
         return self.chain_factory.create_langsmith_chain(
             llm, "vectrix/question_rewriter"
         )
 
+    @_memoized_chain
     def _setup_hallucination_grader(self, mode):
         llm = self.llm_factory.create_llm(mode, "mini", temperature=0)
         return self.chain_factory.create_langsmith_chain(
             llm, "vectrix/hallucination_prompt"
         )
 
+    @_memoized_chain
     def _rewrite_chat_history(self, mode):
         llm = self.llm_factory.create_llm(mode, "default", temperature=0)
         return self.chain_factory.create_langsmith_chain(
             llm, "vectrix/question_context_reformulation"
         )
 
+    @_memoized_chain
+    def _summary_chain(self, mode):
+        llm = self.llm_factory.create_llm(mode, "mini", temperature=0)
+        return SUMMARY_PROMPT | llm
+
+    def _build_chains(self):
+        for build in (
+            self._setup_intent_detection,
+            self._setup_question_detection,
+            self._rag_answer_chain,
+            self._setup_cite_sources_chain,
+            self._question_rewriter_chain,
+            self._setup_hallucination_grader,
+            self._rewrite_chat_history,
+            self._summary_chain,
+        ):
+            build(self.mode)
+
+    async def _warm_up_step(self, name, step):
+        try:
+            await step()
+        except Exception as e:
+            self.logger.warning(f"Warm-up step {name} failed: {e}")
+
+    async def warm_up(self, prime: bool = True):
+        """
+        Pay the cold costs of the first request: build the chains, which loads
+        their prompts and models, connect the vector database and, with `prime`,
+        send a one-token call through the shared LLM connection pool.
+        """
+        await self._warm_up_step(
+            "chains", lambda: asyncio.to_thread(self._build_chains)
+        )
+        collection = self._collection_name({})
+        if collection:
+            await self._warm_up_step(
+                "vector_db", lambda: self.vector_db.with_collection(collection)
+            )
+        if prime:
+            await self._warm_up_step("prime", self._prime)
+
+    async def _prime(self):
+        llm = self.llm_factory.create_llm(self.mode, "default", temperature=0)
+        await llm.ainvoke("Hi", max_tokens=1)
+
+    async def prepare_turn(self, state: OverallState, config):
+        """
+        Reset the state of the previous turn and, in a persisted thread, fold the
+        oldest turns into the rolling summary.
+        """
+        update = {
+            "rewrite_count": 0,
+            "speculative_documents": None,
+            "documents": ReplaceDocuments(),
+        } | Budget.start(config)
+        if not config.get("configurable", {}).get("thread_id"):
+            return update
+
+        old = messages_to_compact(state["messages"])
+        if old:
+            self.logger.info(f"Summarizing {len(old)} earlier messages")
+            try:
+                response = await self._summary_chain(self.mode).ainvoke(
+                    {
+                        "summary": state.get("summary") or "None",
+                        "messages": format_history(old),
+                    }
+                )
+            except Exception as e:
+                # The models only see the last turns anyway, retry next turn
+                self.logger.warning(f"Unable to summarize the conversation: {e}")
+                return update
+            update["summary"] = response.content
+            update["messages"] = [RemoveMessage(id=message.id) for message in old]
+        return update
+
+    @staticmethod
+    def _chat_history(state: OverallState, config):
+        """
+        Conversation context of the current question. Only a persisted thread is
+        summarized, so the history sent by the client is otherwise kept whole.
+        """
+        threaded = config.get("configurable", {}).get("thread_id")
+        return recent_messages(
+            state["messages"],
+            state.get("summary", ""),
+            turns=HISTORY_TURNS if threaded else None,
+        )
+
     async def detect_message_history(self, state: OverallState, config):
         if len(state["messages"]) > 1:
             return "True"
@@ -72,29 +228,63 @@ class GraphNodes:
             return "False"
 
     async def rewrite_chat_history(self, state: OverallState, config):
-        rewritten_question = self._rewrite_chat_history(self.mode, state["messages"])
+        rewritten_question = self._rewrite_chat_history(self.mode)
 
         question = state["messages"][-1].content
-        chat_history = ""
-        for message in state["messages"][:-1]:
-            chat_history += f"{message.type}: {message.content}\n"
+        chat_history = format_history(self._chat_history(state, config))
         result = await rewritten_question.ainvoke(
             {"USER_QUESTION": question, "CHAT_HISTORY": chat_history}
         )
         return {"messages": result["reformulated_question"]}
 
     async def detect_intent(self, state: OverallState, config):
+        # Record the collection state before retrieval, for the answer cache
+        generation = self.answer_cache.generation(self._collection_name(config) or "")
+        update = await self._detect_intent(state, config)
+        update["standalone_question"] = state["messages"][-1].content
+        update["answer_generation"] = generation
+        return update
+
+    async def _detect_intent(self, state: OverallState, config):
         self.logger.info("Detecting intent")
         messages = state["messages"]
         question = messages[-1].content
-        # Select all messages except the last one
-        chat_history = messages[:-1]
+        # Select the recent messages before the last one
+        chat_history = self._chat_history(state, config)
+        configurable = config.get("configurable", {})
+
+        if configurable.get("local_intent_classifier", False):
+            intent = self.intent_classifier.predict(question, chat_history)
+            if intent is not None:
+                self.logger.info(f"Intent detected locally: {intent.value}")
+                return {"intent": intent.value, "speculative_documents": None}
+
         intent_detection = self._setup_intent_detection(self.mode)
-        response = await intent_detection.ainvoke(
-            {"chat_history": chat_history, "question": question}
-        )
+        speculation = None
+        if configurable.get("speculative_retrieval", False):
+            # Most questions end up in the RAG path, search while the intent is known
+            speculation = asyncio.create_task(self._search([question], config))
+        try:
+            response = await intent_detection.ainvoke(
+                {"chat_history": chat_history, "question": question}
+            )
+        except BaseException:
+            if speculation is not None:
+                speculation.cancel()
+            raise
         self.logger.info(f"Intent detection response: {response['intent']}")
-        return {"intent": response["intent"]}
+
+        update = {"intent": response["intent"], "speculative_documents": None}
+        if speculation is not None:
+            if response["intent"] != "specific_question":
+                speculation.cancel()
+            else:
+                try:
+                    update["speculative_documents"] = await speculation
+                    update["speculative_question"] = question
+                except Exception as e:
+                    self.logger.warning(f"Speculative retrieval failed: {e}")
+        return update
 
     async def decide_answering_path(self, state: OverallState, config):
         self.logger.info(f"Deciding answering path for intent: {state['intent']}")
@@ -111,41 +301,29 @@ class GraphNodes:
 
     async def split_question_list(self, state: OverallState, config):
         self.logger.info("Splitting question list")
-        split_questions = self._setup_question_detection(self.mode)
         question = state["messages"][-1].content
+        if not Budget.of(state, config).allows(SPLIT_RESERVE):
+            self.logger.warning("Latency budget low, not splitting the question")
+            return {"question_list": {"questions": [question]}}
+        split_questions = self._setup_question_detection(self.mode)
         questions = await split_questions.ainvoke({"QUESTION": question})
         self.logger.info("Question was split into %s parts", len(questions))
         return {"question_list": questions}
 
     async def llm_answer(self, state: OverallState, config):
         self.logger.info("Answering question with LLM")
-        messages = state["messages"]
-        if self.mode == "online":
-            llm = ChatOpenAI(temperature=0, model="gpt-4o")
-        else:
-            llm = ChatTogether(
-                model="meta-llama/Meta-Llama-3.1-405B-Instruct-Turbo", temperature=0
-            )
+        messages = self._chat_history(state, config)
+        messages.append(state["messages"][-1])
+        llm = self.llm_factory.create_llm(self.mode, "default", temperature=0)
         response = await llm.ainvoke(messages)
         response = AIMessage(content=response.content)
         return {"messages": response}
 
-    async def retrieve_documents(self, state: OverallState, config):
-        """
-        We will perform a vector search for all question and return the top documents for eacht question
-        """
-        # Initiate the documents list
-        self.logger.info(
-            "Answering the following questions: %s", state["question_list"]["questions"]
-        )
-        return [
-            Send("retrieve", {"question": q})
-            for q in state["question_list"]["questions"]
-        ]
-
-    async def retrieve(self, state: QuestionState, config):
+    async def retrieve_batch(self, state: OverallState, config):
         """
-        Retrieve documents relevant to the question
+        Retrieve documents for all sub-questions at once. The questions are embedded
+        in a single request and the vector queries run concurrently, so a multi-part
+        question costs roughly one retrieval round trip.
 
         Args:
             state: GraphState
@@ -153,23 +331,69 @@ class GraphNodes:
         Returns:
             state (dict): Updates documents key with relevant documents
         """
-        self.logger.info("Retrieving documents")
-        question = state["question"]
-        results = self.vectordb.similarity_search(query=question, k=3)
-        # Filter all documents with a cosine distance smaller than 0.45
-        # filtered_documents = [doc for doc in results if doc.metadata['cosine_distance'] < 0.8]
+        questions = state["question_list"]["questions"]
+        documents = []
+        speculative = state.get("speculative_documents")
+        if speculative is not None and state.get("speculative_question") in questions:
+            # The question was already searched while its intent was detected
+            self.logger.info(
+                "Reusing %s speculatively retrieved documents", len(speculative)
+            )
+            documents = list(speculative)
+            questions = [q for q in questions if q != state["speculative_question"]]
+        if questions:
+            self.logger.info("Retrieving documents for the questions: %s", questions)
+            documents += await self._search(questions, config)
+        return {"documents": documents, "speculative_documents": None}
+
+    async def _search(self, questions, config):
+        """Search the configured collection and flatten the results"""
+        configurable = config.get("configurable", {})
+        vectordb = await self.vector_db.with_collection(self._collection_name(config))
+        # Retrieve wide when a reranker picks the best candidates afterwards
+        k = RERANK_CANDIDATES if self._reranker(config) else 3
+        results = await vectordb.similarity_search_batch(
+            queries=questions,
+            k=k,
+            type=configurable.get("search_type", "text"),
+            alpha=configurable.get("hybrid_alpha", 0.5),
+        )
+        return [doc for documents in results for doc in documents]
+
+    async def rerank(self, state: OverallState, config):
+        """Keep the candidates of all sub-questions that best match the question"""
+        reranker = self._reranker(config)
+        if reranker is None or not state["documents"]:
+            return {}
+        documents = await self.document_handler.filter_duplicates(state["documents"])
+        top_n = config.get("configurable", {}).get("rerank_top_n", RERANK_TOP_N)
+        self.logger.info(
+            f"Reranking {len(documents)} documents with {type(reranker).__name__}"
+        )
+        try:
+            reranked = await reranker.rerank(
+                state["messages"][-1].content, documents, top_n
+            )
+        except Exception as e:
+            self.logger.warning(f"Reranking failed, keeping search order: {e}")
+            return {}
 
-        return {"documents": results}
+        return {"documents": ReplaceDocuments(reranked)}
 
     async def filter_docs(self, state: OverallState, config):
         documents = state["documents"]
         if not documents:
-            return {"documents": []}
+            return {"documents": ReplaceDocuments()}
 
         filtered_docs = await self.document_handler.filter_duplicates(documents)
+        filtered_docs = self.document_handler.build_context(
+            filtered_docs,
+            max_tokens=config.get("configurable", {}).get(
+                "context_tokens", CONTEXT_TOKENS
+            ),
+        )
 
-        state["documents"].clear()
-        return {"documents": filtered_docs}
+        return {"documents": ReplaceDocuments(filtered_docs)}
 
     async def rag_answer(self, state: OverallState, config):
         self.logger.info(
@@ -177,9 +401,7 @@ class GraphNodes:
         )
         question = state["messages"][-1].content
 
-        sources = ""
-        for i, doc in enumerate(state["documents"], 1):
-            sources += f"{i}. {doc.page_content}\n\n"
+        sources = self.document_handler.format_context(state["documents"])
 
         final_answer_chain = self._rag_answer_chain(self.mode)
         response = await final_answer_chain.ainvoke(
@@ -199,18 +421,46 @@ class GraphNodes:
 
     async def final_answer(self, state: OverallState, config):
         self.logger.info("Final answer: %s", state["temporary_answer"])
+        question = state.get("standalone_question")
+        cache = config.get("configurable", {}).get("answer_cache", True)
+        if question and cache and state.get("answer_verified"):
+            await asyncio.to_thread(
+                self.answer_cache.store,
+                self.mode,
+                self._collection_name(config) or "",
+                question,
+                state["temporary_answer"].content,
+                state["answer_generation"],
+            )
         return {"messages": state["temporary_answer"]}
 
     async def hallucination_grader(self, state: OverallState, config):
+        # A failed grade only triggers a rewrite, skip it when none is possible
+        budget = Budget.of(state, config)
+        if state.get("rewrite_count", 0) >= max_rewrites(config):
+            self.logger.warning("Rewrite limit reached, accepting the answer")
+            return {"hallucination_grade": True, "answer_verified": False}
+        if not budget.allows(GRADER_RESERVE + REWRITE_RESERVE):
+            self.logger.warning("Latency budget low, skipping hallucination grading")
+            return {"hallucination_grade": True, "answer_verified": False}
+
         self.logger.info("Grading hallucination")
         answer = state["temporary_answer"]
         documents = state["documents"]
         hallucination_grader = self._setup_hallucination_grader(self.mode)
-        response = await hallucination_grader.ainvoke(
-            {"documents": documents, "generation": answer}
-        )
+        try:
+            response = await asyncio.wait_for(
+                hallucination_grader.ainvoke(
+                    {"documents": documents, "generation": answer}
+                ),
+                # A later grade leaves no time to act on it
+                timeout=budget.timeout(reserve=REWRITE_RESERVE),
+            )
+        except asyncio.TimeoutError:
+            self.logger.warning("Hallucination grading timed out, accepting the answer")
+            return {"hallucination_grade": True, "answer_verified": False}
         grade = response["binary_score"]
-        return {"hallucination_grade": grade}
+        return {"hallucination_grade": grade, "answer_verified": grade}
 
     async def grade(self, state: OverallState, config):
         if state["hallucination_grade"]:
@@ -221,23 +471,22 @@ class GraphNodes:
             return "hallucinations"
 
     async def rewrite_question(self, state: OverallState, config):
-        question_rewriter = self._setup_question_rewriter_chain(self.mode)
+        question_rewriter = self._question_rewriter_chain(self.mode)
         question = state["messages"][-1].content
         rewritten_question = await question_rewriter.ainvoke({"question": question})
-        return {"messages": rewritten_question}
+        return {
+            "messages": rewritten_question,
+            "rewrite_count": state.get("rewrite_count", 0) + 1,
+        }
 
     async def cite_sources(self, state: OverallState, config):
         question = state["messages"][-1].content
-        sources = ""
 
         if len(state["documents"]) == 0:
             self.logger.error("Unable to answer, no sources found")
             return {"cited_sources": ""}
 
-        for i, doc in enumerate(state["documents"], 1):
-            source = doc.metadata.get("source", "Unknown")
-            url = doc.metadata.get("url", "No URL provided")
-            sources += f"{i}. {doc.page_content}\n\nURL: {url}\nSOURCE: {source}\n"
+        sources = self.document_handler.format_sources(state["documents"])
 
         cite_sources_chain = self._setup_cite_sources_chain(self.mode)
 
@@ -1,5 +1,5 @@
 import operator
-from typing import Annotated, List, Literal, Sequence
+from typing import Annotated, List, Literal, Optional, Sequence
 
 from langchain_core.documents import Document
 from langchain_core.messages import BaseMessage
@@ -9,6 +9,17 @@ from typing_extensions import TypedDict
 from .models.tools import CitedSources
 
 
+class ReplaceDocuments(list):
+    """Documents replacing the current ones instead of being appended to them"""
+
+
+def add_documents(current: List[Document], update: List[Document]) -> List[Document]:
+    """Append retrieved documents, or replace them by a `ReplaceDocuments` list"""
+    if isinstance(update, ReplaceDocuments):
+        return list(update)
+    return (current or []) + (update or [])
+
+
 class QuestionState(TypedDict):
     question: str
 
@@ -20,9 +31,25 @@ class OverallState(TypedDict):
         "specific_question", "greeting", "metadata_query", "follow_up_question"
     ]
     question_list: List[str]
-    documents: Annotated[List[Document], operator.add]
+    documents: Annotated[List[Document], add_documents]
     cited_sources: List[CitedSources]
     hallucination_grade: bool
+    # Whether the answer passed the hallucination grader, answers accepted
+    # without a grade are not cached
+    answer_verified: bool
+    # Documents retrieved while the intent was detected, see `speculative_retrieval`
+    speculative_documents: Optional[List[Document]]
+    speculative_question: str
+    # Question answered by this run and write generation of its collection, used
+    # to store the final answer in the answer cache
+    standalone_question: str
+    answer_generation: int
+    # Unix timestamp the run should finish by and rewrites done so far, see
+    # `budget.Budget`
+    deadline: float
+    rewrite_count: int
+    # Summary of the turns removed from `messages` in a persisted thread
+    summary: str
 
 
 class SubgraphState(TypedDict):
@@ -1,117 +1,186 @@
-import json
+import asyncio
+import math
+import os
 import time
 import uuid
 
-from langsmith import Client
+import orjson
 
 from ...logger import setup_logger
 
+# Graph nodes whose LLM tokens are streamed to the client
+ANSWER_NODES = ("llm_answer", "rag_answer", "answer_question")
+# Tokens arriving within this many milliseconds are sent as one chunk, 0 disables
+STREAM_COALESCE_MS = float(os.environ.get("STREAM_COALESCE_MS", 0))
+
+_END = object()
+
+
+def _text(content) -> str:
+    """Text of a message chunk, whose content may be a list of content blocks"""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in content
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
 
 class StreamProcessor:
     """
-    A class for processing streaming events from a langgraph.
+    Streams the answer of a langgraph as OpenAI chat completion chunks.
 
-    This class initializes a LangSmith Client and provides methods to process
-    streaming events from a graph, handling various event types and yielding
-    progress updates, streamed data, and final outputs.
-
-    Attributes:
-        client (Client): An instance of the LangSmith Client.
+    The tokens of the answer nodes are read from the "messages" stream mode of
+    the graph. The envelope of a chunk is serialized once per stream, so each
+    token only costs the serialization of its delta.
 
     Methods:
-        process_stream(graph, question): Asynchronously processes the stream of events
-        from the given graph for the provided question.
+        process_stream(messages, config): Asynchronously streams the answer of
+        the graph to the given messages.
+        replay(answer, system_fingerprint): Streams a precomputed answer.
     """
 
-    def __init__(self, graph):
-        self.client = Client()
+    def __init__(self, graph, coalesce_ms: float = STREAM_COALESCE_MS):
         self.logger = setup_logger("stream_processor")
         self.graph = graph
         self.session_id = str(uuid.uuid4())
+        self.created = int(time.time())
+        self.coalesce = coalesce_ms / 1000
 
-    async def process_stream(self, messages):
+    async def process_stream(self, messages, config=None):
         """
-        Asynchronously processes the stream of events from the given graph for the provided question.
-
-        This method yields progress updates, streamed data, and final outputs as the graph processes
-        the question. It handles various event types, including chat model streaming and chain end events.
+        Asynchronously stream the answer of the graph to the given messages.
 
         Args:
-            graph: The langgraph object to process events from.
             messages (list): The messages to be processed by the graph.
+            config (dict): The graph config, e.g. with the thread id of the conversation.
 
         Yields:
-            dict: A dictionary containing one of the following keys:
-                - "progress": A string indicating the current step being processed.
-                - "data": A string containing streamed chunks of the answer.
-                - "final_output": The final generated answer.
-            str: The URL of the completed run in LangSmith.
-
-        Note:
-            This method uses the LangSmith Client to retrieve the final run URL.
+            str: Serialized chat completion chunks: the assistant role, the
+            answer tokens, coalesced over `coalesce_ms`, and the finish reason.
         """
+        config = config or {"configurable": {}}
+        chat_id = f"chatcmpl-{self.session_id}"
+        prefix, suffix = self._envelope(chat_id)
 
-        config = {"configurable": {}}
+        yield self._chunk(chat_id, {"role": "assistant", "content": ""})
 
-        # Generate a unique ID for this chat completion
+        tokens = self._tokens(messages, config)
+        if self.coalesce:
+            tokens = self._coalesced(tokens)
+        async for content in tokens:
+            yield self._content(prefix, suffix, content)
+
+        yield self._chunk(chat_id, {}, finish_reason="stop")
+
+    async def _tokens(self, messages, config):
+        """Text of the answer tokens streamed by the graph"""
+        from langchain_core.messages import AIMessageChunk
+
+        async for message, metadata in self.graph.astream(
+            {"messages": messages}, config=config, stream_mode="messages"
+        ):
+            # Nodes also emit their complete messages, only tokens are streamed
+            if not isinstance(message, AIMessageChunk):
+                continue
+            if metadata.get("langgraph_node") not in ANSWER_NODES:
+                continue
+            content = _text(message.content)
+            if content:
+                yield content
+
+    async def _coalesced(self, tokens):
+        """
+        Join the tokens arriving within the coalescing window. The first token is
+        sent at once to keep the time to first token low, and pending tokens are
+        sent when the window ends, even if the next token is late.
+        """
+        queue = asyncio.Queue()
+
+        async def read():
+            try:
+                async for token in tokens:
+                    queue.put_nowait(token)
+            except Exception as e:
+                queue.put_nowait(e)
+            else:
+                queue.put_nowait(_END)
+
+        reader = asyncio.create_task(read())
+        pending = []
+        flushed = -math.inf
+        try:
+            while True:
+                timeout = None
+                if pending:
+                    timeout = max(flushed + self.coalesce - time.perf_counter(), 0)
+                try:
+                    token = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    # The window ended without a new token
+                    token = None
+                if token is _END:
+                    break
+                if isinstance(token, Exception):
+                    raise token
+                now = time.perf_counter()
+                if token is not None:
+                    pending.append(token)
+                    if now - flushed < self.coalesce:
+                        continue
+                yield "".join(pending)
+                pending.clear()
+                flushed = now
+            if pending:
+                yield "".join(pending)
+        finally:
+            reader.cancel()
+
+    async def replay(self, answer: str, system_fingerprint: str):
+        """
+        Stream a precomputed answer, e.g. from the answer cache, in the same chunk
+        format as `process_stream`.
+        """
         chat_id = f"chatcmpl-{self.session_id}"
+        yield self._chunk(
+            chat_id, {"role": "assistant", "content": ""}, system_fingerprint
+        )
+        yield self._chunk(chat_id, {"content": answer}, system_fingerprint)
+        yield self._chunk(chat_id, {}, system_fingerprint, finish_reason="stop")
+
+    def _fields(self, chat_id, system_fingerprint=None):
+        return {
+            "id": chat_id,
+            "object": "chat.completion.chunk",
+            "created": self.created,
+            "model": "demo",
+            "system_fingerprint": system_fingerprint or f"fp_{self.session_id[:8]}",
+        }
+
+    def _envelope(self, chat_id, system_fingerprint=None):
+        """Serialized chunk before and after the content of its delta"""
+        head = orjson.dumps(self._fields(chat_id, system_fingerprint))[:-1].decode()
+        return (
+            head + ',"choices":[{"index":0,"delta":{"content":',
+            '},"logprobs":null,"finish_reason":null}]}',
+        )
 
-        # Yield the initial chunk
-        yield json.dumps(
+    @staticmethod
+    def _content(prefix, suffix, content):
+        return prefix + orjson.dumps(content).decode() + suffix
+
+    def _chunk(self, chat_id, delta, system_fingerprint=None, finish_reason=None):
+        return orjson.dumps(
             {
-                "id": chat_id,
-                "object": "chat.completion.chunk",
-                "created": int(time.time()),
-                "model": "demo",
-                "system_fingerprint": f"fp_{self.session_id[:8]}",
+                **self._fields(chat_id, system_fingerprint),
                 "choices": [
                     {
                         "index": 0,
-                        "delta": {"role": "assistant", "content": ""},
+                        "delta": delta,
                         "logprobs": None,
-                        "finish_reason": None,
+                        "finish_reason": finish_reason,
                     }
                 ],
             }
-        )
-
-        async for event in self.graph.astream_events(
-            {"messages": messages}, version="v1", config=config
-        ):
-            kind = event["event"]
-
-            if kind == "on_chat_model_stream":
-                if event["metadata"]["langgraph_node"] in ["llm_answer", "rag_answer"]:
-                    chunk_content = event["data"]["chunk"].content
-
-                    yield json.dumps(
-                        {
-                            "id": chat_id,
-                            "object": "chat.completion.chunk",
-                            "created": int(time.time()),
-                            "model": "demo",
-                            "system_fingerprint": f"fp_{self.session_id[:8]}",
-                            "choices": [
-                                {
-                                    "index": 0,
-                                    "delta": {"content": chunk_content},
-                                    "logprobs": None,
-                                    "finish_reason": None,
-                                }
-                            ],
-                        }
-                    )
-
-        # Add a final chunk to indicate completion
-        yield json.dumps(
-            {
-                "id": chat_id,
-                "object": "chat.completion.chunk",
-                "created": int(time.time()),
-                "model": "demo",
-                "system_fingerprint": f"fp_{self.session_id[:8]}",
-                "choices": [
-                    {"index": 0, "delta": {}, "logprobs": None, "finish_reason": "stop"}
-                ],
-            }
-        )
+        ).decode()
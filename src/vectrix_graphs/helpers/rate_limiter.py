@@ -0,0 +1,282 @@
+import asyncio
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict
+
+from ..logger import setup_logger
+from ..metrics import RATE_LIMIT_QUEUE_TIME, RATE_LIMITED, metrics
+
+logger = setup_logger(name=__name__, level="INFO")
+
+INTERACTIVE = "interactive"
+INGESTION = "ingestion"
+
+# Requests per second and concurrent requests per provider and model, overridden
+# with RATE_LIMIT_<PROVIDER>_RPS and RATE_LIMIT_<PROVIDER>_CONCURRENCY
+DEFAULT_LIMITS = {
+    "openai": (50.0, 64),
+    "anthropic": (10.0, 16),
+    "together": (10.0, 16),
+    "voyage": (5.0, 8),
+    "cohere": (10.0, 16),
+}
+# After a 429 the rate is halved, down to this share of the configured rate, and
+# every successful request gives back this share
+MIN_RATE_RATIO = 0.05
+RECOVERY_RATIO = 0.05
+# Wait between admission attempts while the concurrency cap is reached
+POLL_INTERVAL = 0.01
+
+_priority: ContextVar[str] = ContextVar("rate_limit_priority", default=INTERACTIVE)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def priority(value: str):
+    """Run the block with the given request priority, e.g. `INGESTION`"""
+    token = _priority.set(value)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def with_priority(value: str):
+    """Decorate a function or coroutine function to run with a request priority"""
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with priority(value):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with priority(value):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether a provider SDK error is a 429 response"""
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ in (
+        "RateLimitError",
+        "TooManyRequestsError",
+    )
+
+
+class RateLimiter:
+    """
+    Admission control for one provider model: a token bucket of `rate`
+    requests per second with a burst of `burst`, and at most `max_concurrency`
+    requests in flight.
+
+    Interactive requests are admitted first: ingestion requests wait while any
+    interactive request is queued. The rate adapts to the provider: it is halved
+    on every 429 and recovers additively with every successful request.
+
+    The state is guarded by a lock and waiting is done by polling, so threads
+    and coroutines share the same limiter.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        max_concurrency: int,
+        burst: float | None = None,
+    ):
+        if rate <= 0 or max_concurrency < 1:
+            logger.error(f"Invalid limits for {name}: {rate}/s, {max_concurrency}")
+            raise ValueError(f"Invalid limits for {name}: {rate}/s, {max_concurrency}")
+        self.name = name
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.max_concurrency = max_concurrency
+        self.tokens = self.burst
+        self.in_flight = 0
+        self.waiting = {INTERACTIVE: 0, INGESTION: 0}
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, priority: str) -> float:
+        """Admit the request and return 0, else return the time to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if priority != INTERACTIVE and self.waiting[INTERACTIVE]:
+                return POLL_INTERVAL
+            if self.in_flight >= self.max_concurrency:
+                return POLL_INTERVAL
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+            self.in_flight += 1
+            return 0.0
+
+    def _queue(self, priority: str, delta: int):
+        with self._lock:
+            self.waiting[priority] = self.waiting.get(priority, 0) + delta
+
+    def acquire(self) -> float:
+        """Block until the request is admitted, return the time spent queued"""
+        started = time.perf_counter()
+        priority = current_priority()
+        wait = self._try_acquire(priority)
+        if wait:
+            self._queue(priority, 1)
+            try:
+                while wait:
+                    time.sleep(wait)
+                    wait = self._try_acquire(priority)
+            finally:
+                self._queue(priority, -1)
+        return time.perf_counter() - started
+
+    async def aacquire(self) -> float:
+        """Async variant of `acquire`"""
+        started = time.perf_counter()
+        priority = current_priority()
+        wait = self._try_acquire(priority)
+        if wait:
+            self._queue(priority, 1)
+            try:
+                while wait:
+                    await asyncio.sleep(wait)
+                    wait = self._try_acquire(priority)
+            finally:
+                self._queue(priority, -1)
+        return time.perf_counter() - started
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def throttled(self):
+        """The provider answered 429: halve the rate and drain the bucket"""
+        with self._lock:
+            self.rate = max(self.max_rate * MIN_RATE_RATIO, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+        RATE_LIMITED.inc(limiter=self.name)
+        logger.warning(f"{self.name} is rate limited, lowered to {self.rate:.2f}/s")
+
+    def succeeded(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(
+                    self.max_rate, self.rate + self.max_rate * RECOVERY_RATIO
+                )
+
+    def _observe(self, waited: float):
+        RATE_LIMIT_QUEUE_TIME.observe(
+            waited, limiter=self.name, priority=current_priority()
+        )
+
+    def _done(self, error: BaseException | None):
+        self.release()
+        if error is None:
+            self.succeeded()
+        elif is_rate_limited(error):
+            self.throttled()
+
+    @contextmanager
+    def slot(self):
+        """Hold an admitted request for the duration of the block"""
+        self._observe(self.acquire())
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._done(error)
+
+    @asynccontextmanager
+    async def aslot(self):
+        """Async variant of `slot`"""
+        self._observe(await self.aacquire())
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._done(error)
+
+
+class RateLimiters:
+    """Process-wide rate limiters, one per provider and model"""
+
+    def __init__(self):
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _limits(provider: str):
+        rate, concurrency = DEFAULT_LIMITS.get(provider, (10.0, 16))
+        prefix = f"RATE_LIMIT_{provider.upper()}"
+        return (
+            float(os.environ.get(f"{prefix}_RPS", rate)),
+            int(os.environ.get(f"{prefix}_CONCURRENCY", concurrency)),
+        )
+
+    def get(self, provider: str, model: str) -> RateLimiter:
+        name = f"{provider}/{model}"
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                rate, concurrency = self._limits(provider)
+                limiter = self._limiters[name] = RateLimiter(name, rate, concurrency)
+            return limiter
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {
+            limiter.name: {
+                "rate": limiter.rate,
+                "in_flight": limiter.in_flight,
+                "waiting": sum(limiter.waiting.values()),
+            }
+            for limiter in limiters
+        }
+
+
+limiters = RateLimiters()
+
+metrics.gauge(
+    "vectrix_rate_limit_rate",
+    "Current admitted requests per second, lowered after 429 responses",
+    ("limiter",),
+    lambda: [({"limiter": n}, s["rate"]) for n, s in limiters.stats().items()],
+)
+metrics.gauge(
+    "vectrix_rate_limit_in_flight",
+    "Provider requests currently in flight",
+    ("limiter",),
+    lambda: [({"limiter": n}, s["in_flight"]) for n, s in limiters.stats().items()],
+)
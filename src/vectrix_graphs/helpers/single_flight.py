@@ -0,0 +1,98 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List
+
+from ..logger import setup_logger
+
+logger = setup_logger(name=__name__, level="INFO")
+
+
+class _Stream:
+    """Chunks of one running stream, buffered for subscribers that join late"""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.task: asyncio.Task | None = None
+        self.changed = asyncio.Condition()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls into one execution.
+
+    `do` shares the result of a coroutine between all callers with the same key
+    while it runs. `stream` runs one async iterator per key and fans its items
+    out to every subscriber, each receiving the full stream from its start.
+    Keys are forgotten once their execution finishes, so results are never
+    served after the fact; that is the job of the answer cache.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._streams: Dict[Hashable, _Stream] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls or key in self._streams
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `fn()`, or the running call with the same key"""
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+        # A disconnecting caller does not cancel the call of the others
+        return await asyncio.shield(call)
+
+    async def stream(
+        self, key: Hashable, fn: Callable[[], AsyncIterator[Any]]
+    ) -> AsyncIterator[Any]:
+        """Iterate `fn()`, or subscribe to the running stream with the same key"""
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = _Stream()
+            self._streams[key] = stream
+            stream.task = asyncio.create_task(self._produce(key, stream, fn))
+        stream.subscribers += 1
+        try:
+            index = 0
+            while True:
+                async with stream.changed:
+                    await stream.changed.wait_for(
+                        lambda: stream.done or len(stream.chunks) > index
+                    )
+                    chunks = stream.chunks[index:]
+                    finished = stream.done
+                index += len(chunks)
+                for chunk in chunks:
+                    yield chunk
+                if finished and index == len(stream.chunks):
+                    break
+            if stream.error is not None:
+                raise stream.error
+        finally:
+            stream.subscribers -= 1
+            # Nobody is listening anymore, stop generating
+            if not stream.subscribers and not stream.done:
+                self._streams.pop(key, None)
+                stream.task.cancel()
+
+    async def _produce(self, key, stream: _Stream, fn):
+        try:
+            async for chunk in fn():
+                async with stream.changed:
+                    stream.chunks.append(chunk)
+                    stream.changed.notify_all()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Shared stream failed: {e}")
+            stream.error = e
+        finally:
+            if self._streams.get(key) is stream:
+                del self._streams[key]
+            async with stream.changed:
+                stream.done = True
+                stream.changed.notify_all()
@@ -1,6 +1,7 @@
 import base64
 import io
-from typing import Any, Dict, List, Tuple
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import PIL.Image
 from unstructured.chunking.title import chunk_by_title
@@ -33,17 +34,19 @@ def _process_image(base64_image: str) -> PIL.Image.Image:
     return pil_image
 
 
-def multi_modal_extraction(
+def iter_multi_modal_extraction(
     file_path: str,
-) -> Tuple[List[List[Any]], List[Dict[str, Any]]]:
+    source_id: Optional[str] = None,
+) -> Iterator[Tuple[List[Any], Dict[str, Any]]]:
     """
-    Extract documents and images from a file.
+    Lazily extract documents and images from a file, one chunk at a time.
+    Images are only decoded and resized when their chunk is reached, so peak
+    memory does not grow with the number of chunks.
     Args:
         file_path: Path to the file to process
-    Returns:
-        Tuple containing:
-        - List of lists with text content and PIL images
-        - List of metadata dictionaries
+        source_id: Stable identity of the file, defaults to its absolute path
+    Yields:
+        Tuple of the text content with PIL images and the metadata dictionary
     Raises:
         FileNotFoundError: If the file doesn't exist
         ValueError: If the file cannot be processed
@@ -59,8 +62,7 @@ def multi_modal_extraction(
         )
 
         chunks = chunk_by_title(elements)
-        embedding_objects = []
-        embedding_metadatas = []
+        del elements
 
         logger.info(f"Extracted {len(chunks)} chunks")
 
@@ -76,6 +78,7 @@ def multi_modal_extraction(
                 "last_modified": metadata["last_modified"],
                 "languages": metadata["languages"],
                 "filetype": metadata["filetype"],
+                "source_id": source_id or os.path.abspath(file_path),
             }
 
             # Process images if present
@@ -92,10 +95,7 @@ def multi_modal_extraction(
                         embedding_object.append(pil_image)
                         metedata_dict["image_data"] = image_data
 
-            embedding_objects.append(embedding_object)
-            embedding_metadatas.append(metedata_dict)
-
-        return embedding_objects, embedding_metadatas
+            yield embedding_object, metedata_dict
 
     except FileNotFoundError as e:
         logger.error(f"File not found: {e}")
@@ -106,3 +106,30 @@ def multi_modal_extraction(
     except Exception as e:
         logger.error(f"Unexpected error extracting documents: {e}")
         raise
+
+
+def multi_modal_extraction(
+    file_path: str,
+    source_id: Optional[str] = None,
+) -> Tuple[List[List[Any]], List[Dict[str, Any]]]:
+    """
+    Extract documents and images from a file.
+    Prefer `iter_multi_modal_extraction` for large files, this function keeps every
+    chunk and image in memory.
+    Args:
+        file_path: Path to the file to process
+        source_id: Stable identity of the file, defaults to its absolute path
+    Returns:
+        Tuple containing:
+        - List of lists with text content and PIL images
+        - List of metadata dictionaries
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file cannot be processed
+    """
+    embedding_objects = []
+    embedding_metadatas = []
+    for embedding_object, metadata in iter_multi_modal_extraction(file_path, source_id):
+        embedding_objects.append(embedding_object)
+        embedding_metadatas.append(metadata)
+    return embedding_objects, embedding_metadatas
@@ -1,9 +1,16 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from .db.clients import clients
+from .graphs.registry import GRAPH_WARMUP, graphs
+from .logger import setup_logger
+from .metrics import metrics
 from .routers import chat, models
 
 # Try to load .env file if it exists (development)
@@ -13,8 +20,60 @@ try:
 except Exception:
     pass
 
+logger = setup_logger(__name__, "INFO")
+
+
+def _prompts():
+    # Imported after startup, it loads langchain_core and langsmith
+    from .graphs.utils.models.prompt_registry import prompts
+
+    return prompts
+
+
+async def _load_prompts():
+    # Imported in a worker thread to keep serving requests meanwhile
+    prompts = await asyncio.to_thread(_prompts)
+    await prompts.start()
+
+
+async def _warm_up_graphs():
+    if GRAPH_WARMUP:
+        await graphs.warm_up()
+
+
+async def warm_up(app: FastAPI):
+    """
+    Open the shared connections, load the prompts and warm up the graphs.
+
+    A failed step is logged and does not keep the worker out of traffic: the
+    connections and prompts are loaded again on first use, and /ready still
+    waits for every served graph to be warm.
+    """
+    for step in (clients.startup, _load_prompts, _warm_up_graphs):
+        try:
+            await step()
+        except Exception:
+            logger.exception(f"Warm-up step {step.__name__} failed")
+    app.state.warmed_up = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the worker serves requests at once, anything
+    # not ready yet is loaded on first use. /ready reports when it is done.
+    app.state.warmed_up = False
+    warming = asyncio.create_task(warm_up(app))
+    yield
+    warming.cancel()
+    await _prompts().stop()
+    from .graphs.utils.models.llm_factory import LLMFactory
+
+    await LLMFactory.aclose()
+    await clients.shutdown()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title="vectrix-graphs",
     description="OpenAI-compatible API for graph operations. This API implements OpenAI's API interface for drop-in compatibility.",
     version="1.0.0",
@@ -45,6 +104,27 @@ async def root():
     return {"message": "Welcome to Vectrix Graphs API"}
 
 
+# Readiness probe, public like the root endpoint: traffic is only routed to the
+# worker once the warm-up completed and every served graph is warm
+@app.get("/ready")
+async def ready():
+    warmed_up = getattr(app.state, "warmed_up", False)
+    if warmed_up and (graphs.ready() or not GRAPH_WARMUP):
+        return {"status": "ready", "graphs": graphs.status()}
+    return JSONResponse(
+        {"status": "warming_up", "graphs": graphs.status()},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+# Scraped by Prometheus, public like the root endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,286 @@
+import bisect
+import functools
+import inspect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .logger import setup_logger
+
+logger = setup_logger(__name__, level="INFO")
+
+# Upper bounds in seconds, from a cache hit to a slow multi-step answer
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values, e.g. latencies in seconds"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: count per bucket (the last one is +Inf), sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def time(self, **labels):
+        """Decorate a function or coroutine function to observe its duration"""
+
+        def decorator(fn):
+            if inspect.iscoroutinefunction(fn):
+
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        self.observe(time.perf_counter() - started, **labels)
+
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, **labels)
+
+            return wrapper
+
+        return decorator
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(key, (list(c), t[0])) for key, (c, t) in self._values.items()]
+        lines = self._header()
+        names = self.labels + ("le",)
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value read from a callback at scrape time, e.g. a cache hit ratio"""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[Dict[str, Any], float]]],
+    ):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        try:
+            samples = list(self.collect())
+        except Exception as e:
+            logger.warning(f"Unable to collect {self.name}: {e}")
+            samples = []
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labels, self._key(labels))} "
+            f"{_format_value(value)}"
+            for labels, value in samples
+        ]
+
+
+class MetricsRegistry:
+    """
+    In-process metrics exported in the Prometheus text format.
+
+    Counters and histograms are plain dictionaries updated under a lock, so
+    recording a sample costs about a microsecond. Gauges are computed from
+    callbacks when the metrics are scraped.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                logger.error(f"Metric {metric.name} is already registered")
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[Dict[str, Any], float]]],
+    ) -> Gauge:
+        return self._register(Gauge(name, help, labels, collect))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = [line for metric in metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+REQUESTS = metrics.counter(
+    "vectrix_requests_total", "Chat completion requests", ("model", "stream", "cache")
+)
+REQUEST_LATENCY = metrics.histogram(
+    "vectrix_request_duration_seconds",
+    "Total chat completion latency",
+    ("model", "stream"),
+)
+TIME_TO_FIRST_TOKEN = metrics.histogram(
+    "vectrix_time_to_first_token_seconds",
+    "Latency until the first streamed answer chunk",
+    ("model",),
+)
+NODE_DURATION = metrics.histogram(
+    "vectrix_graph_node_duration_seconds", "Duration of graph node methods", ("node",)
+)
+COALESCED_REQUESTS = metrics.counter(
+    "vectrix_coalesced_requests_total",
+    "Requests attached to an identical request in flight",
+    ("model", "stream"),
+)
+LLM_LATENCY = metrics.histogram(
+    "vectrix_llm_duration_seconds", "Latency of LLM calls", ("model",)
+)
+LLM_TOKENS = metrics.counter(
+    "vectrix_llm_tokens_total", "Tokens used by LLM calls", ("model", "type")
+)
+LLM_ERRORS = metrics.counter("vectrix_llm_errors_total", "Failed LLM calls", ("model",))
+RATE_LIMIT_QUEUE_TIME = metrics.histogram(
+    "vectrix_rate_limit_queue_seconds",
+    "Time provider requests waited for admission",
+    ("limiter", "priority"),
+)
+RATE_LIMITED = metrics.counter(
+    "vectrix_rate_limited_total", "Provider 429 responses", ("limiter",)
+)
+VECTOR_DB_DURATION = metrics.histogram(
+    "vectrix_vector_db_duration_seconds",
+    "Latency of vector database queries and inserts",
+    ("backend", "operation"),
+)
+
+
+def timed_nodes(cls):
+    """
+    Class decorator observing the duration of every public coroutine method in
+    `NODE_DURATION`, labelled with the class and method name.
+    """
+    for name, fn in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.iscoroutinefunction(fn):
+            setattr(cls, name, NODE_DURATION.time(node=f"{cls.__name__}.{name}")(fn))
+    return cls
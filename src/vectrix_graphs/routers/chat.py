@@ -1,17 +1,29 @@
+import asyncio
 import json
+import os
 import time
+import uuid
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 from fastapi.responses import StreamingResponse
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from ..graphs.default_flow import default_flow
-from ..graphs.local_slm_demo import local_slm_demo
+from ..db.clients import clients
+from ..graphs.registry import graphs
 from ..graphs.utils.stream_processor import StreamProcessor
+from ..helpers.single_flight import SingleFlight
+from ..metrics import (
+    COALESCED_REQUESTS,
+    REQUEST_LATENCY,
+    REQUESTS,
+    TIME_TO_FIRST_TOKEN,
+)
 from ..schemas.openai import ChatCompletionRequest, ChatCompletionResponse
 
 router = APIRouter()
 
+# Identical requests in flight share one graph execution
+flights = SingleFlight()
+
 
 def _transform_response(model: str, response: str) -> ChatCompletionResponse:
     return ChatCompletionResponse(
@@ -33,6 +45,9 @@ def _transform_response(model: str, response: str) -> ChatCompletionResponse:
 
 
 def _transform_messages(request_messages):
+    # Imported on first request, langchain_core is slow to import
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
     messages = []
     for message in request_messages:
         if message.role == "system":
@@ -44,39 +59,179 @@ def _transform_messages(request_messages):
     return messages
 
 
-@router.post("/chat/completions")
-async def chat_completion(request: ChatCompletionRequest):
-    print(json.dumps(request.model_dump(), indent=4))
-    messages = _transform_messages(request.messages)
-    print(messages)
+def _with_thread(graph, messages, thread_id):
+    """
+    Return the graph, input and config of a request. A conversation with a thread
+    id is resumed from the checkpointer, so only its new message is added.
+    """
+    if not thread_id:
+        return graph, {"messages": messages}, {"configurable": {}}
+    graph = graph.copy(update={"checkpointer": clients.checkpointer()})
+    config = {"configurable": {"thread_id": thread_id}}
+    return graph, {"messages": messages[-1:]}, config
+
+
+def _standalone_question(messages):
+    """Return the question of a conversation without earlier turns, else None"""
+    turns = [m for m in messages if m.type != "system"]
+    if len(turns) == 1 and isinstance(turns[0].content, str):
+        return turns[0].content
+    return None
+
+
+async def _cached_answer(model: str, messages):
+    """Look up the answer of a standalone question in the answer cache"""
+    question = _standalone_question(messages)
+    spec = graphs.model(model)
+    if question is None or not spec.answer_cache:
+        return None
+    # Answers are cached per mode of the graph nodes
+    return await asyncio.to_thread(
+        clients.answer_cache().lookup,
+        spec.mode,
+        os.environ.get("WEAVIATE_COLLECTION", ""),
+        question,
+    )
 
-    if request.stream:
-        if request.model == "navid_ai_demo_local":
-            stream = StreamProcessor(local_slm_demo)
 
-            async def event_generator():
-                async for chunk in stream.process_stream(messages=messages):
-                    yield f"data: {chunk}\n\n"
+def _cached_response(model: str, hit) -> ChatCompletionResponse:
+    return ChatCompletionResponse(
+        id=f"chatcmpl-{uuid.uuid4()}",
+        object="chat.completion",
+        created=int(time.time()),
+        model=model,
+        system_fingerprint=f"answer_cache_{hit['match']}",
+        choices=[
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": hit["answer"]},
+                "finish_reason": "stop",
+            }
+        ],
+    )
 
-            return StreamingResponse(event_generator(), media_type="text/event-stream")
 
-        elif request.model == "navid_ai_demo_online":
-            stream = StreamProcessor(default_flow)
+def _flight_key(model: str, stream: bool, messages):
+    """Key of identical requests: model, streaming and normalized messages"""
+    from ..db.cache import normalize_query
+
+    return (
+        model,
+        stream,
+        tuple(
+            (
+                m.type,
+                normalize_query(m.content)
+                if isinstance(m.content, str)
+                else json.dumps(m.content, sort_keys=True),
+            )
+            for m in messages
+        ),
+    )
+
 
-            async def event_generator():
-                async for chunk in stream.process_stream(messages=messages):
-                    yield f"data: {chunk}\n\n"
+def _answer(model: str, graph, inputs, config, thread_id):
+    """Run the graph, shared with identical requests unless in a thread"""
 
-            return StreamingResponse(event_generator(), media_type="text/event-stream")
+    async def run():
+        return _transform_response(model, await graph.ainvoke(inputs, config))
 
+    # Threads depend on their checkpointed history, so they never coalesce
+    if thread_id:
+        return run()
+    key = _flight_key(model, False, inputs["messages"])
+    if flights.in_flight(key):
+        COALESCED_REQUESTS.inc(model=model, stream="false")
+    return flights.do(key, run)
+
+
+def _stream(model: str, graph, inputs, config, thread_id):
+    """Stream the graph, fanned out to identical requests unless in a thread"""
+
+    def run():
+        return StreamProcessor(graph).process_stream(
+            messages=inputs["messages"], config=config
+        )
+
+    if thread_id:
+        return run()
+    key = _flight_key(model, True, inputs["messages"])
+    if flights.in_flight(key):
+        COALESCED_REQUESTS.inc(model=model, stream="true")
+    return flights.stream(key, run)
+
+
+async def _sse(chunks):
+    """Frame serialized chunks as server-sent events"""
+    async for chunk in chunks:
+        yield f"data: {chunk}\n\n".encode()
+
+
+def _sse_response(chunks, headers=None) -> StreamingResponse:
+    return StreamingResponse(
+        _sse(chunks), media_type="text/event-stream", headers=headers
+    )
+
+
+async def _observed_stream(model: str, chunks, started: float):
+    """Record the time to first token and the total latency of a streamed answer"""
+    # The first chunk only announces the assistant role
+    count = 0
+    async for chunk in chunks:
+        count += 1
+        if count == 2:
+            TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started, model=model)
+        yield chunk
+    REQUEST_LATENCY.observe(time.perf_counter() - started, model=model, stream="true")
+
+
+@router.post("/chat/completions")
+async def chat_completion(
+    request: ChatCompletionRequest, response: Response, http_request: Request
+):
+    started = time.perf_counter()
+    result = await _chat_completion(request, response, http_request)
+    if isinstance(result, StreamingResponse):
+        cache = result.headers.get("X-Answer-Cache", "miss")
+        result.body_iterator = _observed_stream(
+            request.model, result.body_iterator, started
+        )
     else:
-        if request.model == "navid_ai_demo_local":
-            response = await local_slm_demo.ainvoke({"messages": messages})
-            return _transform_response(request.model, response)
+        cache = response.headers.get("X-Answer-Cache", "miss")
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started, model=request.model, stream="false"
+        )
+    REQUESTS.inc(
+        model=request.model, stream=str(bool(request.stream)).lower(), cache=cache
+    )
+    return result
 
-        elif request.model == "navid_ai_demo_online":
-            response = await default_flow.ainvoke({"messages": messages})
-            return _transform_response(request.model, response)
 
-        else:
-            raise ValueError(f"Unsupported model: {request.model}")
+async def _chat_completion(
+    request: ChatCompletionRequest, response: Response, http_request: Request
+):
+    print(json.dumps(request.model_dump(), indent=4))
+    messages = _transform_messages(request.messages)
+    print(messages)
+    thread_id = http_request.headers.get("X-Thread-Id")
+
+    # Threads only send their new message, which may depend on earlier turns
+    hit = None if thread_id else await _cached_answer(request.model, messages)
+    if hit is not None:
+        # Served without running the graph, marked in the header and fingerprint
+        headers = {"X-Answer-Cache": hit["match"]}
+        if request.stream:
+            chunks = StreamProcessor(None).replay(
+                hit["answer"], f"answer_cache_{hit['match']}"
+            )
+            return _sse_response(chunks, headers)
+        response.headers.update(headers)
+        return _cached_response(request.model, hit)
+
+    graph, inputs, config = _with_thread(
+        await graphs.aget_model(request.model), messages, thread_id
+    )
+    if request.stream:
+        chunks = _stream(request.model, graph, inputs, config, thread_id)
+        return _sse_response(chunks)
+    return await _answer(request.model, graph, inputs, config, thread_id)
@@ -1,26 +1,21 @@
 from fastapi import APIRouter
 
-router = APIRouter()
+from ..graphs.registry import graphs
 
-response = {
-    "object": "list",
-    "data": [
-        {
-            "id": "navid_ai_demo_local",
-            "object": "model",
-            "created": 1686935002,
-            "owned_by": "vectrix",
-        },
-        {
-            "id": "navid_ai_demo_online",
-            "object": "model",
-            "created": 1686935002,
-            "owned_by": "vectrix",
-        },
-    ],
-}
+router = APIRouter()
 
 
 @router.get("/models")
 async def get_models():
-    return response
+    return {
+        "object": "list",
+        "data": [
+            {
+                "id": model_id,
+                "object": "model",
+                "created": 1686935002,
+                "owned_by": "vectrix",
+            }
+            for model_id in graphs.models()
+        ],
+    }
@@ -42,3 +42,4 @@ class ChatCompletionResponse(BaseModel):
     model: str
     choices: List[Choice]
     usage: Optional[Usage] = None
+    system_fingerprint: Optional[str] = None
@@ -0,0 +1,129 @@
+from unittest.mock import patch
+
+import pytest
+
+from vectrix_graphs.db.cache import AnswerCache, QueryCache, cached_searches
+
+
+def _key(query, k=3):
+    return QueryCache.key("Docs", query, k=k, type="text")
+
+
+def test_normalized_queries_share_an_entry():
+    cache = QueryCache()
+    cache.put(_key("How do I log in?"), ["doc"], cache.generation("Docs"))
+
+    assert cache.get(_key("  how do I   LOG in")) == ["doc"]
+    assert cache.get(_key("how do I log in", k=5)) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_entries_expire():
+    cache = QueryCache(ttl=10)
+    with patch("vectrix_graphs.db.cache.time.monotonic", return_value=0):
+        cache.put(_key("q"), ["doc"], cache.generation("Docs"))
+    with patch("vectrix_graphs.db.cache.time.monotonic", return_value=11):
+        assert cache.get(_key("q")) is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = QueryCache(max_entries=2)
+    for query in ("a", "b"):
+        cache.put(_key(query), [query], cache.generation("Docs"))
+    cache.get(_key("a"))
+    cache.put(_key("c"), ["c"], cache.generation("Docs"))
+
+    assert cache.get(_key("b")) is None
+    assert cache.get(_key("a")) == ["a"]
+
+
+def test_invalidation_drops_entries_and_late_results():
+    cache = QueryCache()
+    generation = cache.generation("Docs")
+    cache.put(_key("a"), ["a"], generation)
+
+    cache.invalidate("docs")
+    # A search that started before the write must not be cached
+    cache.put(_key("b"), ["b"], generation)
+
+    assert cache.get(_key("a")) is None
+    assert cache.get(_key("b")) is None
+
+
+def test_cached_searches_only_runs_missing_queries():
+    cache = QueryCache()
+    calls = []
+
+    def search(queries):
+        calls.append(queries)
+        return [[q.upper()] for q in queries]
+
+    cached_searches(cache, "Docs", ["a"], {"k": 3}, search)
+    results = cached_searches(cache, "Docs", ["a", "b"], {"k": 3}, search)
+
+    assert results == [["A"], ["B"]]
+    assert calls == [["a"], ["b"]]
+
+
+def _answer_cache(**kwargs):
+    vectors = {"what is x": [1.0, 0.0], "what's x": [0.99, 0.05], "y": [0.0, 1.0]}
+    return AnswerCache(QueryCache(), embed=lambda q: vectors[q.lower()], **kwargs)
+
+
+def test_answer_cache_exact_and_semantic_hits():
+    cache = _answer_cache()
+    cache.store("online", "Docs", "What is X", "X is 42", cache.generation("Docs"))
+
+    exact = cache.lookup("online", "docs", "what is x?")
+    semantic = cache.lookup("online", "Docs", "What's X")
+
+    assert exact == {"answer": "X is 42", "match": "exact", "similarity": 1.0}
+    assert semantic["answer"] == "X is 42"
+    assert semantic["match"] == "semantic"
+    assert cache.lookup("online", "Docs", "y") is None
+    assert cache.lookup("local", "Docs", "What is X") is None
+
+
+def test_answer_cache_matches_exactly_by_default():
+    cache = AnswerCache(QueryCache())
+    cache.store("online", "Docs", "What is X", "X is 42", cache.generation("Docs"))
+
+    assert cache.lookup("online", "Docs", "what is x?")["match"] == "exact"
+    assert cache.lookup("online", "Docs", "What's X") is None
+
+
+@pytest.mark.parametrize(
+    "cached, asked",
+    [
+        ("What is the status of order 1234?", "What is the status of order 1235?"),
+        ("What is the salary of John?", "What is the salary of Mary?"),
+        ("Which room is INV-2041 in?", "Which room is INV-2042 in?"),
+    ],
+)
+def test_near_duplicate_questions_are_not_semantic_hits(cached, asked):
+    # Embeddings of such questions are nearly identical
+    cache = AnswerCache(QueryCache(), embed=lambda q: [1.0, 0.001 * len(q)])
+    cache.store("online", "Docs", cached, "cached answer", cache.generation("Docs"))
+
+    assert cache.lookup("online", "Docs", asked) is None
+
+
+def test_answer_cache_invalidated_by_writes():
+    cache = _answer_cache()
+    generation = cache.generation("Docs")
+    cache.store("online", "Docs", "What is X", "X is 42", generation)
+
+    cache.generations.invalidate("Docs")
+    # An answer computed before the write must not be cached
+    cache.store("online", "Docs", "y", "Y", generation)
+
+    assert cache.lookup("online", "Docs", "What is X") is None
+    assert cache.lookup("online", "Docs", "y") is None
+
+
+def test_answer_cache_expires():
+    cache = _answer_cache(ttl=10)
+    cache.store("online", "Docs", "What is X", "X is 42", cache.generation("Docs"))
+
+    with patch("vectrix_graphs.db.cache.time.monotonic", return_value=1e12):
+        assert cache.lookup("online", "Docs", "What is X") is None
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from vectrix_graphs.db.clients import ClientRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch, tmp_path):
+    monkeypatch.setenv("ENV", "local")
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    return ClientRegistry()
+
+
+def test_clients_are_created_lazily_and_reused(registry):
+    with patch("weaviate.connect_to_local") as connect:
+        connect.return_value = Mock(is_connected=Mock(return_value=True))
+        assert registry._weaviate is None
+
+        first = registry.weaviate()
+        second = registry.weaviate()
+
+        assert first is second
+        connect.assert_called_once()
+
+
+def test_voyage_client_is_shared(registry):
+    with patch("voyageai.Client") as voyage:
+        assert registry.voyage() is registry.voyage()
+        voyage.assert_called_once()
+
+
+def test_unsupported_environment(registry, monkeypatch):
+    monkeypatch.setenv("ENV", "cloud")
+    with pytest.raises(ValueError):
+        registry.weaviate()
+
+
+def test_shutdown_closes_connections(registry):
+    async_client = Mock(is_connected=Mock(return_value=True), connect=AsyncMock())
+    async_client.close = AsyncMock()
+    sync_client = Mock(is_connected=Mock(return_value=True))
+
+    with (
+        patch(
+            "weaviate.use_async_with_local",
+            return_value=async_client,
+        ),
+        patch(
+            "weaviate.connect_to_local",
+            return_value=sync_client,
+        ),
+    ):
+        asyncio.run(registry.startup())
+        registry.weaviate()
+        asyncio.run(registry.shutdown())
+
+    async_client.close.assert_awaited_once()
+    sync_client.close.assert_called_once()
+    assert registry._async_weaviate is None
+    assert registry._weaviate is None
+
+
+def test_slow_weaviate_connection_does_not_block_other_clients(registry):
+    connecting = threading.Event()
+    release = threading.Event()
+
+    def connect(**kwargs):
+        connecting.set()
+        release.wait(5)
+        return Mock(is_connected=Mock(return_value=True))
+
+    with (
+        patch("weaviate.connect_to_local", side_effect=connect),
+        patch("voyageai.Client"),
+    ):
+        thread = threading.Thread(target=registry.weaviate)
+        thread.start()
+        connecting.wait(5)
+        try:
+            assert registry.voyage() is not None
+        finally:
+            release.set()
+            thread.join()
+
+
+def test_shutdown_closes_pools_and_resets_cached_clients(registry, monkeypatch):
+    monkeypatch.setenv("CO_API_KEY", "key")
+    monkeypatch.setenv("NUMPY_STORE_PATH", ":memory:")
+    sync_client = registry.cohere()
+    async_client = registry.async_cohere()
+    registry.numpy_store()
+
+    asyncio.run(registry.shutdown())
+
+    assert sync_client._client_wrapper.httpx_client.httpx_client.is_closed
+    assert async_client._client_wrapper.httpx_client.httpx_client.is_closed
+    assert all(
+        value is None
+        for name, value in vars(registry).items()
+        if name not in ("_lock", "_weaviate_lock")
+    )
+
+
+def test_semantic_answer_matching_is_opt_in(registry, monkeypatch):
+    assert registry.answer_cache().embed is None
+
+    monkeypatch.setenv("ANSWER_CACHE_SEMANTIC", "1")
+    assert ClientRegistry().answer_cache().embed is not None
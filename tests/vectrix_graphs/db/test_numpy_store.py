@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from vectrix_graphs.db.cache import QueryCache
+from vectrix_graphs.db.numpy_store import AsyncNumpyStore, NumpyStore
+
+
+def _fake_vector(text: str, dim: int = 32):
+    """Bag-of-words vector, so texts sharing words are close"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in text.lower().split():
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % dim] += 1.0
+    return vector.tolist()
+
+
+def _embed_texts(texts, input_type):
+    return [_fake_vector(t) for t in texts]
+
+
+def _embed_multimodal(inputs, truncation):
+    return [
+        _fake_vector(" ".join(p for p in item if isinstance(p, str))) for item in inputs
+    ]
+
+
+def _store(path=":memory:", **kwargs):
+    return NumpyStore(
+        path=path,
+        embed_texts=_embed_texts,
+        embed_multimodal=_embed_multimodal,
+        query_cache=QueryCache(),
+        **kwargs,
+    )
+
+
+def _docs():
+    return [
+        Document(page_content="red apples and pears", metadata={"source": "a"}),
+        Document(page_content="blue ocean waves", metadata={"source": "b"}),
+        Document(page_content="invoice INV-2041 total", metadata={"source": "c"}),
+    ]
+
+
+def test_text_search_returns_closest_documents():
+    db = _store()
+    db.create_collection("Docs")
+    db.add_documents(_docs())
+
+    results = db.similarity_search("blue ocean waves", k=2)
+
+    assert results[0].page_content == "blue ocean waves"
+    assert results[0].metadata["source"] == "b"
+    assert results[0].metadata["cosine_distance"] == pytest.approx(0.0, abs=1e-6)
+    assert len(results) == 2
+
+
+def test_hybrid_search_matches_keywords():
+    db = _store()
+    db.create_collection("Docs")
+    db.add_documents(_docs())
+
+    results = db.similarity_search("INV-2041", k=1, type="hybrid", alpha=0.0)
+
+    assert results[0].page_content == "invoice INV-2041 total"
+    assert results[0].metadata["score"] == pytest.approx(1.0)
+
+
+def test_add_documents_is_idempotent_and_removes_stale():
+    db = _store()
+    db.create_collection("Docs")
+    db.add_documents(_docs())
+    db.add_documents(_docs())
+    assert len(db.collection) == 3
+
+    changed = [Document(page_content="green apples", metadata={"source": "a"})]
+    db.add_documents(changed)
+
+    contents = {p["content"] for p in db.collection.properties}
+    assert contents == {"green apples", "blue ocean waves", "invoice INV-2041 total"}
+
+
+def test_chunks_removed_from_a_source_are_deleted():
+    db = _store()
+    db.create_collection("Docs")
+    db.add_documents(
+        [
+            Document(page_content="first part", metadata={"source": "a"}),
+            Document(page_content="second part", metadata={"source": "a"}),
+            Document(page_content="other file", metadata={"source": "b"}),
+        ]
+    )
+
+    db.add_documents([Document(page_content="first part", metadata={"source": "a"})])
+
+    contents = {p["content"] for p in db.collection.properties}
+    assert contents == {"first part", "other file"}
+
+
+def test_multi_modal_documents():
+    db = _store()
+    db.create_collection("Images", vectorizer_config="voyage")
+    db.add_multi_modal_documents(
+        [["a cat on a mat"], ["a dog in the park"]],
+        [{"text": "cat", "source": "x"}, {"text": "dog", "source": "y"}],
+        batch_size=1,
+    )
+
+    results = db.similarity_search("dog park", k=1, type="multimodal")
+
+    assert results[0].page_content == "dog"
+    assert "text" not in results[0].metadata
+    assert results[0].metadata["source"] == "y"
+
+
+def test_persistence(tmp_path):
+    db = _store(str(tmp_path))
+    db.create_collection("Docs")
+    db.add_documents(_docs())
+
+    reloaded = _store(str(tmp_path))
+    assert reloaded.list_collections() == {"Docs": {"vectorizer": "cohere", "count": 3}}
+    reloaded.set_collection("Docs")
+    assert isinstance(reloaded.collection.vectors, np.memmap)
+    assert reloaded.similarity_search("ocean", k=1)[0].page_content == (
+        "blue ocean waves"
+    )
+
+    reloaded.remove_collection("Docs")
+    assert _store(str(tmp_path)).list_collections() == {}
+
+
+def test_ivf_search_probes_a_subset():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(400, 16)).astype(np.float32)
+    db = _store(ivf_threshold=100, nprobe=5)
+    db.create_collection("Docs")
+    db.collection.upsert(
+        [str(i) for i in range(400)],
+        [{"content": str(i)} for i in range(400)],
+        vectors,
+    )
+
+    query = vectors[7] / np.linalg.norm(vectors[7])
+    snapshot = db.collection.snapshot
+    rows, _ = db._vector_scores(snapshot, query)
+    assert len(rows) < 400
+    results = db._search(snapshot, "", query, 1, "text", 0.5, "ranked")
+    assert results[0].page_content == "7"
+
+
+def test_searches_see_a_consistent_snapshot_during_writes():
+    db = _store()
+    db.create_collection("Docs")
+    db.add_documents(_docs())
+    snapshot = db.collection.snapshot
+
+    db.collection.upsert(["new"], [{"content": "new"}], [_fake_vector("new")])
+    db.collection.delete({snapshot.uuids[0]})
+
+    assert len(snapshot.vectors) == len(snapshot.uuids) == len(snapshot.properties)
+    assert len(snapshot) == 3
+    assert len(db.collection) == 3
+    assert db.collection.uuids[-1] == "new"
+
+
+def test_unknown_collection_raises():
+    with pytest.raises(ValueError):
+        _store().set_collection("Missing")
+
+
+def test_async_store():
+    db = AsyncNumpyStore(_store())
+
+    async def run():
+        await db.create_collection("Docs")
+        bound = await db.with_collection("Docs")
+        await bound.add_documents(_docs())
+        return await bound.similarity_search_batch(["apples", "ocean"], k=1)
+
+    results = asyncio.run(run())
+    assert [r[0].metadata["source"] for r in results] == ["a", "b"]
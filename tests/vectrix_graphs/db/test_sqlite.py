@@ -0,0 +1,125 @@
+import asyncio
+import operator
+from typing import Annotated, List, TypedDict
+
+import PIL.Image
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from vectrix_graphs.db.ids import hash_inputs
+from vectrix_graphs.db.sqlite import EmbeddingCache, SqliteCheckpointer
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_hash_inputs_distinguishes_images():
+    """Identical text with different images must not share a hash."""
+    red = PIL.Image.new("RGB", (10, 10), color="red")
+    blue = PIL.Image.new("RGB", (10, 10), color="blue")
+    assert hash_inputs(["text", red]) == hash_inputs(["text", red.copy()])
+    assert hash_inputs(["text", red]) != hash_inputs(["text", blue])
+    assert hash_inputs(["ab", "c"]) != hash_inputs(["a", "bc"])
+
+
+def test_hash_inputs_unsupported_type():
+    with pytest.raises(ValueError):
+        hash_inputs([42])
+
+
+def test_key_includes_model_and_truncation():
+    key = EmbeddingCache.key(["text"], "voyage-multimodal-3", True)
+    assert key != EmbeddingCache.key(["text"], "voyage-multimodal-3", False)
+    assert key != EmbeddingCache.key(["text"], "other-model", True)
+
+
+def test_get_many_counts_hits_and_misses(cache):
+    cache.put_many([("a", [0.5, 1.0]), ("b", [2.0, 3.0])])
+
+    found = cache.get_many(["a", "b", "c"])
+
+    assert found == {"a": [0.5, 1.0], "b": [2.0, 3.0]}
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["entries"] == 2
+
+
+def test_cache_persists_to_disk(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache(path=path)
+    cache.put_many([("a", [1.0])])
+    cache.close()
+
+    reopened = EmbeddingCache(path=path)
+    assert reopened.get_many(["a"]) == {"a": [1.0]}
+    reopened.close()
+
+
+def test_lru_eviction_by_entries(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.put_many([("a", [1.0])])
+    cache.put_many([("b", [2.0])])
+    # Touch "a" so that "b" becomes the least recently used entry
+    cache.get_many(["a"])
+    cache.put_many([("c", [3.0])])
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    cache.close()
+
+
+def test_eviction_by_bytes(tmp_path):
+    # Every vector of two float32 values takes 8 bytes
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"), max_bytes=16)
+    for key in ["a", "b", "c"]:
+        cache.put_many([(key, [1.0, 2.0])])
+
+    assert cache.stats()["bytes"] <= 16
+    cache.close()
+
+
+class _TurnState(TypedDict):
+    turns: Annotated[List[str], operator.add]
+
+
+def _turn_graph(checkpointer):
+    graph = StateGraph(_TurnState)
+    graph.add_node("echo", lambda state: {"turns": ["answer"]})
+    graph.add_edge(START, "echo")
+    graph.add_edge("echo", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def test_checkpointer_resumes_threads_across_restarts(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite3")
+    config = {"configurable": {"thread_id": "chat-1"}}
+    checkpointer = SqliteCheckpointer(path=path)
+    asyncio.run(_turn_graph(checkpointer).ainvoke({"turns": ["hi"]}, config))
+    checkpointer.close()
+
+    checkpointer = SqliteCheckpointer(path=path)
+    graph = _turn_graph(checkpointer)
+    result = asyncio.run(graph.ainvoke({"turns": ["again"]}, config))
+    other = graph.invoke({"turns": ["new"]}, {"configurable": {"thread_id": "chat-2"}})
+
+    assert result["turns"] == ["hi", "answer", "again", "answer"]
+    assert other["turns"] == ["new", "answer"]
+    assert len(list(checkpointer.list(config, limit=2))) == 2
+
+
+def test_checkpointer_prunes_old_checkpoints():
+    checkpointer = SqliteCheckpointer(path=":memory:", max_checkpoints=3)
+    graph = _turn_graph(checkpointer)
+    config = {"configurable": {"thread_id": "chat"}}
+    for _ in range(5):
+        graph.invoke({"turns": ["q"]}, config)
+
+    assert len(list(checkpointer.list(config))) == 3
+    assert len(graph.get_state(config).values["turns"]) == 10
+
+    checkpointer.delete_thread("chat")
+    assert checkpointer.get_tuple(config) is None
@@ -0,0 +1,290 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, Mock
+
+import pytest
+import voyageai.error
+from langchain_core.documents import Document
+from weaviate.classes.config import Tokenization
+
+from vectrix_graphs.db.cache import QueryCache
+from vectrix_graphs.db.ids import hash_inputs, object_uuid, source_id
+from vectrix_graphs.db.sqlite import EmbeddingCache
+from vectrix_graphs.db.weaviate import AsyncWeaviate, Weaviate
+
+
+def _result(*texts):
+    objects = []
+    for text in texts:
+        obj = Mock()
+        obj.uuid = text
+        obj.properties = {"content": text, "metadata": {"source": "test"}}
+        obj.metadata.distance = 0.1
+        obj.metadata.score = None
+        objects.append(obj)
+    return Mock(objects=objects)
+
+
+def _embed_response(texts, **kwargs):
+    return Mock(embeddings=Mock(float_=[[float(len(t))] for t in texts]))
+
+
+@pytest.fixture
+def registry():
+    registry = Mock()
+    registry.query_cache.return_value = QueryCache()
+    registry.cohere.return_value.embed.side_effect = lambda **kw: _embed_response(
+        kw["texts"]
+    )
+    registry.async_cohere.return_value.embed = AsyncMock(
+        side_effect=lambda **kw: _embed_response(kw["texts"])
+    )
+    return registry
+
+
+def test_similarity_search_batch_embeds_once(registry):
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = Mock()
+    db.collection.query.near_vector.side_effect = lambda near_vector, **kw: _result(
+        f"doc-{near_vector[0]:.0f}"
+    )
+
+    results = db.similarity_search_batch(["a", "bbb"], k=2)
+
+    registry.cohere.return_value.embed.assert_called_once()
+    assert [[d.page_content for d in docs] for docs in results] == [
+        ["doc-1"],
+        ["doc-3"],
+    ]
+    assert results[0][0].metadata["cosine_distance"] == 0.1
+
+
+def test_similarity_search_batch_uses_embedding_cache(registry):
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = Mock()
+    db.collection.query.near_vector.return_value = _result("doc")
+
+    db.similarity_search_batch(["a", "b"])
+    db.similarity_search_batch(["a", "b"])
+
+    registry.cohere.return_value.embed.assert_called_once()
+
+
+def test_similarity_search_is_cached_until_a_write(registry):
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = MagicMock()
+    db.collection.name = "Docs"
+    db.collection.query.near_text.return_value = _result("doc")
+    db.collection.query.fetch_objects.return_value = Mock(objects=[])
+
+    db.similarity_search("What is Vectrix?")
+    db.similarity_search("what is vectrix")
+    assert db.collection.query.near_text.call_count == 1
+
+    db.add_documents([Document(page_content="new", metadata={"source": "a"})])
+    db.similarity_search("What is Vectrix?")
+    assert db.collection.query.near_text.call_count == 2
+
+
+def test_similarity_search_batch_empty(registry):
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    assert db.similarity_search_batch([]) == []
+
+
+def test_async_similarity_search_batch(registry):
+    db = AsyncWeaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = Mock()
+    db.collection.query.near_vector = AsyncMock(
+        side_effect=lambda near_vector, **kw: _result(f"doc-{near_vector[0]:.0f}")
+    )
+
+    results = asyncio.run(db.similarity_search_batch(["a", "bb", "ccc"]))
+
+    registry.async_cohere.return_value.embed.assert_awaited_once()
+    assert [docs[0].page_content for docs in results] == ["doc-1", "doc-2", "doc-3"]
+
+
+def _voyage_response(inputs, **kwargs):
+    return Mock(embeddings=[[float(len(item[0]))] for item in inputs])
+
+
+def test_add_multi_modal_documents_pipeline(registry):
+    registry.voyage.return_value.multimodal_embed.side_effect = (
+        lambda inputs, **kw: _voyage_response(inputs)
+    )
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = MagicMock()
+    batch = db.collection.batch.dynamic.return_value.__enter__.return_value
+
+    documents = [[f"chunk {i}"] for i in range(25)]
+    metadatas = [{"text": f"chunk {i}"} for i in range(25)]
+    db.add_multi_modal_documents(documents, metadatas, batch_size=10, concurrency=2)
+
+    assert registry.voyage.return_value.multimodal_embed.call_count == 3
+    inserted = {
+        call.kwargs["properties"]["text"] for call in batch.add_object.call_args_list
+    }
+    assert inserted == {f"chunk {i}" for i in range(25)}
+
+
+def test_add_multi_modal_documents_length_mismatch(registry):
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    with pytest.raises(ValueError):
+        db.add_multi_modal_documents([["a"]], [])
+
+
+def test_embedding_retries_on_rate_limit(registry, monkeypatch):
+    monkeypatch.setattr("vectrix_graphs.db.embeddings.time.sleep", lambda _: None)
+    registry.voyage.return_value.multimodal_embed.side_effect = [
+        voyageai.error.RateLimitError("429"),
+        _voyage_response([["a"]]),
+    ]
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+
+    assert db._embed_multimodal([["a"]], truncation=True) == [[1.0]]
+    assert registry.voyage.return_value.multimodal_embed.call_count == 2
+
+
+def test_async_add_multi_modal_documents_pipeline(registry):
+    registry.async_voyage.return_value.multimodal_embed = AsyncMock(
+        side_effect=lambda inputs, **kw: _voyage_response(inputs)
+    )
+    db = AsyncWeaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = Mock()
+    db.collection.data.insert_many = AsyncMock()
+    db.collection.query.fetch_objects = AsyncMock(return_value=Mock(objects=[]))
+
+    documents = [[f"chunk {i}"] for i in range(25)]
+    metadatas = [{"text": f"chunk {i}"} for i in range(25)]
+    asyncio.run(
+        db.add_multi_modal_documents(documents, metadatas, batch_size=10, concurrency=2)
+    )
+
+    inserted = [
+        obj.properties["text"]
+        for call in db.collection.data.insert_many.await_args_list
+        for obj in call.args[0]
+    ]
+    assert sorted(inserted) == sorted(m["text"] for m in metadatas)
+
+
+def test_add_multi_modal_documents_accepts_pairs(registry):
+    registry.voyage.return_value.multimodal_embed.side_effect = (
+        lambda inputs, **kw: _voyage_response(inputs)
+    )
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = MagicMock()
+    batch = db.collection.batch.dynamic.return_value.__enter__.return_value
+
+    pairs = (([f"chunk {i}"], {"text": f"chunk {i}"}) for i in range(5))
+    db.add_multi_modal_documents(pairs, batch_size=2)
+
+    assert batch.add_object.call_count == 5
+
+
+def _stored(*uuids):
+    return Mock(objects=[Mock(uuid=uuid) for uuid in uuids])
+
+
+def test_add_documents_skips_unchanged_and_deletes_stale(registry):
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = MagicMock()
+    batch = db.collection.batch.dynamic.return_value.__enter__.return_value
+    documents = [
+        Document(page_content="unchanged", metadata={"source": "a.pdf"}),
+        Document(page_content="changed", metadata={"source": "a.pdf"}),
+    ]
+    unchanged_uuid = object_uuid("a.pdf", hash_inputs(["unchanged"]))
+    db.collection.query.fetch_objects.side_effect = [
+        # Existence check of the imported documents
+        _stored(unchanged_uuid),
+        # Every object currently stored for a.pdf
+        _stored(unchanged_uuid, object_uuid("a.pdf", "old")),
+    ]
+
+    db.add_documents(documents)
+
+    inserted = batch.add_object.call_args_list
+    assert len(inserted) == 1
+    assert inserted[0].kwargs["properties"]["content"] == "changed"
+    assert inserted[0].kwargs["properties"]["source_id"] == "a.pdf"
+    assert inserted[0].kwargs["uuid"] == object_uuid("a.pdf", hash_inputs(["changed"]))
+    db.collection.data.delete_many.assert_called_once()
+
+
+def test_add_multi_modal_documents_skips_before_embedding(registry):
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = MagicMock()
+    uuid = object_uuid("a.pdf", hash_inputs(["chunk"]))
+    db.collection.query.fetch_objects.side_effect = [_stored(uuid), _stored(uuid)]
+
+    db.add_multi_modal_documents([["chunk"]], [{"source_id": "a.pdf", "text": "chunk"}])
+
+    registry.voyage.return_value.multimodal_embed.assert_not_called()
+    db.collection.data.delete_many.assert_not_called()
+
+
+def test_deterministic_uuids():
+    assert object_uuid("a.pdf", "hash") == object_uuid("a.pdf", "hash")
+    assert object_uuid("a.pdf", "hash") != object_uuid("b.pdf", "hash")
+    assert source_id({"filename": "a.pdf", "source_id": "inbox/1"}) == "inbox/1"
+    assert source_id({"filename": "a.pdf"}) is None
+    assert source_id({}) is None
+
+
+def test_stale_objects_are_kept_when_requested(registry):
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = MagicMock()
+    db.collection.query.fetch_objects.return_value = _stored()
+
+    db.add_documents(
+        [Document(page_content="new", metadata={"source": "a.pdf"})],
+        delete_stale=False,
+    )
+
+    assert db.collection.query.fetch_objects.call_count == 1
+    db.collection.data.delete_many.assert_not_called()
+
+
+def test_identity_properties_are_matched_as_whole_values(registry):
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+
+    db.create_collection("Docs")
+
+    create = registry.weaviate.return_value.collections.create
+    properties = create.call_args.kwargs["properties"]
+    assert {p.name for p in properties} == {"content_hash", "source_id"}
+    assert all(p.tokenization == Tokenization.FIELD for p in properties)
+    assert all(p.skip_vectorization for p in properties)
+
+
+def test_hybrid_search_returns_scores(registry):
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = Mock()
+    result = _result("INV-2024-001")
+    result.objects[0].metadata.distance = None
+    result.objects[0].metadata.score = 0.9
+    db.collection.query.hybrid.return_value = result
+
+    documents = db.similarity_search("INV-2024-001", type="hybrid", alpha=0.25)
+
+    kwargs = db.collection.query.hybrid.call_args.kwargs
+    assert kwargs["alpha"] == 0.25
+    assert kwargs["vector"] is None
+    assert documents[0].metadata["score"] == 0.9
+    assert "cosine_distance" not in documents[0].metadata
+
+
+def test_hybrid_search_batch_passes_query_and_vector(registry):
+    db = Weaviate(embedding_cache=EmbeddingCache(":memory:"), registry=registry)
+    db.collection = Mock()
+    db.collection.query.hybrid.return_value = _result("doc")
+
+    db.similarity_search_batch(["part AB-12", "invoice 42"], type="hybrid")
+
+    calls = db.collection.query.hybrid.call_args_list
+    assert sorted(call.kwargs["query"] for call in calls) == [
+        "invoice 42",
+        "part AB-12",
+    ]
+    assert all(call.kwargs["vector"] is not None for call in calls)
+    db.collection.query.near_vector.assert_not_called()
@@ -0,0 +1,56 @@
+import pytest
+from langchain_core.documents import Document
+
+from vectrix_graphs.graphs.utils.handlers import document_handler
+from vectrix_graphs.graphs.utils.handlers.document_handler import (
+    DocumentHandler,
+    format_source_entry,
+)
+
+TEXT = "the pump must be serviced every twelve months by a certified technician"
+
+
+@pytest.fixture(autouse=True)
+def offline_tokenizer(monkeypatch):
+    # Four characters per token, without downloading the tiktoken encoding
+    monkeypatch.setattr(document_handler, "_encoding", lambda: None)
+
+
+def _doc(content, score=None):
+    return Document(page_content=content, metadata={"score": score})
+
+
+def test_context_is_ordered_by_score():
+    documents = [_doc("low", 0.1), _doc("unscored"), _doc("high", 0.9)]
+
+    context = DocumentHandler.build_context(documents)
+
+    assert [d.page_content for d in context] == ["high", "low", "unscored"]
+
+
+def test_near_duplicates_are_dropped():
+    documents = [
+        _doc(TEXT, 0.5),
+        _doc(TEXT.replace("the pump", "The pump") + ".", 0.9),
+        _doc("warranty claims require the original invoice", 0.4),
+    ]
+
+    context = DocumentHandler.build_context(documents)
+
+    assert [d.metadata["score"] for d in context] == [0.9, 0.4]
+
+
+def test_context_is_packed_into_the_token_budget():
+    documents = [_doc(f"{i} " + "x" * 400, 1 - i / 10) for i in range(5)]
+    entry_tokens = document_handler.count_tokens(format_source_entry(documents[0]))
+
+    context = DocumentHandler.build_context(documents, max_tokens=entry_tokens * 2)
+
+    assert [d.page_content[0] for d in context] == ["0", "1"]
+
+
+def test_oversized_best_document_is_truncated():
+    context = DocumentHandler.build_context([_doc("y" * 4000, 1.0)], max_tokens=100)
+
+    assert len(context) == 1
+    assert document_handler.count_tokens(format_source_entry(context[0])) <= 100
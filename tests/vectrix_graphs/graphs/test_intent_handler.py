@@ -0,0 +1,88 @@
+import pytest
+
+from vectrix_graphs.graphs.utils.handlers.intent_handler import (
+    IntentClassifier,
+    evaluate,
+)
+from vectrix_graphs.graphs.utils.models.tools import IntentEnum
+
+
+@pytest.fixture
+def classifier():
+    return IntentClassifier()
+
+
+@pytest.mark.parametrize(
+    "question, history, intent",
+    [
+        ("hi", (), IntentEnum.GREETING),
+        ("Thank you so much!", (), IntentEnum.GREETING),
+        ("tell me more", ["previous answer"], IntentEnum.FOLLOW_UP_QUESTION),
+        ("How do I reset the X200 router?", (), IntentEnum.SPECIFIC_QUESTION),
+    ],
+)
+def test_confident_predictions(classifier, question, history, intent):
+    assert classifier.predict(question, history) == intent
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "How many documents are there?",
+        "Who is the author of the book Dune?",
+        "Which files do I need to submit for a reimbursement?",
+        "Show me the documents I need to bring on my first day",
+        "How many pages should a project proposal have?",
+    ],
+)
+def test_metadata_queries_are_confirmed_by_the_llm(classifier, question):
+    assert classifier.predict(question) is None
+
+
+@pytest.mark.parametrize(
+    "question", ["ok", "great, now what about the pricing?", "cool", "nice"]
+)
+def test_acknowledgements_are_not_greetings(classifier, question):
+    assert classifier.predict(question) != IntentEnum.GREETING
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "Hey, who are you and what can you do for me?",
+        "hello, who are you?",
+    ],
+)
+def test_greetings_with_a_question_are_left_to_the_llm(classifier, question):
+    assert classifier.predict(question) is None
+
+
+def test_follow_up_requires_history(classifier):
+    intent, _ = classifier.classify("tell me more")
+    assert intent != IntentEnum.FOLLOW_UP_QUESTION
+
+
+def test_uncertain_messages_fall_back_to_the_llm():
+    classifier = IntentClassifier(threshold=1.0)
+    assert classifier.predict("Rates?") is None
+
+
+def test_evaluate_reports_avoided_llm_calls():
+    classifier = IntentClassifier(threshold=1.0)
+    report = evaluate(
+        classifier,
+        [
+            ("hello", IntentEnum.GREETING, False),
+            ("What is the lead time?", IntentEnum.SPECIFIC_QUESTION, False),
+            (
+                "Hey, who are you and what can you do for me?",
+                IntentEnum.SPECIFIC_QUESTION,
+                False,
+            ),
+            ("hi", IntentEnum.GREETING, False),
+        ],
+    )
+
+    assert report["llm_calls_avoided"] == 0.5
+    assert report["local_accuracy"] == 1.0
+    assert report["accuracy"] == 1.0
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from vectrix_graphs.graphs.utils.models.llm_factory import HTTPPools, LLMFactory
+from vectrix_graphs.graphs.utils.nodes import GraphNodes
+
+
+@pytest.fixture(autouse=True)
+def api_keys(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("TOGETHER_API_KEY", "test")
+    monkeypatch.setattr(LLMFactory, "_instances", {})
+
+
+def test_instances_are_cached_per_arguments():
+    llm = LLMFactory.create_llm("online", "mini", temperature=0)
+
+    assert LLMFactory.create_llm("online", "mini", temperature=0) is llm
+    assert LLMFactory().create_llm("online", "mini", temperature=0) is llm
+    assert LLMFactory.create_llm("online", "mini", temperature=1) is not llm
+    assert LLMFactory.create_llm("online", "default", temperature=0) is not llm
+
+
+def test_answers_keep_their_model():
+    llm = LLMFactory.create_llm("online", "claude", temperature=0)
+
+    assert llm.model_name == "gpt-4o"
+
+
+def test_instances_share_connection_pools():
+    mini = LLMFactory.create_llm("online", "mini")
+    together = LLMFactory.create_llm("local", "turbo")
+
+    assert mini.http_async_client is together.http_async_client
+    assert mini.http_client is LLMFactory.pools.client()
+
+
+def test_chains_are_rebuilt_after_the_instances_are_closed(monkeypatch):
+    monkeypatch.setattr(LLMFactory, "pools", HTTPPools())
+    monkeypatch.setattr(LLMFactory, "generation", 0)
+    nodes = GraphNodes(logging.getLogger(__name__), mode="online")
+    chain = nodes._summary_chain("online")
+    assert nodes._summary_chain("online") is chain
+
+    asyncio.run(LLMFactory.aclose())
+    rebuilt = nodes._summary_chain("online")
+
+    assert rebuilt is not chain
+    assert rebuilt.last is LLMFactory.create_llm("online", "mini", temperature=0)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_connections_are_reused():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pools = HTTPPools()
+    try:
+        client = pools.client()
+        for _ in range(4):
+            client.get(f"http://127.0.0.1:{server.server_port}/")
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert pools.stats() == {
+        "requests": 4,
+        "connections_opened": 1,
+        "connection_reuse_ratio": 0.75,
+    }
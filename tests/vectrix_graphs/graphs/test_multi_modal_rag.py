@@ -0,0 +1,41 @@
+import asyncio
+import logging
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from vectrix_graphs.graphs.nodes.multi_modal_rag import RAGNodes
+
+
+@pytest.fixture
+def nodes(monkeypatch):
+    monkeypatch.setenv("WEAVIATE_COLLECTION", "Docs")
+    nodes = RAGNodes(logging.getLogger(__name__))
+    vectordb = Mock(similarity_search=AsyncMock(return_value=[]))
+    nodes.vector_db = Mock(with_collection=AsyncMock(return_value=vectordb))
+    return nodes
+
+
+def test_multi_modal_collection_is_not_the_text_collection(nodes, monkeypatch):
+    monkeypatch.setenv("MULTI_MODAL_COLLECTION", "Images")
+    state = {"messages": [HumanMessage(content="A red pump")]}
+
+    asyncio.run(nodes.warm_up(prime=False))
+    asyncio.run(nodes.multi_modal_retrieval(state, {"configurable": {}}))
+
+    assert [c.args for c in nodes.vector_db.with_collection.call_args_list] == [
+        ("Images",),
+        ("Images",),
+    ]
+
+
+def test_retrieval_requires_a_multi_modal_collection(nodes, monkeypatch):
+    monkeypatch.delenv("MULTI_MODAL_COLLECTION", raising=False)
+    state = {"messages": [HumanMessage(content="A red pump")]}
+
+    asyncio.run(nodes.warm_up(prime=False))
+    with pytest.raises(ValueError):
+        asyncio.run(nodes.multi_modal_retrieval(state, {"configurable": {}}))
+
+    nodes.vector_db.with_collection.assert_not_called()
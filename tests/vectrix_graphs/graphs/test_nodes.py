@@ -0,0 +1,295 @@
+import asyncio
+import logging
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+
+from vectrix_graphs.db.clients import clients
+from vectrix_graphs.graphs.utils.nodes import GraphNodes
+
+CONFIG = {
+    "configurable": {
+        "speculative_retrieval": True,
+        "local_intent_classifier": False,
+        "collection_name": "Docs",
+    }
+}
+
+
+def _nodes(intent, events):
+    nodes = GraphNodes(logging.getLogger(__name__), mode="online")
+
+    async def detect(inputs):
+        events.append("intent started")
+        await asyncio.sleep(0.01)
+        events.append("intent done")
+        return {"intent": intent}
+
+    async def search(queries, **kwargs):
+        events.append("search started")
+        await asyncio.sleep(0.005)
+        return [[Document(page_content=f"about {q}")] for q in queries]
+
+    chain = Mock(ainvoke=detect)
+    nodes._setup_intent_detection = lambda mode: chain
+    vectordb = Mock(similarity_search_batch=search)
+    nodes.vector_db = Mock(with_collection=AsyncMock(return_value=vectordb))
+    return nodes
+
+
+def _state(question="What is Vectrix?"):
+    return {"messages": [HumanMessage(content=question)]}
+
+
+def test_speculative_retrieval_runs_during_intent_detection():
+    events = []
+    nodes = _nodes("specific_question", events)
+    state = _state()
+
+    update = asyncio.run(nodes.detect_intent(state, CONFIG))
+
+    assert events.index("search started") < events.index("intent done")
+    assert update["speculative_documents"][0].page_content == "about What is Vectrix?"
+
+
+@pytest.mark.parametrize(
+    "questions, searches",
+    [
+        (["What is Vectrix?"], 0),
+        (["What is Vectrix?", "Who made it?"], 1),
+        (["What is it?", "Who made it?"], 1),
+    ],
+    ids=["unsplit", "split", "rephrased"],
+)
+def test_speculation_is_merged_with_the_split_retrieval(questions, searches):
+    events = []
+    nodes = _nodes("specific_question", events)
+    state = _state()
+    state |= asyncio.run(nodes.detect_intent(state, CONFIG))
+    state["question_list"] = {"questions": questions}
+    events.clear()
+
+    update = asyncio.run(nodes.retrieve_batch(state, CONFIG))
+
+    assert [d.page_content for d in update["documents"]] == [
+        f"about {q}" for q in questions
+    ]
+    assert events == ["search started"] * searches
+    assert update["speculative_documents"] is None
+
+
+@pytest.mark.parametrize("intent", ["greeting", "metadata_query"])
+def test_speculative_retrieval_is_discarded_for_other_intents(intent):
+    nodes = _nodes(intent, [])
+
+    update = asyncio.run(nodes.detect_intent(_state(), CONFIG))
+
+    assert update["intent"] == intent
+    assert update["speculative_documents"] is None
+
+
+def test_stale_speculation_is_not_reused():
+    nodes = _nodes("specific_question", [])
+    state = _state("A new question")
+    state["speculative_documents"] = [Document(page_content="old")]
+    state["speculative_question"] = "An old question"
+
+    state["question_list"] = {"questions": ["A new question"]}
+
+    update = asyncio.run(nodes.retrieve_batch(state, CONFIG))
+
+    assert [d.page_content for d in update["documents"]] == ["about A new question"]
+
+
+def test_obvious_intents_skip_the_llm_when_enabled():
+    events = []
+    nodes = _nodes("specific_question", events)
+    config = {"configurable": {"local_intent_classifier": True}}
+
+    update = asyncio.run(nodes.detect_intent(_state("Hi!"), config))
+
+    assert update["intent"] == "greeting"
+    assert events == []
+
+
+def test_intents_are_detected_by_the_llm_by_default():
+    events = []
+    nodes = _nodes("specific_question", events)
+
+    asyncio.run(nodes.detect_intent(_state("Hi!"), {"configurable": {}}))
+
+    assert "intent done" in events
+
+
+@pytest.mark.parametrize(
+    "configurable, search_type",
+    [({}, "text"), ({"search_type": "hybrid"}, "hybrid")],
+)
+def test_retrieval_uses_hybrid_search_only_when_configured(configurable, search_type):
+    nodes = GraphNodes(logging.getLogger(__name__), mode="online")
+    vectordb = Mock(similarity_search_batch=AsyncMock(return_value=[[]]))
+    nodes.vector_db = Mock(with_collection=AsyncMock(return_value=vectordb))
+
+    asyncio.run(nodes._search(["q"], {"configurable": configurable}))
+
+    kwargs = vectordb.similarity_search_batch.call_args.kwargs
+    assert kwargs["type"] == search_type
+
+
+def _grader_nodes(grade=False, delay=0.0):
+    nodes = GraphNodes(logging.getLogger(__name__), mode="online")
+
+    async def grader(inputs):
+        await asyncio.sleep(delay)
+        return {"binary_score": grade}
+
+    nodes._setup_hallucination_grader = lambda mode: Mock(ainvoke=grader)
+    return nodes
+
+
+def _answered_state(**kwargs):
+    return _state() | {"temporary_answer": "42", "documents": []} | kwargs
+
+
+def test_every_turn_gets_a_fresh_budget():
+    nodes = _nodes("greeting", [])
+    config = {"configurable": {"latency_budget": 10}}
+    state = _state() | {"deadline": 123.0, "rewrite_count": 2}
+
+    update = asyncio.run(nodes.prepare_turn(state, config))
+
+    assert 9 < update["deadline"] - time.time() <= 10
+    assert update["rewrite_count"] == 0
+
+
+def test_turns_have_no_deadline_unless_a_budget_is_set():
+    nodes = _grader_nodes(grade=False)
+    state = _state() | {"deadline": 123.0}
+
+    state |= asyncio.run(nodes.prepare_turn(state, {"configurable": {}}))
+    update = asyncio.run(
+        nodes.hallucination_grader(_answered_state(**state), {"configurable": {}})
+    )
+
+    assert state["deadline"] is None
+    assert update["hallucination_grade"] is False
+
+
+@pytest.mark.parametrize("grade", [True, False])
+def test_only_graded_answers_are_cached(monkeypatch, grade):
+    cache = Mock()
+    monkeypatch.setattr(clients, "answer_cache", lambda: cache)
+    nodes = _grader_nodes(grade=grade)
+    answer = {"temporary_answer": AIMessage(content="42"), "answer_generation": []}
+    state = _answered_state(standalone_question="q", **answer)
+
+    state |= asyncio.run(nodes.hallucination_grader(state, CONFIG))
+    asyncio.run(nodes.final_answer(state, CONFIG))
+    # Answers accepted without a grade are returned but not cached
+    asyncio.run(nodes.final_answer(state | {"answer_verified": False}, CONFIG))
+
+    assert cache.store.call_count == int(grade)
+
+
+def _conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages += [
+            HumanMessage(content=f"question {i}", id=f"q{i}"),
+            AIMessage(content=f"answer {i}", id=f"a{i}"),
+        ]
+    return messages + [HumanMessage(content="current question", id="current")]
+
+
+def test_old_turns_of_a_thread_are_summarized():
+    nodes = GraphNodes(logging.getLogger(__name__), mode="online")
+    chain = Mock(ainvoke=AsyncMock(return_value=AIMessage(content="summary")))
+    nodes._summary_chain = lambda mode: chain
+    config = {"configurable": {"thread_id": "chat"}}
+
+    update = asyncio.run(nodes.prepare_turn({"messages": _conversation(6)}, config))
+
+    assert update["summary"] == "summary"
+    assert [m.id for m in update["messages"]] == ["q0", "a0", "q1", "a1"]
+    assert "question 1" in chain.ainvoke.call_args.args[0]["messages"]
+    # Without a thread the client sends the whole history, it is left alone
+    update = asyncio.run(nodes.prepare_turn({"messages": _conversation(6)}, CONFIG))
+    assert "summary" not in update
+
+
+def test_models_only_see_the_summary_and_recent_turns_of_a_thread():
+    nodes = GraphNodes(logging.getLogger(__name__), mode="online")
+    llm = Mock(ainvoke=AsyncMock(return_value=AIMessage(content="ok")))
+    nodes.llm_factory = Mock(create_llm=Mock(return_value=llm))
+    state = {"messages": _conversation(10), "summary": "earlier"}
+    config = {"configurable": {"thread_id": "chat"}}
+
+    asyncio.run(nodes.llm_answer(state, config))
+
+    messages = llm.ainvoke.call_args.args[0]
+    assert messages[0].content == "Earlier conversation: earlier"
+    assert [m.id for m in messages[1:]] == [
+        "q6",
+        "a6",
+        "q7",
+        "a7",
+        "q8",
+        "a8",
+        "q9",
+        "a9",
+        "current",
+    ]
+
+
+def test_requests_without_a_thread_keep_their_whole_history():
+    nodes = GraphNodes(logging.getLogger(__name__), mode="online")
+    llm = Mock(ainvoke=AsyncMock(return_value=AIMessage(content="ok")))
+    nodes.llm_factory = Mock(create_llm=Mock(return_value=llm))
+    messages = _conversation(10)
+
+    asyncio.run(nodes.llm_answer({"messages": messages}, CONFIG))
+
+    assert llm.ainvoke.call_args.args[0] == messages
+
+
+@pytest.mark.parametrize(
+    "state",
+    [
+        {"deadline": time.time() + 1e6, "rewrite_count": 2},
+        {"deadline": time.time() + 1},
+    ],
+    ids=["rewrite_limit", "budget_low"],
+)
+def test_grading_is_skipped_when_no_rewrite_is_possible(state):
+    nodes = _grader_nodes(grade=False)
+
+    update = asyncio.run(nodes.hallucination_grader(_answered_state(**state), CONFIG))
+
+    assert update == {"hallucination_grade": True, "answer_verified": False}
+
+
+def test_grading_is_bounded_by_the_deadline(monkeypatch):
+    monkeypatch.setattr("vectrix_graphs.graphs.utils.nodes.GRADER_RESERVE", 0.0)
+    monkeypatch.setattr("vectrix_graphs.graphs.utils.nodes.REWRITE_RESERVE", 0.0)
+    nodes = _grader_nodes(grade=False, delay=10)
+    config = {"configurable": {"deadline": time.time() + 0.2}}
+
+    started = time.monotonic()
+    update = asyncio.run(nodes.hallucination_grader(_answered_state(), config))
+
+    assert update == {"hallucination_grade": True, "answer_verified": False}
+    assert time.monotonic() - started < 1
+
+
+def test_low_budget_skips_question_splitting():
+    nodes = GraphNodes(logging.getLogger(__name__), mode="online")
+    nodes._setup_question_detection = Mock(side_effect=AssertionError)
+
+    update = asyncio.run(
+        nodes.split_question_list(_state() | {"deadline": time.time() + 1}, CONFIG)
+    )
+
+    assert update == {"question_list": {"questions": ["What is Vectrix?"]}}
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from langchain_core.prompts import ChatPromptTemplate
+
+from vectrix_graphs.graphs.utils.models.prompt_registry import PromptRegistry
+
+
+class FakeHub:
+    def __init__(self):
+        self.calls = []
+        self.text = "Answer {question}"
+        self.down = False
+
+    def pull(self, uri):
+        self.calls.append(uri)
+        if self.down:
+            raise ConnectionError("hub unreachable")
+        return ChatPromptTemplate.from_template(self.text)
+
+
+@pytest.fixture
+def hub():
+    return FakeHub()
+
+
+def _registry(hub, tmp_path, **kwargs):
+    return PromptRegistry(
+        snapshot_dir=str(tmp_path), refresh_interval=0, pull=hub.pull, **kwargs
+    )
+
+
+def test_prompts_are_pulled_once(hub, tmp_path):
+    registry = _registry(hub, tmp_path)
+    asyncio.run(registry.start())
+
+    registry.get("vectrix/answer_question")
+    registry.get("vectrix/answer_question")
+
+    assert hub.calls.count("vectrix/answer_question") == 1
+    assert registry.version == 1
+
+
+def test_snapshot_is_used_when_the_hub_is_down(hub, tmp_path):
+    _registry(hub, tmp_path).get("vectrix/answer_question")
+    hub.down = True
+
+    prompt = _registry(hub, tmp_path).get("vectrix/answer_question")
+    offline = _registry(hub, tmp_path, offline=True).get("vectrix/answer_question")
+
+    assert prompt.format(question="q") == offline.format(question="q")
+    assert hub.calls.count("vectrix/answer_question") == 2
+
+
+def test_missing_prompt_raises(hub, tmp_path):
+    hub.down = True
+    with pytest.raises(ValueError):
+        _registry(hub, tmp_path).get("vectrix/answer_question")
+
+
+def test_reload_bumps_version_only_on_changes(hub, tmp_path):
+    registry = _registry(hub, tmp_path)
+    registry.load(["vectrix/answer_question"])
+    registry.load(["vectrix/answer_question"])
+    assert registry.version == 1
+
+    hub.text = "Answer briefly {question}"
+    registry.load(["vectrix/answer_question"])
+
+    assert registry.version == 2
+    assert "briefly" in registry.get("vectrix/answer_question").format(question="q")
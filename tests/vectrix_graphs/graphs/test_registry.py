@@ -0,0 +1,155 @@
+import asyncio
+import importlib
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from vectrix_graphs.graphs.registry import GraphRegistry, GraphSpec, ModelSpec
+
+GRAPH_MODULE = """
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+graph = StateGraph(MessagesState)
+graph.add_node("echo", lambda state: {"messages": []})
+graph.add_edge(START, "echo")
+graph.add_edge("echo", END)
+echo_graph = graph.compile()
+primed = []
+
+
+async def warm_up(prime=True):
+    primed.append(prime)
+"""
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    (tmp_path / "echo_graph_module.py").write_text(GRAPH_MODULE)
+    (tmp_path / "broken_graph_module.py").write_text("raise ConnectionError()")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return GraphRegistry(
+        {
+            "echo": GraphSpec(
+                "echo_graph_module:echo_graph", "echo_graph_module:warm_up"
+            ),
+            "broken": "broken_graph_module:graph",
+        },
+        {"echo_model": ModelSpec("echo", "online")},
+    )
+
+
+def test_graphs_are_built_on_first_use(registry):
+    assert not registry.is_built("echo")
+    assert "echo_graph_module" not in sys.modules
+
+    graph = asyncio.run(registry.aget_model("echo_model"))
+
+    assert registry.is_built("echo")
+    assert registry.get("echo") is graph
+    assert registry.status() == {"echo": "built"}
+
+
+def test_unknown_graphs_and_models_are_rejected(registry):
+    with pytest.raises(ValueError):
+        registry.get("missing")
+    with pytest.raises(ValueError):
+        registry.model("gpt-4")
+
+
+def test_served_graphs_are_ready_after_their_warm_up_hook(registry):
+    assert not registry.ready()
+
+    asyncio.run(registry.warm_up(prime=False))
+
+    assert registry.ready()
+    assert registry.status() == {"echo": "warm"}
+    assert sys.modules["echo_graph_module"].primed == [False]
+    assert not registry.is_built("broken")
+
+
+def test_warm_up_survives_failing_graphs(registry):
+    asyncio.run(registry.warm_up(["broken", "echo"], retry_delay=0))
+
+    assert registry.is_built("echo")
+    assert not registry.is_built("broken")
+
+
+def test_graphs_failing_to_build_are_retried_until_ready(registry, tmp_path):
+    registry.register("echo", "flaky_graph_module:echo_graph")
+
+    async def fix_module_later():
+        await asyncio.sleep(0.02)
+        (tmp_path / "flaky_graph_module.py").write_text(GRAPH_MODULE)
+        importlib.invalidate_caches()
+
+    async def main():
+        await asyncio.gather(
+            registry.warm_up(prime=False, retry_delay=0.01), fix_module_later()
+        )
+
+    asyncio.run(main())
+
+    assert registry.ready()
+
+
+def test_models_and_readiness_are_served_from_the_registry(monkeypatch):
+    from vectrix_graphs.main import app
+
+    monkeypatch.setenv("BEARER_TOKEN", "token")
+    client = TestClient(app)
+    models = client.get("/v1/models", headers={"Authorization": "Bearer token"})
+    ready = client.get("/ready")
+
+    assert [m["id"] for m in models.json()["data"]] == [
+        "navid_ai_demo_local",
+        "navid_ai_demo_online",
+        "navid_ai_demo_multi_modal",
+    ]
+    assert ready.status_code == 503
+    assert ready.json()["status"] == "warming_up"
+    assert "multi_modal_rag" in ready.json()["graphs"]
+
+
+def test_failed_warm_up_steps_do_not_block_readiness(monkeypatch):
+    from vectrix_graphs import main
+
+    warmed = []
+
+    async def fail():
+        raise RuntimeError("unavailable")
+
+    def fail_prompts():
+        raise ImportError("no langsmith")
+
+    async def warm_up_graphs():
+        warmed.append(True)
+
+    monkeypatch.setattr(main.clients, "startup", fail)
+    monkeypatch.setattr(main, "_prompts", fail_prompts)
+    monkeypatch.setattr(main, "GRAPH_WARMUP", True)
+    monkeypatch.setattr(main.graphs, "warm_up", warm_up_graphs)
+    monkeypatch.setattr(main.graphs, "ready", lambda: True)
+    app = SimpleNamespace(state=SimpleNamespace(warmed_up=False))
+    monkeypatch.setattr(main, "app", app)
+
+    asyncio.run(main.warm_up(app))
+
+    assert warmed == [True]
+    assert asyncio.run(main.ready())["status"] == "ready"
+
+
+def test_api_import_does_not_build_graphs():
+    code = (
+        "import sys, vectrix_graphs.main; "
+        "print(any(m in sys.modules for m in "
+        "('vectrix_graphs.graphs.default_flow', 'weaviate', 'cohere', 'voyageai', "
+        "'langchain_core', 'langsmith', 'numpy', 'PIL')))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip().splitlines()[-1] == "False"
@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from langchain_core.documents import Document
+from langgraph.graph import END, START, StateGraph
+
+from vectrix_graphs.graphs.utils.handlers.rerank_handler import (
+    BM25Reranker,
+    CohereReranker,
+    get_reranker,
+)
+from vectrix_graphs.graphs.utils.state import OverallState
+
+DOCUMENTS = [
+    Document(page_content="opening hours of the support desk", metadata={"id": 0}),
+    Document(page_content="the pump warranty lasts two years", metadata={"id": 1}),
+    Document(page_content="warranty claims need the invoice", metadata={"id": 2}),
+]
+
+
+def test_bm25_keeps_the_best_lexical_matches():
+    reranked = asyncio.run(
+        BM25Reranker().rerank("How long is the pump warranty?", DOCUMENTS, 2)
+    )
+
+    assert [d.metadata["id"] for d in reranked] == [1, 2]
+    assert reranked[0].metadata["rerank_score"] > reranked[1].metadata["rerank_score"]
+
+
+def test_cohere_reranks_all_candidates_in_one_request():
+    response = SimpleNamespace(
+        results=[
+            SimpleNamespace(index=2, relevance_score=0.9),
+            SimpleNamespace(index=0, relevance_score=0.2),
+        ]
+    )
+    cohere = Mock(rerank=AsyncMock(return_value=response))
+    registry = Mock(async_cohere=Mock(return_value=cohere))
+
+    reranked = asyncio.run(
+        CohereReranker(registry=registry).rerank("warranty", DOCUMENTS, 2)
+    )
+
+    assert [d.metadata["id"] for d in reranked] == [2, 0]
+    assert cohere.rerank.await_count == 1
+    assert len(cohere.rerank.call_args.kwargs["documents"]) == 3
+
+
+def test_unknown_reranker_is_rejected():
+    assert get_reranker("none") is None
+    with pytest.raises(ValueError):
+        get_reranker("magic")
+
+
+def test_rerank_node_replaces_the_retrieved_documents():
+    from vectrix_graphs.graphs.utils.nodes import GraphNodes
+
+    nodes = GraphNodes(Mock(), mode="online")
+    graph = StateGraph(OverallState)
+    graph.add_node("rerank", nodes.rerank)
+    graph.add_edge(START, "rerank")
+    graph.add_edge("rerank", END)
+    config = {"configurable": {"reranker": "bm25", "rerank_top_n": 1}}
+
+    result = asyncio.run(
+        graph.compile().ainvoke(
+            {"messages": [("user", "pump warranty")], "documents": DOCUMENTS}, config
+        )
+    )
+
+    assert [d.metadata["id"] for d in result["documents"]] == [1]
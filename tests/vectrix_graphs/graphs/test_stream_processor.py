@@ -0,0 +1,93 @@
+import asyncio
+import json
+import time
+
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from vectrix_graphs.graphs.utils.stream_processor import StreamProcessor
+
+
+def _graph():
+    async def detect_intent(state):
+        await FakeListChatModel(responses=["internal"]).ainvoke(state["messages"])
+        return {"messages": []}
+
+    async def llm_answer(state):
+        response = await FakeListChatModel(responses=["Hello there"]).ainvoke(
+            state["messages"]
+        )
+        return {"messages": [AIMessage(content=response.content)]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("detect_intent", detect_intent)
+    graph.add_node("llm_answer", llm_answer)
+    graph.add_edge(START, "detect_intent")
+    graph.add_edge("detect_intent", "llm_answer")
+    graph.add_edge("llm_answer", END)
+    return graph.compile()
+
+
+async def _collect(stream):
+    return [json.loads(chunk) async for chunk in stream]
+
+
+def test_only_answer_tokens_are_streamed():
+    chunks = asyncio.run(
+        _collect(StreamProcessor(_graph()).process_stream([("user", "hi")]))
+    )
+    deltas = [chunk["choices"][0]["delta"] for chunk in chunks]
+
+    assert deltas[0] == {"role": "assistant", "content": ""}
+    assert "".join(d["content"] for d in deltas[1:-1]) == "Hello there"
+    assert len(deltas) > 3
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+    assert len({chunk["created"] for chunk in chunks}) == 1
+
+
+def test_tokens_are_coalesced_within_the_window():
+    stream = StreamProcessor(_graph(), coalesce_ms=60_000)
+    chunks = asyncio.run(_collect(stream.process_stream([("user", "hi")])))
+
+    assert [c["choices"][0]["delta"] for c in chunks[1:-1]] == [
+        {"content": "H"},
+        {"content": "ello there"},
+    ]
+
+
+class SlowGraph:
+    """Graph stub streaming answer tokens after the given delays"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    async def astream(self, inputs, config, stream_mode):
+        for delay, token in self.tokens:
+            await asyncio.sleep(delay)
+            yield AIMessageChunk(content=token), {"langgraph_node": "rag_answer"}
+
+
+def test_pending_tokens_are_flushed_when_the_window_ends():
+    graph = SlowGraph([(0, "a"), (0.01, "b"), (0.01, "c"), (0.5, "d")])
+    stream = StreamProcessor(graph, coalesce_ms=50)
+
+    async def collect():
+        started = time.perf_counter()
+        return [
+            (json.loads(chunk), time.perf_counter() - started)
+            async for chunk in stream.process_stream([("user", "hi")])
+        ]
+
+    chunks = asyncio.run(collect())[1:-1]
+
+    assert [c["choices"][0]["delta"]["content"] for c, _ in chunks] == ["a", "bc", "d"]
+    # Not held back until the next token arrives
+    assert chunks[1][1] < 0.3
+
+
+def test_replay_uses_the_same_chunk_format():
+    chunks = asyncio.run(_collect(StreamProcessor(None).replay("cached", "fp_cache")))
+
+    assert chunks[1]["choices"][0]["delta"] == {"content": "cached"}
+    assert {chunk["system_fingerprint"] for chunk in chunks} == {"fp_cache"}
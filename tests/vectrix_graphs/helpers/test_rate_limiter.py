@@ -0,0 +1,114 @@
+import asyncio
+import time
+from typing import ClassVar
+
+import httpx
+import openai
+import pytest
+from langchain_core.language_models import FakeListChatModel
+
+from vectrix_graphs.graphs.utils.models.llm_factory import _RateLimited
+from vectrix_graphs.helpers.rate_limiter import (
+    INGESTION,
+    INTERACTIVE,
+    RateLimiter,
+    is_rate_limited,
+    limiters,
+    priority,
+)
+from vectrix_graphs.metrics import RATE_LIMIT_QUEUE_TIME
+
+
+def test_concurrency_is_capped():
+    limiter = RateLimiter("test/concurrency", rate=1000, max_concurrency=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.aslot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+def test_requests_are_paced_by_the_token_bucket():
+    limiter = RateLimiter("test/pace", rate=50, max_concurrency=10, burst=1)
+    started = time.perf_counter()
+
+    for _ in range(4):
+        with limiter.slot():
+            pass
+
+    assert time.perf_counter() - started >= 0.05
+
+
+def test_rate_backs_off_on_429_and_recovers():
+    limiter = RateLimiter("test/aimd", rate=10, max_concurrency=10)
+    response = type("Response", (), {"status_code": 429})()
+
+    with pytest.raises(RuntimeError):
+        with limiter.slot():
+            error = RuntimeError("Too many requests")
+            error.response = response
+            raise error
+    assert limiter.rate == 5
+
+    limiter.tokens = limiter.burst
+    with limiter.slot():
+        pass
+    assert limiter.rate == 5.5
+
+
+def test_interactive_requests_are_admitted_before_ingestion():
+    limiter = RateLimiter("test/priority", rate=1000, max_concurrency=1)
+    order = []
+
+    async def call(name, value):
+        with priority(value):
+            async with limiter.aslot():
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+    async def main():
+        holder = asyncio.create_task(call("first", INTERACTIVE))
+        await asyncio.sleep(0.001)
+        ingestion = asyncio.create_task(call("ingestion", INGESTION))
+        await asyncio.sleep(0.001)
+        await asyncio.gather(holder, ingestion, call("interactive", INTERACTIVE))
+
+    asyncio.run(main())
+    assert order == ["first", "interactive", "ingestion"]
+
+
+class _LimitedFakeModel(_RateLimited, FakeListChatModel):
+    rate_limit_provider: ClassVar[str] = "fake"
+
+
+def test_chat_models_are_admitted_by_their_provider_limiter():
+    llm = _LimitedFakeModel(responses=["hello", "world"])
+    before = RATE_LIMIT_QUEUE_TIME.count(limiter="fake/", priority=INTERACTIVE)
+
+    async def main():
+        await llm.ainvoke("hi")
+        return [chunk.content async for chunk in llm.astream("hi")]
+
+    assert "".join(asyncio.run(main())) == "world"
+    assert (
+        RATE_LIMIT_QUEUE_TIME.count(limiter="fake/", priority=INTERACTIVE) == before + 2
+    )
+    assert limiters.get("fake", "").in_flight == 0
+
+
+def test_provider_rate_limit_errors_are_recognized():
+    request = httpx.Request("POST", "https://api.openai.com")
+    response = httpx.Response(429, request=request)
+    error = openai.RateLimitError("slow down", response=response, body=None)
+
+    assert is_rate_limited(error)
+    assert not is_rate_limited(ValueError("bad input"))
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from vectrix_graphs.helpers.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "42"
+
+    async def main():
+        return await asyncio.gather(*(flights.do("q", answer) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["42"] * 5
+    assert len(calls) == 1
+    assert not flights.in_flight("q")
+
+
+def test_streams_fan_out_from_one_producer():
+    flights = SingleFlight()
+    runs = []
+
+    async def tokens():
+        runs.append(1)
+        for token in ["a", "b", "c"]:
+            await asyncio.sleep(0.005)
+            yield token
+
+    async def collect():
+        return [chunk async for chunk in flights.stream("q", tokens)]
+
+    async def main():
+        first = asyncio.create_task(collect())
+        await asyncio.sleep(0.007)
+        # Joins late and still receives the stream from its start
+        return await asyncio.gather(first, collect())
+
+    assert asyncio.run(main()) == [["a", "b", "c"], ["a", "b", "c"]]
+    assert len(runs) == 1
+
+
+def test_stream_errors_reach_every_subscriber():
+    flights = SingleFlight()
+
+    async def tokens():
+        yield "a"
+        raise RuntimeError("model down")
+
+    async def collect():
+        return [chunk async for chunk in flights.stream("q", tokens)]
+
+    async def main():
+        return await asyncio.gather(collect(), collect(), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_stream_stops_when_the_last_subscriber_leaves():
+    flights = SingleFlight()
+    produced = []
+
+    async def tokens():
+        for token in range(100):
+            produced.append(token)
+            await asyncio.sleep(0.001)
+            yield token
+
+    async def main():
+        async for _ in flights.stream("q", tokens):
+            break
+        await asyncio.sleep(0.02)
+
+    asyncio.run(main())
+    assert len(produced) < 100
+    assert not flights.in_flight("q")
+
+
+def test_failed_calls_are_not_remembered():
+    flights = SingleFlight()
+
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(flights.do("q", fail))
+    assert not flights.in_flight("q")
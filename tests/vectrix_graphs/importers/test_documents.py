@@ -1,5 +1,6 @@
 import base64
 import io
+import os
 from datetime import datetime
 from unittest.mock import Mock, mock_open, patch
 
@@ -8,6 +9,7 @@ import pytest
 
 from vectrix_graphs.importers.documents import (
     _process_image,
+    iter_multi_modal_extraction,
     multi_modal_extraction,
 )
 
@@ -140,6 +142,37 @@ def test_multi_modal_extraction(
     assert "filename" in embedding_metadatas[0]
 
 
+@patch("vectrix_graphs.importers.documents.partition")
+@patch("vectrix_graphs.importers.documents.chunk_by_title")
+def test_iter_multi_modal_extraction_is_lazy(mock_chunk_by_title, mock_partition):
+    """Chunks are converted one at a time while the generator is consumed."""
+    chunks = []
+    for i in range(3):
+        chunk = Mock()
+        chunk.to_dict.return_value = {
+            "text": f"Chunk {i}",
+            "metadata": {
+                "filename": "test.pdf",
+                "page_number": i + 1,
+                "last_modified": datetime.now(),
+                "languages": ["en"],
+                "filetype": "application/pdf",
+            },
+        }
+        chunks.append(chunk)
+    mock_partition.return_value = []
+    mock_chunk_by_title.return_value = chunks
+
+    iterator = iter_multi_modal_extraction("test.pdf")
+    embedding_object, metadata = next(iterator)
+
+    assert embedding_object == ["Chunk 0"]
+    assert metadata["page_number"] == 1
+    assert metadata["source_id"] == os.path.abspath("test.pdf")
+    chunks[1].to_dict.assert_not_called()
+    assert [m["text"] for _, m in iterator] == ["Chunk 1", "Chunk 2"]
+
+
 def test_multi_modal_extraction_file_not_found():
     """Test handling of non-existent files."""
     with pytest.raises(FileNotFoundError):
@@ -0,0 +1,125 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from vectrix_graphs.db.cache import AnswerCache, QueryCache
+from vectrix_graphs.db.clients import clients
+from vectrix_graphs.db.sqlite import SqliteCheckpointer
+from vectrix_graphs.routers import chat
+
+MODEL = "navid_ai_demo_online"
+
+
+class CountingGraph:
+    """Graph stub answering after a delay, counting its runs"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.runs = 0
+
+    async def ainvoke(self, inputs, config):
+        self.runs += 1
+        await asyncio.sleep(self.delay)
+        return {"messages": [AIMessage(content="from the graph", id="answer")]}
+
+
+def _echo_graph():
+    """Graph answering with the number of messages of its state"""
+
+    def answer(state):
+        return {"messages": [AIMessage(content=f"{len(state['messages'])} messages")]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("answer", answer)
+    graph.add_edge(START, "answer")
+    graph.add_edge("answer", END)
+    return graph.compile()
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/v1")
+    # A single event loop serves all requests, like in the API
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    def serve(graph):
+        monkeypatch.setattr(chat.graphs, "aget_model", AsyncMock(return_value=graph))
+
+    return serve
+
+
+@pytest.fixture
+def answer_cache(monkeypatch):
+    monkeypatch.setenv("WEAVIATE_COLLECTION", "Docs")
+    cache = AnswerCache(QueryCache())
+    monkeypatch.setattr(clients, "answer_cache", lambda: cache)
+    return cache
+
+
+def _post(client, *contents, headers=None):
+    roles = ["user", "assistant"] * len(contents)
+    messages = [{"role": r, "content": c} for r, c in zip(roles, contents)]
+    return client.post(
+        "/v1/chat/completions",
+        json={"model": MODEL, "messages": messages},
+        headers=headers,
+    )
+
+
+def test_cached_answers_are_served_without_the_graph(client, serve, answer_cache):
+    graph = CountingGraph()
+    serve(graph)
+    answer_cache.store("online", "Docs", "What is Vectrix?", "cached", 0)
+
+    hit = _post(client, "what is  vectrix?")
+    miss = _post(client, "Who made Vectrix?")
+
+    assert hit.headers["X-Answer-Cache"] == "exact"
+    assert hit.json()["choices"][0]["message"]["content"] == "cached"
+    assert hit.json()["system_fingerprint"] == "answer_cache_exact"
+    assert "X-Answer-Cache" not in miss.headers
+    assert miss.json()["choices"][0]["message"]["content"] == "from the graph"
+    assert graph.runs == 1
+
+
+def test_identical_concurrent_requests_share_one_graph_run(client, serve, answer_cache):
+    graph = CountingGraph(delay=0.3)
+    serve(graph)
+
+    with ThreadPoolExecutor(2) as pool:
+        responses = list(pool.map(lambda _: _post(client, "What is Vectrix?"), [0, 1]))
+
+    assert [r.json()["choices"][0]["message"]["content"] for r in responses] == [
+        "from the graph",
+        "from the graph",
+    ]
+    assert graph.runs == 1
+
+
+def test_threaded_requests_resume_their_state(
+    client, serve, answer_cache, monkeypatch, tmp_path
+):
+    checkpointer = SqliteCheckpointer(path=str(tmp_path / "threads.sqlite3"))
+    monkeypatch.setattr(clients, "checkpointer", lambda: checkpointer)
+    serve(_echo_graph())
+    headers = {"X-Thread-Id": "chat"}
+
+    first = _post(client, "Hi", headers=headers)
+    # Only the new message is added to the checkpointed conversation
+    second = _post(client, "ignored", "ignored", "Again", headers=headers)
+    other = _post(client, "Hi", headers={"X-Thread-Id": "other"})
+
+    assert first.json()["choices"][0]["message"]["content"] == "1 messages"
+    assert second.json()["choices"][0]["message"]["content"] == "3 messages"
+    assert other.json()["choices"][0]["message"]["content"] == "1 messages"
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+
+from fastapi.testclient import TestClient
+from langchain_core.language_models import FakeListChatModel
+
+from vectrix_graphs.graphs.utils.models.llm_factory import LLMMetricsCallback
+from vectrix_graphs.graphs.utils.nodes import GraphNodes
+from vectrix_graphs.metrics import LLM_LATENCY, NODE_DURATION, MetricsRegistry
+
+
+def test_metrics_are_rendered_in_the_prometheus_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("model",))
+    latency = registry.histogram("latency_seconds", "Latency", ("model",), (0.1, 1))
+    registry.gauge(
+        "hit_ratio", "Hit ratio", ("cache",), lambda: [({"cache": "q"}, 0.5)]
+    )
+
+    requests.inc(model='a"b')
+    requests.inc(2, model='a"b')
+    latency.observe(0.05, model="m")
+    latency.observe(5, model="m")
+    text = registry.render()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{model="a\\"b"} 3' in text
+    assert 'latency_seconds_bucket{model="m",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{model="m",le="1"} 1' in text
+    assert 'latency_seconds_bucket{model="m",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{model="m"} 2' in text
+    assert 'hit_ratio{cache="q"} 0.5' in text
+
+
+def test_graph_node_durations_are_recorded():
+    nodes = GraphNodes(logging.getLogger(__name__), mode="online")
+    before = NODE_DURATION.count(node="GraphNodes.detect_message_history")
+
+    asyncio.run(nodes.detect_message_history({"messages": ["hi"]}, {}))
+
+    assert NODE_DURATION.count(node="GraphNodes.detect_message_history") == before + 1
+
+
+def test_llm_calls_are_recorded_per_model():
+    llm = FakeListChatModel(
+        responses=["ok"], callbacks=[LLMMetricsCallback("test/fake")]
+    )
+
+    asyncio.run(llm.ainvoke("hi"))
+
+    assert LLM_LATENCY.count(model="test/fake") == 1
+
+
+def test_metrics_endpoint_is_public():
+    from vectrix_graphs.main import app
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert "vectrix_graph_node_duration_seconds" in response.text
+    assert "vectrix_cache_hit_ratio" in response.text